@@ -0,0 +1,105 @@
+# analysis/correlation.py - Aligned cross-asset panels and full/rolling correlation matrices
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+MIN_PERIODS = 10
+MONTHLY_PERIODS = 21  # business days per month, for changes of mixed-frequency panels
+
+
+def align_series(series: Dict[str, pd.Series], freq: str = "B", start: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+    """
+    Date x series panel on a common business-day calendar. Each series is carried forward
+    from its own observations (monthly/quarterly data holds its last print), never backwards.
+    """
+    columns = {}
+    for name, s in series.items():
+        if s is None or len(s) == 0:
+            continue
+        s = pd.to_numeric(pd.Series(s), errors="coerce").dropna()
+        index = pd.DatetimeIndex(pd.to_datetime(s.index))
+        if index.tz is not None:
+            index = index.tz_localize(None)
+        s.index = index.normalize()
+        columns[name] = s[~s.index.duplicated(keep="last")].sort_index()
+    if not columns:
+        return pd.DataFrame()
+
+    first = min(s.index[0] for s in columns.values()) if start is None else pd.Timestamp(start)
+    last = max(s.index[-1] for s in columns.values())
+    calendar = pd.date_range(first, last, freq=freq)
+    return pd.DataFrame({name: s.reindex(s.index.union(calendar)).ffill().reindex(calendar)
+                         for name, s in columns.items()})
+
+
+def changes(panel: pd.DataFrame, periods: int = 1) -> pd.DataFrame:
+    """Percent changes for strictly positive series (prices, indices), differences for the rest (rates, balances)."""
+    positive = ((panel > 0) | panel.isna()).all()
+    out = panel.diff(periods)
+    ratio = panel.loc[:, positive]
+    out.loc[:, positive] = ratio / ratio.shift(periods) - 1.0
+    return out
+
+
+def _moments(values: np.ndarray) -> Tuple[np.ndarray, ...]:
+    """Pairwise-complete per-row sums: counts, sum x, sum x^2 (over rows where the partner is valid) and sum xy."""
+    valid = ~np.isnan(values)
+    # Centre on the column means so differenced cumulative sums keep their precision
+    x = np.where(valid, values - np.nanmean(values, axis=0), 0.0)
+    m = valid.astype(float)
+    n = m[:, :, None] * m[:, None, :]
+    sx = x[:, :, None] * m[:, None, :]
+    sxx = (x * x)[:, :, None] * m[:, None, :]
+    sxy = x[:, :, None] * x[:, None, :]
+    return n, sx, sxx, sxy
+
+
+def _corr(n, sx, sxx, sxy, min_periods: int) -> np.ndarray:
+    """Pearson correlations from pairwise sums; sx[..., i, j] sums x_i where x_j is valid."""
+    sy, syy = np.swapaxes(sx, -1, -2), np.swapaxes(sxx, -1, -2)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cov = sxy - sx * sy / n
+        var_x, var_y = sxx - sx * sx / n, syy - sy * sy / n
+        corr = cov / np.sqrt(var_x * var_y)
+    corr[(n < min_periods) | (var_x <= 1e-14 * np.abs(sxx)) | (var_y <= 1e-14 * np.abs(syy))] = np.nan
+    return np.clip(corr, -1.0, 1.0)
+
+
+def correlation_matrix(panel: pd.DataFrame, min_periods: int = MIN_PERIODS) -> pd.DataFrame:
+    """Pairwise-complete Pearson correlation matrix (same as DataFrame.corr) in one pass."""
+    if panel is None or panel.empty:
+        return pd.DataFrame()
+    n, sx, sxx, sxy = (a.sum(axis=0) for a in _moments(panel.to_numpy(dtype=float)))
+    return pd.DataFrame(_corr(n, sx, sxx, sxy, min_periods), index=panel.columns, columns=panel.columns)
+
+
+def rolling_correlation(panel: pd.DataFrame, window: int, min_periods: Optional[int] = None) -> pd.DataFrame:
+    """
+    Correlation matrix over every trailing `window` rows, as (date, series) x series like
+    DataFrame.rolling(window).corr(). Window sums come from differenced cumulative sums, so
+    each step costs O(N^2) whatever the window length.
+    """
+    if panel is None or panel.empty:
+        return pd.DataFrame()
+    min_periods = window if min_periods is None else min_periods
+    sums = []
+    for moment in _moments(panel.to_numpy(dtype=float)):
+        total = np.cumsum(moment, axis=0)
+        lagged = np.zeros_like(total)
+        lagged[window:] = total[:-window]
+        sums.append(total - lagged)
+    corr = _corr(*sums, min_periods=max(min_periods, 2))
+
+    rows, cols = corr.shape[0], panel.shape[1]
+    index = pd.MultiIndex.from_product([panel.index, panel.columns])
+    return pd.DataFrame(corr.reshape(rows * cols, cols), index=index, columns=panel.columns)
+
+
+def top_pairs(matrix: pd.DataFrame, limit: int = 10) -> List[Tuple[str, str, float]]:
+    """Strongest off-diagonal pairs of a correlation matrix by absolute correlation."""
+    if matrix is None or matrix.empty:
+        return []
+    upper = matrix.where(np.triu(np.ones(matrix.shape, dtype=bool), k=1)).stack().dropna()
+    upper = upper.reindex(upper.abs().sort_values(ascending=False).index)
+    return [(a, b, float(v)) for (a, b), v in upper.head(limit).items()]
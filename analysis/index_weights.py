@@ -0,0 +1,76 @@
+# analysis/index_weights.py - Capped free-float index weights and per-constituent contributions
+import datetime as dt
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+# HOSE reviews VN30 twice a year; weights are rebuilt once per review period
+REBALANCE_MONTHS = (1, 7)
+WEIGHT_CAP = 0.10
+
+
+def rebalance_period(day: dt.date) -> str:
+    """Label of the review period `day` falls in, e.g. '2025-07' for Jul-Dec 2025."""
+    month = max((m for m in REBALANCE_MONTHS if m <= day.month), default=None)
+    if month is None:
+        return f"{day.year - 1}-{max(REBALANCE_MONTHS):02d}"
+    return f"{day.year}-{month:02d}"
+
+
+def capped_weights(market_cap: pd.Series, cap: float = WEIGHT_CAP) -> pd.Series:
+    """
+    Normalised weights of `market_cap` with no single weight above `cap`; the excess of
+    capped names is redistributed pro rata over the rest until no weight exceeds the cap.
+    """
+    market_cap = market_cap[market_cap > 0].astype(float)
+    if market_cap.empty:
+        return market_cap
+    if cap * len(market_cap) < 1:
+        return pd.Series(1.0 / len(market_cap), index=market_cap.index)
+
+    capped = pd.Series(False, index=market_cap.index)
+    weights = market_cap / market_cap.sum()
+    while (weights > cap + 1e-12).any():
+        capped |= weights > cap
+        free = ~capped
+        weights[capped] = cap
+        weights[free] = (1.0 - cap * capped.sum()) * market_cap[free] / market_cap[free].sum()
+    return weights
+
+
+def index_shares(shares: pd.Series, free_float: pd.Series, price: pd.Series, cap: float = WEIGHT_CAP) -> pd.Series:
+    """
+    Capped free-float share counts fixed at a rebalance: shares x free float x cap factor.
+
+    Multiplying by any later price gives that day's capped market cap, so weights drift
+    with prices between reviews the way the published index does.
+    """
+    float_shares = (shares * free_float.reindex(shares.index).fillna(1.0)).dropna()
+    market_cap = (float_shares * price.reindex(float_shares.index)).dropna()
+    weights = capped_weights(market_cap, cap)
+    if weights.empty:
+        return weights
+    factor = weights / (market_cap[weights.index] / market_cap[weights.index].sum())
+    return float_shares[weights.index] * factor / factor.max()
+
+
+def contributions(idx_shares: pd.Series, prev_close: pd.Series, change_pct: pd.Series) -> Dict:
+    """
+    Each constituent's weight (start-of-day, percent) and contribution to the index move
+    (percentage points), as one dot product over the return vector. Missing returns count as flat.
+    """
+    symbols = idx_shares.index
+    cap_value = (idx_shares * prev_close.reindex(symbols)).fillna(0.0).to_numpy()
+    total = cap_value.sum()
+    if total <= 0:
+        empty = pd.Series(dtype=float)
+        return {"weight": empty, "contribution": empty, "index_change": 0.0}
+
+    weight = cap_value / total
+    returns = np.nan_to_num(change_pct.reindex(symbols).to_numpy(dtype=float))
+    return {
+        "weight": pd.Series(weight * 100.0, index=symbols),
+        "contribution": pd.Series(weight * returns, index=symbols),
+        "index_change": float(weight @ returns),
+    }
@@ -0,0 +1,213 @@
+# analysis/panel.py - Vectorized technical indicators over a date x symbol panel
+import warnings
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+TRADING_DAYS = 252
+
+# Minimum observations per indicator (same thresholds as the per-symbol implementation)
+MIN_OBS = 5
+RSI_PERIOD = 14
+SMA_WINDOWS = (20, 50, 200)
+BB_WINDOW = 20
+BB_STD = 2
+RANGE_WINDOW = 20
+VOL_WINDOW = 20
+VOLUME_WINDOW = 10
+
+TECHNICAL_FIELDS = ["rsi", *(f"sma_{w}" for w in SMA_WINDOWS), "bb_upper", "bb_lower", "bb_position",
+                    "resistance", "support", "volatility_20d"]
+
+
+def build_panel(frames: Dict[str, pd.DataFrame], field: str = "close") -> pd.DataFrame:
+    """Wide date x symbol frame of `field` from per-symbol bar frames with a 'date' column."""
+    columns = {
+        symbol: df.drop_duplicates(subset="date", keep="last").set_index("date")[field]
+        for symbol, df in frames.items()
+        if df is not None and not df.empty and field in df
+    }
+    if not columns:
+        return pd.DataFrame()
+    return pd.concat(columns, axis=1, sort=True)
+
+
+def _bottom_align(values: np.ndarray):
+    """
+    Move each column's valid values to the bottom, keeping their order, so row -k is the
+    k-th most recent observation of every symbol regardless of its own trading calendar.
+    Returns the aligned array and the number of valid values per column.
+    """
+    valid = ~np.isnan(values)
+    order = np.argsort(valid, axis=0, kind="stable")  # NaNs (False) first, valid rows after
+    return np.take_along_axis(values, order, axis=0), valid.sum(axis=0)
+
+
+def _tail(aligned: np.ndarray, window: int) -> np.ndarray:
+    return aligned[-window:] if aligned.shape[0] >= window else np.full((window, aligned.shape[1]), np.nan)
+
+
+def _lag_ratio(aligned: np.ndarray, counts: np.ndarray, lag: int) -> np.ndarray:
+    """Percent change between the latest value and the one `lag` observations earlier."""
+    out = np.full(aligned.shape[1], np.nan)
+    if aligned.shape[0] <= lag:
+        return out
+    last, prev = aligned[-1], aligned[-1 - lag]
+    ok = (counts > lag) & (prev != 0)
+    out[ok] = (last[ok] / prev[ok] - 1.0) * 100.0
+    return out
+
+
+def _wilder_rsi(aligned: np.ndarray, counts: np.ndarray, period: int = RSI_PERIOD) -> np.ndarray:
+    """
+    Latest Wilder RSI (EMA with alpha=1/period, no bias adjustment) for every column at once.
+    Each bottom-aligned column is NaN until its first price, so the EMA seeds on that
+    column's first price change, as calculate_rsi does on a single series.
+    """
+    delta = pd.DataFrame(aligned).diff()
+    avg_gain = delta.clip(lower=0).ewm(alpha=1.0 / period, adjust=False).mean().to_numpy()[-1]
+    avg_loss = (-delta).clip(lower=0).ewm(alpha=1.0 / period, adjust=False).mean().to_numpy()[-1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rs = avg_gain / np.where(avg_loss == 0, np.nan, avg_loss)
+        rsi = 100 - 100 / (1 + rs)
+    rsi[counts < period] = np.nan
+    return rsi
+
+
+def compute_panel_indicators(close: pd.DataFrame, volume: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """
+    Latest-value indicators for every symbol (column) of a date x symbol close panel.
+
+    Only the tail windows each indicator needs are evaluated, in one NumPy pass across
+    all symbols. Returns a symbol x indicator frame; NaN where a symbol has too little history.
+    """
+    if close is None or close.empty:
+        return pd.DataFrame()
+
+    values = close.to_numpy(dtype=float)
+    aligned, n = _bottom_align(values)
+    last = aligned[-1]
+
+    out = {
+        "n_obs": n,
+        "price": np.where(n > 0, last, np.nan),
+        "change_1d": _lag_ratio(aligned, n, 1),
+        "change_1w": _lag_ratio(aligned, n, 6),
+        "change_1m": _lag_ratio(aligned, n, 20),
+        "rsi": _wilder_rsi(aligned, n),
+    }
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for window in SMA_WINDOWS:
+            out[f"sma_{window}"] = np.where(n >= window, _tail(aligned, window).mean(axis=0), np.nan)
+
+        bb = _tail(aligned, BB_WINDOW)
+        bb_mean, bb_std = bb.mean(axis=0), bb.std(axis=0, ddof=1)
+        enough = n >= BB_WINDOW
+        out["bb_upper"] = np.where(enough, bb_mean + BB_STD * bb_std, np.nan)
+        out["bb_lower"] = np.where(enough, bb_mean - BB_STD * bb_std, np.nan)
+        bb_range = out["bb_upper"] - out["bb_lower"]
+        out["bb_position"] = np.where(bb_range > 0, (last - out["bb_lower"]) / bb_range, np.nan)
+
+        window = _tail(aligned, RANGE_WINDOW)
+        enough = n >= RANGE_WINDOW
+        out["resistance"] = np.where(enough, window.max(axis=0), np.nan)
+        out["support"] = np.where(enough, window.min(axis=0), np.nan)
+
+        returns = _tail(aligned, VOL_WINDOW + 1)
+        returns = returns[1:] / returns[:-1] - 1.0
+        vol = returns.std(axis=0, ddof=1) * np.sqrt(TRADING_DAYS) * 100
+        out["volatility_20d"] = np.where(n - 1 >= VOL_WINDOW, vol, np.nan)
+
+    if volume is not None and not volume.empty:
+        vol_aligned, vol_n = _bottom_align(volume.reindex(columns=close.columns).to_numpy(dtype=float))
+        out["volume"] = np.where(vol_n > 0, vol_aligned[-1], np.nan)
+        avg = _tail(vol_aligned, VOLUME_WINDOW).mean(axis=0)
+        out["avg_volume_10d"] = np.where(vol_n >= VOLUME_WINDOW, avg, np.nan)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            out["volume_ratio"] = np.where(out["avg_volume_10d"] > 0, out["volume"] / out["avg_volume_10d"], np.nan)
+
+    table = pd.DataFrame(out, index=close.columns)
+    table.loc[table["n_obs"] < MIN_OBS, TECHNICAL_FIELDS] = np.nan
+    return table
+
+
+def technical_dict(row: pd.Series) -> Dict[str, float]:
+    """Technical indicator fields of one table row as a dict, skipping missing values."""
+    return {f: float(row[f]) for f in TECHNICAL_FIELDS if pd.notna(row.get(f))}
+
+
+# Breadth settings: a move within +/-0.1% counts as unchanged; highs/lows over ~52 weeks of sessions
+BREADTH_THRESHOLD = 0.1
+HIGH_LOW_WINDOW = 252
+MCCLELLAN_FAST, MCCLELLAN_SLOW = 0.10, 0.05  # 19- and 39-day trends
+
+
+def compute_breadth(close: pd.DataFrame, volume: Optional[pd.DataFrame] = None,
+                    threshold: float = BREADTH_THRESHOLD) -> Dict:
+    """
+    Market breadth for the latest session of a date x symbol panel, in one vectorized pass.
+
+    Only symbols with a bar on the latest session are counted. New highs/lows compare the
+    latest close with each symbol's previous HIGH_LOW_WINDOW closes. The McClellan oscillator
+    uses ratio-adjusted net advances, (A - D) / (A + D) * 1000, so it is comparable while
+    the number of symbols with history changes.
+    """
+    if close is None or close.empty or len(close) < 2:
+        return {}
+
+    values = close.to_numpy(dtype=float)
+    traded = ~np.isnan(values[-1])
+    aligned, n = _bottom_align(values)
+    change = _lag_ratio(aligned, n, 1)
+    change[~traded] = np.nan
+
+    up, down = change > threshold, change < -threshold
+    flat = traded & ~np.isnan(change) & ~up & ~down
+    advancing, declining, unchanged = int(up.sum()), int(down.sum()), int(flat.sum())
+    total = advancing + declining + unchanged
+    if total == 0:
+        return {}
+
+    up_volume = down_volume = 0.0
+    if volume is not None and not volume.empty:
+        last_volume = np.nan_to_num(volume.reindex(index=close.index, columns=close.columns).to_numpy(dtype=float)[-1])
+        up_volume, down_volume = float(last_volume[up].sum()), float(last_volume[down].sum())
+
+    # 52-week highs/lows against the prior window of each symbol's own sessions
+    prior = aligned[-(HIGH_LOW_WINDOW + 1):-1]
+    with np.errstate(invalid="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN columns
+        prior_max, prior_min = np.nanmax(prior, axis=0), np.nanmin(prior, axis=0)
+    last = aligned[-1]
+    new_highs = int((traded & (last > prior_max)).sum())
+    new_lows = int((traded & (last < prior_min)).sum())
+
+    # Daily advances/declines across the panel for the McClellan oscillator
+    with np.errstate(invalid="ignore", divide="ignore"):
+        daily = (values[1:] / values[:-1] - 1.0) * 100.0
+    adv, dec = (daily > threshold).sum(axis=1), (daily < -threshold).sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rana = np.where(adv + dec > 0, (adv - dec) / (adv + dec) * 1000.0, 0.0)
+    rana = pd.Series(rana, index=close.index[1:])
+    oscillator = (rana.ewm(alpha=MCCLELLAN_FAST, adjust=False).mean()
+                  - rana.ewm(alpha=MCCLELLAN_SLOW, adjust=False).mean())
+
+    return {
+        "advancing": advancing,
+        "declining": declining,
+        "unchanged": unchanged,
+        "advance_decline_ratio": advancing / declining if declining > 0 else None,
+        "advance_decline_line": (advancing - declining) / total * 100,
+        "up_volume": up_volume,
+        "down_volume": down_volume,
+        "volume_ratio": up_volume / down_volume if down_volume > 0 else None,
+        "breadth_momentum": "Positive" if advancing > declining else "Negative" if declining > advancing else "Neutral",
+        "new_highs": new_highs,
+        "new_lows": new_lows,
+        "mcclellan_oscillator": float(oscillator.iloc[-1]),
+        "mcclellan_summation": float(oscillator.sum()),  # over the panel window only
+        "universe_size": int(traded.sum()),
+        "as_of": str(close.index[-1].date()) if hasattr(close.index[-1], "date") else str(close.index[-1]),
+    }
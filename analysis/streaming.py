@@ -0,0 +1,331 @@
+# analysis/streaming.py - Incremental (O(1) per bar) indicators with serializable state
+import math
+from collections import deque
+from typing import Dict, Iterable, Optional
+
+import pandas as pd
+
+
+class EMA:
+    """Exponential moving average, recursive form (pandas ewm(adjust=False)) seeded with the first value."""
+    __slots__ = ("alpha", "value")
+
+    def __init__(self, span: Optional[float] = None, alpha: Optional[float] = None):
+        self.alpha = alpha if alpha is not None else 2.0 / (span + 1.0)
+        self.value: Optional[float] = None
+
+    def update(self, x: float) -> Optional[float]:
+        self.value = x if self.value is None else (1 - self.alpha) * self.value + self.alpha * x
+        return self.value
+
+    def to_dict(self) -> Dict:
+        return {"alpha": self.alpha, "value": self.value}
+
+    @classmethod
+    def from_dict(cls, d: Dict) -> "EMA":
+        obj = cls(alpha=d["alpha"])
+        obj.value = d["value"]
+        return obj
+
+
+class RSI:
+    """Wilder RSI, identical to analysis.indicators.calculate_rsi evaluated at the latest bar."""
+    __slots__ = ("period", "prev", "gain", "loss", "count")
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self.prev: Optional[float] = None
+        self.gain = EMA(alpha=1.0 / period)
+        self.loss = EMA(alpha=1.0 / period)
+        self.count = 0
+
+    @property
+    def value(self) -> Optional[float]:
+        if self.count < self.period or not self.loss.value:
+            return None
+        return 100 - 100 / (1 + self.gain.value / self.loss.value)
+
+    def update(self, x: float) -> Optional[float]:
+        if self.prev is not None:
+            delta = x - self.prev
+            self.gain.update(max(delta, 0.0))
+            self.loss.update(max(-delta, 0.0))
+        self.prev = x
+        self.count += 1
+        return self.value
+
+    def to_dict(self) -> Dict:
+        return {"period": self.period, "prev": self.prev, "count": self.count,
+                "gain": self.gain.to_dict(), "loss": self.loss.to_dict()}
+
+    @classmethod
+    def from_dict(cls, d: Dict) -> "RSI":
+        obj = cls(d["period"])
+        obj.prev, obj.count = d["prev"], d["count"]
+        obj.gain, obj.loss = EMA.from_dict(d["gain"]), EMA.from_dict(d["loss"])
+        return obj
+
+
+class SMA:
+    """Simple moving average over the last `window` values; None until the window is full."""
+    __slots__ = ("window", "values", "total")
+
+    def __init__(self, window: int):
+        self.window = window
+        self.values: deque = deque(maxlen=window)
+        self.total = 0.0
+
+    @property
+    def value(self) -> Optional[float]:
+        return self.total / self.window if len(self.values) == self.window else None
+
+    def update(self, x: float) -> Optional[float]:
+        if len(self.values) == self.window:
+            self.total -= self.values[0]
+        self.values.append(x)
+        self.total += x
+        return self.value
+
+    def to_dict(self) -> Dict:
+        return {"window": self.window, "values": list(self.values)}
+
+    @classmethod
+    def from_dict(cls, d: Dict) -> "SMA":
+        obj = cls(d["window"])
+        for x in d["values"]:
+            obj.update(x)
+        return obj
+
+
+class RollingStd:
+    """Sample standard deviation (ddof=1) over the last `window` values, Welford add/remove updates."""
+    __slots__ = ("window", "values", "mean", "m2")
+
+    def __init__(self, window: int):
+        self.window = window
+        self.values: deque = deque()
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    @property
+    def value(self) -> Optional[float]:
+        if len(self.values) < self.window:
+            return None
+        return math.sqrt(max(self.m2, 0.0) / (self.window - 1))
+
+    def update(self, x: float) -> Optional[float]:
+        self.values.append(x)
+        n = len(self.values)
+        delta = x - self.mean
+        self.mean += delta / n
+        self.m2 += delta * (x - self.mean)
+        if n > self.window:
+            old = self.values.popleft()
+            n -= 1
+            delta = old - self.mean
+            self.mean -= delta / n
+            self.m2 -= delta * (old - self.mean)
+        return self.value
+
+    def to_dict(self) -> Dict:
+        return {"window": self.window, "values": list(self.values)}
+
+    @classmethod
+    def from_dict(cls, d: Dict) -> "RollingStd":
+        obj = cls(d["window"])
+        for x in d["values"]:
+            obj.update(x)
+        return obj
+
+
+class RollingMinMax:
+    """Rolling min and max over the last `window` values using monotonic deques (amortised O(1))."""
+    __slots__ = ("window", "count", "mins", "maxs")
+
+    def __init__(self, window: int):
+        self.window = window
+        self.count = 0
+        self.mins: deque = deque()  # (index, value), values increasing
+        self.maxs: deque = deque()  # (index, value), values decreasing
+
+    @property
+    def min(self) -> Optional[float]:
+        return self.mins[0][1] if self.count >= self.window else None
+
+    @property
+    def max(self) -> Optional[float]:
+        return self.maxs[0][1] if self.count >= self.window else None
+
+    def update(self, x: float) -> None:
+        i = self.count
+        while self.mins and self.mins[-1][1] >= x:
+            self.mins.pop()
+        while self.maxs and self.maxs[-1][1] <= x:
+            self.maxs.pop()
+        self.mins.append((i, x))
+        self.maxs.append((i, x))
+        while self.mins[0][0] <= i - self.window:
+            self.mins.popleft()
+        while self.maxs[0][0] <= i - self.window:
+            self.maxs.popleft()
+        self.count += 1
+
+    def to_dict(self) -> Dict:
+        return {"window": self.window, "count": self.count,
+                "mins": [list(p) for p in self.mins], "maxs": [list(p) for p in self.maxs]}
+
+    @classmethod
+    def from_dict(cls, d: Dict) -> "RollingMinMax":
+        obj = cls(d["window"])
+        obj.count = d["count"]
+        obj.mins = deque(tuple(p) for p in d["mins"])
+        obj.maxs = deque(tuple(p) for p in d["maxs"])
+        return obj
+
+
+class Bollinger:
+    """Bollinger bands (SMA +/- k sample std) over `window` values."""
+    __slots__ = ("k", "std", "last")
+
+    def __init__(self, window: int = 20, k: float = 2.0):
+        self.k = k
+        self.std = RollingStd(window)
+        self.last: Optional[float] = None
+
+    def update(self, x: float) -> None:
+        self.std.update(x)
+        self.last = x
+
+    @property
+    def upper(self) -> Optional[float]:
+        sd = self.std.value
+        return None if sd is None else self.std.mean + self.k * sd
+
+    @property
+    def lower(self) -> Optional[float]:
+        sd = self.std.value
+        return None if sd is None else self.std.mean - self.k * sd
+
+    @property
+    def position(self) -> Optional[float]:
+        upper, lower = self.upper, self.lower
+        if upper is None or upper - lower <= 0:
+            return None
+        return (self.last - lower) / (upper - lower)
+
+    def to_dict(self) -> Dict:
+        return {"k": self.k, "std": self.std.to_dict(), "last": self.last}
+
+    @classmethod
+    def from_dict(cls, d: Dict) -> "Bollinger":
+        obj = cls(d["std"]["window"], d["k"])
+        obj.std = RollingStd.from_dict(d["std"])
+        obj.last = d["last"]
+        return obj
+
+
+class IndicatorSet:
+    """
+    Daily indicator state for one symbol, advanced bar by bar.
+
+    `last_date` is the watermark of the last applied bar. The state before that bar is
+    kept as well, so a revised latest bar (delta refreshes re-read it) replaces rather
+    than double-counts it.
+    """
+    __slots__ = ("last_date", "rsi", "ema_20", "sma_20", "sma_50", "sma_200", "range_20", "bb", "_prev")
+
+    def __init__(self):
+        self.last_date: Optional[str] = None
+        self.rsi = RSI(14)
+        self.ema_20 = EMA(span=20)
+        self.sma_20, self.sma_50, self.sma_200 = SMA(20), SMA(50), SMA(200)
+        self.range_20 = RollingMinMax(20)
+        self.bb = Bollinger(20, 2.0)
+        self._prev: Optional[Dict] = None
+
+    def _apply(self, close: float) -> None:
+        for ind in (self.rsi, self.ema_20, self.sma_20, self.sma_50, self.sma_200, self.range_20, self.bb):
+            ind.update(close)
+
+    def update(self, date: str, close: float, revisable: bool = False) -> None:
+        """
+        Apply one bar. With `revisable`, the state before it is kept (O(window) copy) so a
+        later bar with the same date replaces it; otherwise same-date bars are ignored.
+        """
+        if close is None or (isinstance(close, float) and math.isnan(close)):
+            return
+        if self.last_date is not None and date < self.last_date:
+            return  # already applied
+        if date == self.last_date:
+            if self._prev is None:
+                return
+            self._restore(self._prev)
+        else:
+            self._prev = self._state() if revisable else None
+        self._apply(float(close))
+        self.last_date = date
+
+    def update_frame(self, bars: pd.DataFrame) -> "IndicatorSet":
+        """Apply the bars of `bars` (columns date, close) not yet covered by the watermark."""
+        if bars is None or bars.empty:
+            return self
+        dates = pd.to_datetime(bars["date"]).dt.strftime("%Y-%m-%d")
+        if self.last_date is not None:
+            keep = (dates >= self.last_date).to_numpy()
+            bars, dates = bars[keep], dates[keep]
+        closes = bars["close"].tolist()
+        for i, (date, close) in enumerate(zip(dates, closes)):
+            # Only the newest bar can still be revised by the next delta refresh
+            self.update(date, close, revisable=i == len(closes) - 1)
+        return self
+
+    def values(self) -> Dict[str, float]:
+        """Latest indicator values (same field names as analysis.panel), skipping undefined ones."""
+        out = {
+            "rsi": self.rsi.value,
+            "ema_20": self.ema_20.value,
+            "sma_20": self.sma_20.value,
+            "sma_50": self.sma_50.value,
+            "sma_200": self.sma_200.value,
+            "bb_upper": self.bb.upper,
+            "bb_lower": self.bb.lower,
+            "bb_position": self.bb.position,
+            "resistance": self.range_20.max,
+            "support": self.range_20.min,
+        }
+        return {k: float(v) for k, v in out.items() if v is not None}
+
+    def _state(self) -> Dict:
+        return {
+            "rsi": self.rsi.to_dict(),
+            "ema_20": self.ema_20.to_dict(),
+            "sma_20": self.sma_20.to_dict(),
+            "sma_50": self.sma_50.to_dict(),
+            "sma_200": self.sma_200.to_dict(),
+            "range_20": self.range_20.to_dict(),
+            "bb": self.bb.to_dict(),
+        }
+
+    def _restore(self, state: Dict) -> None:
+        self.rsi = RSI.from_dict(state["rsi"])
+        self.ema_20 = EMA.from_dict(state["ema_20"])
+        self.sma_20 = SMA.from_dict(state["sma_20"])
+        self.sma_50 = SMA.from_dict(state["sma_50"])
+        self.sma_200 = SMA.from_dict(state["sma_200"])
+        self.range_20 = RollingMinMax.from_dict(state["range_20"])
+        self.bb = Bollinger.from_dict(state["bb"])
+
+    def to_dict(self) -> Dict:
+        return {"last_date": self.last_date, "state": self._state(), "prev": self._prev}
+
+    @classmethod
+    def from_dict(cls, d: Dict) -> "IndicatorSet":
+        obj = cls()
+        obj.last_date = d.get("last_date")
+        obj._restore(d["state"])
+        obj._prev = d.get("prev")
+        return obj
+
+    @classmethod
+    def from_closes(cls, dates: Iterable[str], closes: Iterable[float]) -> "IndicatorSet":
+        return cls().update_frame(pd.DataFrame({"date": list(dates), "close": list(closes)}))
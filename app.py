@@ -1,22 +1,36 @@
 # app.py - Enhanced main application
 import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 from streamlit_autorefresh import st_autorefresh
 from streamlit_option_menu import option_menu
+import cProfile
 import logging
+import os
+import threading
+import time
+from typing import Iterable, Optional
+import plotly.graph_objects as go
 
 # Enhanced imports
 from charts.builders import create_comprehensive_charts
-from data.global_markets import get_global_market_data
-from data.us import get_enhanced_us_data, get_fed_probability, get_fred_client
-from data.vn import get_comprehensive_vn_market_data, get_index_history
-from data.te import get_comprehensive_vn_data, get_global_economic_context, calculate_economic_score
+from data.history import METRIC_SOURCES, metric_history, metric_trend, record_dashboard_metrics
+from data.sources import DEFAULT_HISTORY_PERIOD, HISTORY_PERIODS, SOURCES, source_tasks
+from data.intraday import IntradayFeed, apply_intraday, intraday_symbols
+from data.us import get_fred_client
+from data.vn import get_index_history
+from analysis.correlation import MONTHLY_PERIODS, align_series, changes, rolling_correlation, top_pairs
+from data.te import calculate_economic_score
 from ui.pages_enhanced import (
     apply_enhanced_css, enhanced_header_card,
     show_enhanced_overview_page, show_enhanced_vietnam_page,
     show_enhanced_investment_analysis_page, show_enhanced_global_markets_page
 )
-from ui.pages import show_us_economy_page, show_settings_page  # Keep original US and Settings pages
+from ui.pages import show_us_economy_page, show_settings_page, show_performance_page  # Keep original US and Settings pages
+from ui.registry import PageRequirements, page, requirements
+from utils.refresh import Snapshot, SnapshotRefresher, read_snapshots
+from utils.analytics import calculate_correlation_matrix
 from utils.logging import init_logging
+from utils.metrics import profile_report
 
 # Initialize logging
 logger = init_logging()
@@ -45,6 +59,7 @@ def main():
             "Global Context",
             "Investment Analysis",
             "Economic Research",
+            "Performance",
             "Settings"
         ],
         icons=[
@@ -54,6 +69,7 @@ def main():
             "globe",
             "graph-up",
             "bar-chart-line",
+            "stopwatch",
             "gear"
         ],
         orientation="horizontal",
@@ -71,6 +87,8 @@ def main():
         }
     )
 
+    st.session_state['current_page'] = selected
+
     # Enhanced sidebar controls
     with st.sidebar:
         st.header("🎛️ Advanced Dashboard Controls")
@@ -90,8 +108,8 @@ def main():
         st.markdown("### 📊 Data Configuration")
         data_period = st.selectbox(
             "Historical Data Period",
-            options=[6, 12, 18, 24, 36],
-            index=1,
+            options=HISTORY_PERIODS,
+            index=HISTORY_PERIODS.index(DEFAULT_HISTORY_PERIOD),
             format_func=lambda x: f"{x} months"
         )
 
@@ -129,25 +147,28 @@ def main():
         st.markdown("### 📈 Quick Stats")
         st.markdown(f"**Session Time**: {st.session_state.get('session_start', 'New Session')}")
         st.markdown(f"**Data Sources**: 4 Active")
-        st.markdown(f"**Last Update**: {st.session_state.get('last_update', 'Loading...')}")
+        data_age_slot = st.empty()
 
-    # Data loading with enhanced error handling and caching
+    # Load only the sources and charts the selected page declares
+    reqs = requirements(PAGES[selected], RAW_DATA_REQUIREMENTS if show_raw_data else None)
     try:
         with st.spinner("🔄 Loading comprehensive economic data..."):
-            # Load all data sources
-            data_sources = load_all_data(data_period)
+            data_sources = load_all_data(data_period, reqs.all_sources)
 
             # Update session state
-            st.session_state['last_update'] = data_sources['timestamp']
-            if 'session_start' not in st.session_state:
-                st.session_state['session_start'] = data_sources['timestamp']
+            if data_sources['timestamp']:
+                st.session_state['last_update'] = data_sources['timestamp']
+                if 'session_start' not in st.session_state:
+                    st.session_state['session_start'] = data_sources['timestamp']
 
-            # Create comprehensive charts
+            # Create the charts this page renders
             charts = create_comprehensive_charts(
                 data_sources['us_series'],
                 data_sources['vn_market'],
                 data_sources['vn_economic'],
-                data_sources['global_context']
+                data_sources['global_context'],
+                only=reqs.charts,
+                theme=chart_theme
             )
 
     except Exception as e:
@@ -155,6 +176,20 @@ def main():
         logger.error(f"Data loading failed: {e}")
         st.stop()
 
+    # Snapshot age (data may be served while a background refresh is running)
+    ages = data_sources['snapshot_ages']
+    if ages:
+        refreshing = " · 🔄 refreshing" if not READ_ONLY and get_data_refresher(data_period).refreshing else ""
+        with data_age_slot.container():
+            st.markdown(f"**Last Update**: {data_sources['timestamp']}")
+            st.markdown(f"**Data Age**: {_format_age(max(ages.values()))}{refreshing}")
+            if data_sources['vn_market'].get('intraday_as_of'):
+                st.markdown(f"**Intraday**: {data_sources['vn_market']['intraday_as_of']} (Asia/Ho_Chi_Minh)")
+            with st.expander("Source ages"):
+                for name, age in ages.items():
+                    error = " ⚠️" if name in data_sources['source_errors'] else ""
+                    st.caption(f"{name}: {_format_age(age)}{error}")
+
     # Route to enhanced pages
     if selected == "Executive Overview":
         show_enhanced_overview_page(
@@ -199,7 +234,8 @@ def main():
             data_sources['vn_economic'],
             data_sources['fed_data'],
             data_sources['global_context'],
-            risk_tolerance
+            risk_tolerance,
+            charts
         )
 
     elif selected == "Economic Research":
@@ -210,6 +246,10 @@ def main():
             show_economic_score
         )
 
+    elif selected == "Performance":
+        show_performance_page(get_data_refresher(data_period).last_refresh if not READ_ONLY else {},
+                              st.session_state.get('last_profile'))
+
     elif selected == "Settings":
         show_settings_page(get_fred_client)
 
@@ -218,52 +258,114 @@ def main():
         show_raw_data_section(data_sources)
 
 
-@st.cache_data(ttl=600, show_spinner=False)  # 10-minute cache
-def load_all_data(data_period: int) -> dict:
-    """Load all data sources with enhanced error handling."""
-    import datetime as dt
+# Snapshots older than this are revalidated in the background
+SNAPSHOT_MAX_AGE = 600
 
-    data_sources = {
-        'timestamp': dt.datetime.now(tz=dt.timezone.utc).strftime('%Y-%m-%d %H:%M:%S UTC')
-    }
+# With ECOTRACK_INGEST=daemon the app only reads snapshots published by `python -m ingest`
+READ_ONLY = os.getenv("ECOTRACK_INGEST", "local").lower() == "daemon"
 
-    try:
-        # US economic data
-        logger.info("Loading US economic data...")
-        data_sources['us_data'], data_sources['us_series'] = get_enhanced_us_data(data_period)
+# With ECOTRACK_INTRADAY=1, index and VN30 figures follow minute bars during trading sessions
+INTRADAY = os.getenv("ECOTRACK_INTRADAY", "0") == "1"
 
-        # Fed data
-        logger.info("Loading Fed probability data...")
-        data_sources['fed_data'] = get_fed_probability()
 
-        # Vietnam market data (enhanced)
-        logger.info("Loading Vietnam market data...")
-        data_sources['vn_market'] = get_comprehensive_vn_market_data()
+def _with_script_ctx():
+    """Wrapper that attaches the caller's Streamlit script context to worker threads (session state, secrets)."""
+    ctx = get_script_run_ctx()
 
-        # Vietnam economic data (Trading Economics)
-        logger.info("Loading Vietnam economic indicators...")
-        data_sources['vn_economic'] = get_comprehensive_vn_data()
+    def wrap(fn):
+        def runner(**kwargs):
+            if ctx is not None:
+                add_script_run_ctx(threading.current_thread(), ctx)
+            return fn(**kwargs)
+        return runner
 
-        # Global context data
-        logger.info("Loading global economic context...")
-        data_sources['global_context'] = get_global_economic_context()
+    return wrap
 
-        # Global markets (existing)
-        logger.info("Loading global markets data...")
-        data_sources['global_markets'] = get_global_market_data()
 
-        logger.info("All data sources loaded successfully")
+@st.cache_resource(show_spinner=False)
+def get_data_refresher(data_period: int) -> SnapshotRefresher:
+    """One process-wide refresher per history period, shared by every session."""
+    return SnapshotRefresher(lambda: source_tasks(data_period), max_age=SNAPSHOT_MAX_AGE)
 
-    except Exception as e:
-        logger.error(f"Error loading data sources: {e}")
-        # Ensure we have at least empty dictionaries to prevent errors
-        for key in ['us_data', 'us_series', 'fed_data', 'vn_market', 'vn_economic', 'global_context', 'global_markets']:
-            if key not in data_sources:
-                data_sources[key] = {}
+
+@st.cache_resource(show_spinner=False)
+def get_intraday_feed() -> IntradayFeed:
+    """One process-wide minute-bar poller; it idles outside trading hours."""
+    return IntradayFeed(intraday_symbols()).start()
+
+
+def _format_age(seconds: float) -> str:
+    seconds = max(int(seconds), 0)
+    if seconds < 60:
+        return f"{seconds}s"
+    if seconds < 3600:
+        return f"{seconds // 60}m {seconds % 60:02d}s"
+    return f"{seconds // 3600}h {seconds % 3600 // 60:02d}m"
+
+
+def load_all_data(data_period: int, names: Optional[Iterable[str]] = None) -> dict:
+    """
+    Assemble the latest snapshot of the requested data sources (default: all).
+
+    Only the first request for a source waits for it; afterwards the last good
+    snapshot is returned at once while stale sources refresh in the background.
+    Sources that were not requested hold their empty defaults.
+    """
+    import datetime as dt
+
+    names = list(SOURCES) if names is None else [n for n in SOURCES if n in set(names)]
+    keys = {name: SOURCES[name].key(data_period) for name in names}
+    if not keys:
+        snapshots = {}
+    elif READ_ONLY:
+        published = read_snapshots(list(keys.values()))
+        now = time.time()
+        snapshots = {
+            name: published.get(key) or Snapshot(SOURCES[name].default, now,
+                                                 error="not published by ingestion daemon yet")
+            for name, key in keys.items()
+        }
+    else:
+        latest = get_data_refresher(data_period).get(wrap=_with_script_ctx(), names=list(keys.values()))
+        snapshots = {name: latest[key] for name, key in keys.items()}
+
+    values = {name: SOURCES[name].default for name in SOURCES}
+    values.update({name: s.value for name, s in snapshots.items()})
+
+    oldest = min((s.fetched_at for s in snapshots.values()), default=None)
+    data_sources = {
+        'timestamp': (dt.datetime.fromtimestamp(oldest, tz=dt.timezone.utc).strftime('%Y-%m-%d %H:%M:%S UTC')
+                      if oldest is not None else None)
+    }
+
+    data_sources['us_data'], data_sources['us_series'] = values['us']
+    for name in ['fed_data', 'vn_market', 'vn_economic', 'global_context', 'global_markets', 'market_history']:
+        data_sources[name] = values[name]
+
+    if INTRADAY and data_sources['vn_market']:
+        data_sources['vn_market'] = apply_intraday(data_sources['vn_market'], get_intraday_feed())
+
+    data_sources['snapshot_ages'] = {name: round(s.age, 1) for name, s in snapshots.items()}
+    data_sources['source_timings'] = {name: round(s.elapsed, 3) for name, s in snapshots.items()}
+    data_sources['source_errors'] = {name: s.error for name, s in snapshots.items() if s.error}
+
+    if data_sources['source_errors']:
+        logger.error(f"Error loading data sources: {data_sources['source_errors']}")
+
+    # Snapshot the computed metrics once per new data (later reruns find them already recorded)
+    inputs = [snapshots[n] for n in METRIC_SOURCES if n in snapshots and not snapshots[n].error]
+    if inputs:
+        try:
+            record_dashboard_metrics(data_sources['us_data'], data_sources['vn_market'], data_sources['vn_economic'],
+                                     data_sources['global_context'],
+                                     dt.datetime.fromtimestamp(max(s.fetched_at for s in inputs), tz=dt.timezone.utc))
+        except Exception as e:
+            logger.warning(f"Failed to record metric snapshot: {e}")
 
     return data_sources
 
 
+@page(sources=['vn_economic', 'vn_market', 'fed_data', 'market_history'])
 def show_economic_research_page(data_sources: dict, charts: dict, show_correlations: bool, show_economic_score: bool):
     """Advanced economic research and analysis page."""
     st.header("🔬 Economic Research & Advanced Analytics")
@@ -280,12 +382,18 @@ def show_economic_research_page(data_sources: dict, charts: dict, show_correlati
             st.metric("Economic Score", f"{economic_score:.0f}/100", rating)
 
         with col2:
-            # Score trend (would need historical data in real implementation)
-            score_change = st.session_state.get('prev_economic_score', economic_score)
-            trend = economic_score - score_change
-            st.metric("Score Trend", f"{trend:+.1f}",
-                      "Improving" if trend > 0 else "Declining" if trend < 0 else "Stable")
-            st.session_state['prev_economic_score'] = economic_score
+            trend = metric_trend('economic_score')
+            if trend:
+                change = trend['change']
+                st.metric("Score Trend", f"{change:+.1f}",
+                          "Improving" if change > 0 else "Declining" if change < 0 else "Stable",
+                          help=f"Change since {trend['since']:%Y-%m-%d %H:%M} UTC")
+            else:
+                st.metric("Score Trend", "n/a", "Recording history", delta_color="off")
+
+            history = metric_history('economic_score')
+            if len(history) > 1:
+                st.line_chart(history, height=120)
 
         with col3:
             st.markdown("**Key Economic Factors:**")
@@ -314,51 +422,48 @@ def show_economic_research_page(data_sources: dict, charts: dict, show_correlati
         show_global_linkages(data_sources)
 
 
-def show_correlation_analysis(data_sources: dict):
-    """Show correlation analysis between different economic indicators."""
-    st.markdown("### 🔗 Economic Indicator Correlations")
+# Change horizons offered by the correlation tab (business days) and the rolling window
+CORRELATION_HORIZONS = {"Daily": 1, "Weekly": 5, "Monthly": MONTHLY_PERIODS}
+ROLLING_WINDOW = 63
 
-    # This would ideally use historical time series data
-    # For now, showing conceptual correlations
 
-    correlation_insights = [
-        {
-            "pair": "US Fed Rate ↔ VN-Index",
-            "correlation": -0.65,
-            "interpretation": "Strong negative correlation - higher US rates typically pressure VN stocks"
-        },
-        {
-            "pair": "USD/VND ↔ Foreign Investment",
-            "correlation": -0.52,
-            "interpretation": "Moderate negative correlation - VND strength attracts foreign capital"
-        },
-        {
-            "pair": "Vietnam GDP ↔ VN30 Performance",
-            "correlation": 0.73,
-            "interpretation": "Strong positive correlation - economic growth drives market performance"
-        },
-        {
-            "pair": "Oil Prices ↔ Vietnam Inflation",
-            "correlation": 0.45,
-            "interpretation": "Moderate positive correlation - energy costs impact inflation"
-        },
-        {
-            "pair": "China PMI ↔ Vietnam Exports",
-            "correlation": 0.58,
-            "interpretation": "Moderate positive correlation - China demand affects Vietnam exports"
-        }
-    ]
+def show_correlation_analysis(data_sources: dict):
+    """Correlations between market, FRED, Trading Economics and Yahoo series over the history period."""
+    st.markdown("### 🔗 Economic Indicator Correlations")
 
-    for insight in correlation_insights:
-        col1, col2, col3 = st.columns([2, 1, 3])
+    history = data_sources.get('market_history') or {}
+    if len(history) < 2:
+        st.info("Historical series are not available yet - correlations appear after the next refresh.")
+        return
+
+    horizon = st.radio("Change horizon", list(CORRELATION_HORIZONS), index=2, horizontal=True,
+                       help="Monthly changes suit the monthly/quarterly macro series; daily changes suit market pairs")
+    periods = CORRELATION_HORIZONS[horizon]
+    matrix = calculate_correlation_matrix(history, periods=periods).dropna(how='all').dropna(how='all', axis=1)
+    if matrix.shape[0] < 2:
+        st.info("Not enough overlapping history to correlate these series.")
+        return
+
+    fig = go.Figure(go.Heatmap(z=matrix.values, x=matrix.columns, y=matrix.index, zmin=-1, zmax=1,
+                               colorscale='RdBu', hovertemplate='%{y} ↔ %{x}: %{z:.2f}<extra></extra>'))
+    fig.update_layout(height=max(400, 22 * len(matrix)), margin=dict(l=10, r=10, t=30, b=10))
+    st.plotly_chart(fig, use_container_width=True)
+
+    # Strongest cross-source pairs, full period vs the latest rolling window
+    panel = changes(align_series({name: history[name] for name in matrix.columns}), periods)
+    pairs = [(a, b, c) for a, b, c in top_pairs(matrix, limit=40) if a.split(':')[0] != b.split(':')[0]][:8]
+    for a, b, corr in pairs:
+        recent = rolling_correlation(panel[[a, b]], ROLLING_WINDOW, min_periods=ROLLING_WINDOW // 2)
+        latest = recent.xs(a, level=1)[b].dropna()
+        col1, col2, col3 = st.columns([3, 1, 2])
         with col1:
-            st.write(f"**{insight['pair']}**")
+            st.write(f"**{a} ↔ {b}**")
         with col2:
-            corr = insight['correlation']
             color = "🟢" if abs(corr) > 0.6 else "🟡" if abs(corr) > 0.4 else "🔴"
             st.write(f"{color} {corr:.2f}")
         with col3:
-            st.write(insight['interpretation'])
+            if not latest.empty:
+                st.write(f"Last {ROLLING_WINDOW} days: {latest.iloc[-1]:+.2f} ({latest.iloc[-1] - corr:+.2f} vs period)")
 
 
 def show_trend_analysis(data_sources: dict, charts: dict):
@@ -528,9 +633,40 @@ def show_raw_data_section(data_sources: dict):
         st.json(data_sources['global_context'])
 
 
-if __name__ == "__main__":
+# Navigation entry -> page function; each page's @page declaration drives lazy loading
+PAGES = {
+    "Executive Overview": show_enhanced_overview_page,
+    "US Economy": show_us_economy_page,
+    "Vietnam Markets": show_enhanced_vietnam_page,
+    "Global Context": show_enhanced_global_markets_page,
+    "Investment Analysis": show_enhanced_investment_analysis_page,
+    "Economic Research": show_economic_research_page,
+    "Performance": show_performance_page,
+    "Settings": show_settings_page,
+}
+
+# Sources shown by the optional raw data explorer
+RAW_DATA_REQUIREMENTS = PageRequirements(sources=frozenset({'us', 'vn_market', 'vn_economic', 'global_context'}))
+
+
+def run_profiled():
+    """Run one rerun under cProfile (armed from the Performance page) and keep the report in the session."""
+    profiler = cProfile.Profile()
+    profiler.enable()
     try:
         main()
+    finally:
+        profiler.disable()
+        st.session_state['last_profile'] = {**profile_report(profiler),
+                                            'page': st.session_state.get('current_page', '?')}
+
+
+if __name__ == "__main__":
+    try:
+        if st.session_state.pop('profile_next_run', False):
+            run_profiled()
+        else:
+            main()
     except Exception as e:
         st.error(f"❌ Application error: {str(e)}")
         logger.error(f"Application failed: {e}")
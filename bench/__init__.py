@@ -0,0 +1 @@
+# bench/__init__.py - Offline benchmark suite: `python -m bench --help`
@@ -0,0 +1,6 @@
+# bench/__main__.py - Entry point for `python -m bench`
+import sys
+
+from bench.suite import main
+
+sys.exit(main())
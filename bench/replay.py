@@ -0,0 +1,325 @@
+# bench/replay.py - Recorded or synthetic provider responses served through the shared HTTP client with injected latency
+import asyncio
+import datetime as dt
+import hashlib
+import itertools
+import json
+import logging
+import random
+import string
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import unquote, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from data import global_markets
+from data.te import GLOBAL_INDICATORS, TE_VN_INDICATORS
+from data.vn import TCBS_BARS_URL, TCBS_INTRADAY_URL, VIETNAM_INDICES, _stock_universe
+from utils import http
+from utils.metrics import REGISTRY
+from utils.ratelimit import get_rate_limiter
+
+logger = logging.getLogger(__name__)
+
+FIXTURE_DIR = Path(__file__).parent / "fixtures"
+# Request parameters that change between runs (dates, credentials) and are left out of fixture keys
+VOLATILE_PARAMS = {"api_key", "c", "from", "to", "countBack", "observation_start", "d1"}
+YAHOO_URL = "yahoo://history"
+HISTORY_START = "2015-01-01"  # first synthetic bar
+MARKET_TZ = dt.timezone(dt.timedelta(hours=7))
+PERIOD_DAYS = {"d": 1, "wk": 7, "mo": 31, "y": 365}
+
+
+def fixture_key(url: str, params: Optional[Dict] = None) -> str:
+    stable = sorted((k, str(v)) for k, v in (params or {}).items() if k not in VOLATILE_PARAMS)
+    return url + ("?" + "&".join(f"{k}={v}" for k, v in stable) if stable else "")
+
+
+def _rng(*parts: Any) -> np.random.Generator:
+    """Generator seeded from `parts`, so a symbol or series always gets the same synthetic data."""
+    return np.random.default_rng(zlib.crc32("|".join(map(str, parts)).encode()))
+
+
+def _walk(rng: np.random.Generator, n: int, start: float = 100.0, vol: float = 0.02) -> np.ndarray:
+    return start * np.exp(np.cumsum(rng.normal(0.0003, vol, n)))
+
+
+def _iso(epoch: int) -> str:
+    return dt.datetime.fromtimestamp(int(epoch), MARKET_TZ).isoformat()
+
+
+def _period_days(period: str) -> int:
+    for suffix, days in PERIOD_DAYS.items():
+        if period.endswith(suffix) and period[:-len(suffix)].isdigit():
+            return int(period[:-len(suffix)]) * days
+    return 365
+
+
+class Fixtures:
+    """Recorded responses, one JSON file per request key under `directory`."""
+
+    def __init__(self, directory: Path = FIXTURE_DIR):
+        self.directory = Path(directory)
+        self._responses: Dict[str, str] = {}
+        for path in sorted(self.directory.glob("*.json")):
+            try:
+                entry = json.loads(path.read_text())
+                self._responses[entry["key"]] = json.dumps(entry["response"])
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"Skipping unreadable fixture {path.name}: {e}")
+
+    def __len__(self) -> int:
+        return len(self._responses)
+
+    def get(self, url: str, params: Optional[Dict] = None) -> Tuple[bool, Any]:
+        raw = self._responses.get(fixture_key(url, params))
+        # Decoded on every replay, as the live client decodes every response body
+        return (True, json.loads(raw)) if raw is not None else (False, None)
+
+    def save(self, url: str, params: Optional[Dict], response: Any) -> None:
+        key = fixture_key(url, params)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        name = hashlib.blake2b(key.encode(), digest_size=8).hexdigest()
+        (self.directory / f"{name}.json").write_text(json.dumps({"key": key, "response": response}))
+        self._responses[key] = json.dumps(response)
+
+
+class Synthetic:
+    """Deterministic stand-in responses for every endpoint the adapters call, for requests with no recording."""
+
+    def __init__(self, today: Optional[dt.date] = None):
+        self.today = today or dt.date.today()
+        self._histories: Dict[str, Tuple[np.ndarray, ...]] = {}
+
+    def respond(self, url: str, params: Optional[Dict] = None) -> Any:
+        params = params or {}
+        path = urlsplit(url).path
+        if url in (TCBS_BARS_URL, TCBS_INTRADAY_URL):
+            return self.tcbs_bars(params["ticker"], int(params["from"]), int(params["to"]), params.get("resolution", "D"))
+        if "/ticker/" in path and path.endswith("/overview"):
+            return self.tcbs_overview(path.split("/ticker/")[1].split("/")[0])
+        if path.endswith("/fred/series/observations"):
+            return self.fred_observations(params["series_id"], params.get("observation_start"))
+        if path.endswith("/fred/series"):
+            return {"seriess": [{"id": params["series_id"], "last_updated": f"{self.today} 07:45:00-05"}]}
+        if path.startswith("/indicators/country/"):
+            return self.te_country(path.rsplit("/", 1)[1])
+        if path.startswith("/historical/country/"):
+            return self.te_history(unquote(path.rsplit("/", 1)[1]), params.get("d1"))
+        logger.warning(f"No synthetic response for {url}")
+        return None
+
+    def _daily(self, symbol: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Business-day epoch seconds, closes, volumes and ranges of `symbol` since HISTORY_START, built once."""
+        history = self._histories.get(symbol)
+        if history is None:
+            dates = pd.bdate_range(HISTORY_START, self.today, tz=MARKET_TZ)
+            rng = _rng("tcbs", symbol)
+            close = _walk(rng, len(dates), 1000.0 if symbol in VIETNAM_INDICES else 30.0, 0.015)
+            volume = rng.integers(10_000, 5_000_000, len(dates)).astype(float)
+            spread = np.abs(rng.normal(0, 0.005, len(dates)))
+            history = self._histories[symbol] = (dates.as_unit("s").asi8, close, volume, spread)
+        return history
+
+    def prime(self, symbols: List[str]) -> None:
+        """Build the daily histories up front, so generating them is not timed as part of a request."""
+        for symbol in symbols:
+            self._daily(symbol)
+
+    def tcbs_bars(self, symbol: str, start: int, end: int, resolution: str) -> Dict:
+        times, close, volume, spread = self._daily(symbol)
+        if resolution == "D":
+            window = slice(np.searchsorted(times, start, "left"), np.searchsorted(times, end, "right"))
+            rows = zip(times[window], close[window], volume[window], spread[window])
+        else:
+            # Today's sessions minute by minute, drifting from the last daily close
+            day = pd.Timestamp(self.today, tz=MARKET_TZ)
+            minutes = (pd.date_range(day + pd.Timedelta(hours=9), periods=150, freq="min")
+                       .append(pd.date_range(day + pd.Timedelta(hours=13), periods=105, freq="min")))
+            rng = _rng("minute", symbol, self.today)
+            rows = zip(minutes.as_unit("s").asi8, _walk(rng, len(minutes), close[-1], 0.001),
+                       np.full(len(minutes), volume[-1] / len(minutes)), np.full(len(minutes), 0.001))
+        return {"ticker": symbol, "data": [
+            {"open": round(c * (1 - s / 2), 2), "high": round(c * (1 + s), 2), "low": round(c * (1 - s), 2),
+             "close": round(c, 2), "volume": v, "tradingDate": _iso(t)}
+            for t, c, v, s in rows
+        ]}
+
+    def tcbs_overview(self, symbol: str) -> Dict:
+        rng = _rng("overview", symbol)
+        return {"ticker": symbol, "outstandingShare": float(rng.uniform(100, 8000)),
+                "freeFloat": float(rng.uniform(0.1, 0.9))}
+
+    def fred_observations(self, series_id: str, start: Optional[str]) -> Dict:
+        dates = pd.date_range(start or HISTORY_START, self.today, freq="MS")
+        values = _walk(_rng("fred", series_id), len(dates), 5.0, 0.01)
+        return {"observations": [{"date": d.strftime("%Y-%m-%d"), "value": f"{v:.3f}"} for d, v in zip(dates, values)]}
+
+    def te_country(self, country: str) -> List[Dict]:
+        names = [m["te"] for m in TE_VN_INDICATORS.values()] + [m["te"] for m in GLOBAL_INDICATORS.values()]
+        rng = _rng("te", country)
+        items = []
+        for name in dict.fromkeys(names):
+            last = float(rng.uniform(1, 100))
+            items.append({"Country": country, "Category": name, "Last": round(last, 2),
+                          "Previous": round(last * rng.uniform(0.95, 1.05), 2),
+                          "Date": f"{self.today}T00:00:00", "Unit": "%"})
+        return items
+
+    def te_history(self, indicator: str, start: Optional[str]) -> List[Dict]:
+        dates = pd.date_range(start or "2020-01-01", self.today, freq="ME")
+        values = _walk(_rng("te-history", indicator), len(dates), 5.0, 0.03)
+        return [{"DateTime": d.isoformat(), "Date": d.strftime("%Y-%m-%d"), "Value": round(v, 3)}
+                for d, v in zip(dates, values)]
+
+    def yahoo_history(self, symbol: str, period: str) -> pd.DataFrame:
+        days = _period_days(period)
+        dates = pd.bdate_range(end=pd.Timestamp(self.today), periods=max(days * 5 // 7, 2))
+        rng = _rng("yahoo", symbol)
+        close = _walk(rng, len(dates), 100.0, 0.01)
+        return pd.DataFrame({"Open": close, "High": close * 1.005, "Low": close * 0.995, "Close": close,
+                             "Volume": rng.integers(1e5, 1e7, len(dates)).astype(float)}, index=dates)
+
+
+class ReplayTransport:
+    """
+    Stand-in for AsyncHttp.get_json: waits the injected latency (at most `per_host`
+    requests in flight per host, like the live connection pool), then returns the
+    recorded response or a synthetic one. Provider rate limits apply only if asked.
+    """
+
+    def __init__(self, fixtures: Fixtures, synthetic: Synthetic, latency: float = 0.05, jitter: float = 0.5,
+                 per_host: int = http.POOL_LIMIT_PER_HOST, rate_limits: bool = False):
+        self.fixtures = fixtures
+        self.synthetic = synthetic
+        self.latency = latency
+        self.jitter = jitter
+        self.per_host = per_host
+        self.rate_limits = rate_limits
+        self.replayed = self.synthesized = 0
+        self._gates: Dict[str, asyncio.Semaphore] = {}
+
+    def delay(self) -> float:
+        return max(0.0, self.latency * (1 + random.uniform(-self.jitter, self.jitter)))
+
+    async def get_json(self, url: str, params: Optional[Dict] = None, provider: Optional[str] = None,
+                       headers: Optional[Dict] = None, timeout: Optional[float] = None,
+                       retries: int = http.RETRIES) -> Optional[Any]:
+        host = urlsplit(url).netloc
+        gate = self._gates.setdefault(host, asyncio.Semaphore(self.per_host))
+        started = time.perf_counter()
+        async with gate:
+            if self.rate_limits and provider:
+                await get_rate_limiter(provider).acquire_async()
+            await asyncio.sleep(self.delay())
+        found, response = self.fixtures.get(url, params)
+        if found:
+            self.replayed += 1
+        else:
+            response = self.synthetic.respond(url, params)
+            self.synthesized += 1
+        REGISTRY.inc("http_requests_total", provider=provider or "", status="replay")
+        REGISTRY.observe("http_request_seconds", time.perf_counter() - started, provider=provider or "")
+        return response
+
+    def install(self) -> Callable[[], None]:
+        """Route the shared HTTP client through this transport; returns a function that undoes it."""
+        http.HTTP.get_json = self.get_json
+        return lambda: http.HTTP.__dict__.pop("get_json", None)
+
+
+class ReplayYahoo:
+    """Replaces the yfinance module used by data.global_markets (download / Ticker.history)."""
+
+    def __init__(self, fixtures: Fixtures, synthetic: Synthetic, latency: float = 0.05):
+        self.fixtures = fixtures
+        self.synthetic = synthetic
+        self.latency = latency
+        self.replayed = self.synthesized = 0
+
+    def _history(self, symbol: str, period: str, interval: str) -> pd.DataFrame:
+        found, response = self.fixtures.get(YAHOO_URL, {"symbol": symbol, "period": period, "interval": interval})
+        if found:
+            self.replayed += 1
+            return pd.DataFrame(response["data"], index=pd.to_datetime(response["index"]), columns=response["columns"])
+        self.synthesized += 1
+        return self.synthetic.yahoo_history(symbol, period)
+
+    def download(self, tickers, period: str = "1mo", interval: str = "1d", group_by: str = "column", **_) -> pd.DataFrame:
+        time.sleep(self.latency)  # one request per download call, like a batched yfinance download
+        if isinstance(tickers, str):
+            return self._history(tickers, period, interval)
+        frames = {t: self._history(t, period, interval) for t in tickers}
+        return pd.concat(frames, axis=1) if group_by == "ticker" else pd.concat(frames, axis=1).swaplevel(axis=1)
+
+    def Ticker(self, symbol: str):
+        yahoo = self
+
+        class _Ticker:
+            def history(self, period: str = "1mo", interval: str = "1d", **_):
+                return yahoo.download(symbol, period=period, interval=interval)
+
+        return _Ticker()
+
+    def install(self) -> Callable[[], None]:
+        original = global_markets.yf
+        global_markets.yf = self
+        return lambda: setattr(global_markets, "yf", original)
+
+
+class Recorder:
+    """Saves every live TCBS/FRED/TE response and Yahoo history as a fixture while the adapters run normally."""
+
+    def __init__(self, fixtures: Fixtures):
+        self.fixtures = fixtures
+        self.count = 0
+
+    def install(self) -> Callable[[], None]:
+        live_get_json = http.HTTP.get_json
+        live_yf = global_markets.yf
+        recorder = self
+
+        async def get_json(url, params=None, provider=None, **kwargs):
+            response = await live_get_json(url, params, provider, **kwargs)
+            if response is not None:
+                recorder.fixtures.save(url, params, response)
+                recorder.count += 1
+            return response
+
+        class _RecordingYahoo:
+            def __getattr__(self, name):
+                return getattr(live_yf, name)
+
+            def download(self, tickers, period="1mo", interval="1d", **kwargs):
+                raw = live_yf.download(tickers, period=period, interval=interval, **kwargs)
+                symbols = [tickers] if isinstance(tickers, str) else list(tickers)
+                for symbol in symbols:
+                    try:
+                        frame = raw if len(symbols) == 1 and not isinstance(raw.columns, pd.MultiIndex) else (
+                            raw.xs(symbol, axis=1, level=0 if kwargs.get("group_by") == "ticker" else 1))
+                        params = {"symbol": symbol, "period": period, "interval": interval}
+                        recorder.fixtures.save(YAHOO_URL, params, json.loads(frame.to_json(orient="split", date_format="iso")))
+                        recorder.count += 1
+                    except (KeyError, ValueError):
+                        continue
+                return raw
+
+        http.HTTP.get_json = get_json
+        global_markets.yf = _RecordingYahoo()
+
+        def undo():
+            http.HTTP.__dict__.pop("get_json", None)
+            global_markets.yf = live_yf
+        return undo
+
+
+def synthetic_universe(size: int) -> List[str]:
+    """The tracked stocks followed by deterministic three-letter codes, `size` symbols in all."""
+    tracked = _stock_universe()
+    codes = ("".join(c) for c in itertools.product(string.ascii_uppercase, repeat=3))
+    extra = (c for c in codes if c not in set(tracked) and c not in VIETNAM_INDICES)
+    return (tracked + list(itertools.islice(extra, max(size - len(tracked), 0))))[:size]
@@ -0,0 +1,316 @@
+# bench/suite.py - Offline benchmarks of data loading, analytics and chart building against replayed providers
+import argparse
+import datetime as dt
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+UNIVERSES = [60, 600, 1600]
+DEFAULT_LATENCY = 0.05  # seconds per replayed request
+DEFAULT_REPEAT = 3
+REGRESSION_THRESHOLD = 1.2  # median slower than baseline by this factor fails --compare
+
+
+def _isolate(workdir: Path) -> None:
+    """
+    Point every store and cache at `workdir` (the log file beside it) and turn off side effects (metric history,
+    intraday polling) before the data modules are imported, since they read these at import.
+    """
+    os.environ["ECOTRACK_CACHE_DIR"] = str(workdir)
+    os.environ["ECOTRACK_LOG_FILE"] = str(workdir.with_suffix(".log"))  # beside it: cold resets empty workdir
+    os.environ["ECOTRACK_CACHE_BACKEND"] = "memory"
+    os.environ["ECOTRACK_METRIC_HISTORY"] = "0"
+    os.environ["ECOTRACK_INGEST"] = "local"
+    os.environ["ECOTRACK_INTRADAY"] = "0"
+    os.environ.setdefault("FRED_API_KEY", "replay")
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=Path(__file__).parent, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+class Suite:
+    """Runs every benchmark for one universe size and collects {group, name, runs, ...} results."""
+
+    def __init__(self, args: argparse.Namespace, workdir: Path):
+        # Imported here: the modules read the environment set by _isolate at import time
+        import app
+        from bench import replay
+        from charts.cache import CHART_CACHE
+        from data import us, vn
+        from utils.cache import MemoryBackend, set_backend
+        from utils.metrics import REGISTRY
+
+        self.args = args
+        self.workdir = workdir
+        self.app, self.us, self.vn, self.replay = app, us, vn, replay
+        self.chart_cache, self.registry = CHART_CACHE, REGISTRY
+        self._set_backend, self._memory_backend = set_backend, MemoryBackend
+        self.results: List[Dict[str, Any]] = []
+        # Bare-mode Streamlit warns about the missing script context on every cached call
+        for name in list(logging.root.manager.loggerDict):
+            if name.startswith("streamlit"):
+                logging.getLogger(name).setLevel(logging.ERROR)
+
+        fixtures = replay.Fixtures(Path(args.fixtures))
+        self.synthetic = replay.Synthetic()
+        self.transport = replay.ReplayTransport(fixtures, self.synthetic, latency=args.latency,
+                                                jitter=args.jitter, rate_limits=args.rate_limits)
+        self.yahoo = replay.ReplayYahoo(fixtures, self.synthetic, latency=args.latency)
+
+    def reset(self, cold: bool = True) -> None:
+        """Forget every in-process cache; `cold` also empties the on-disk bar, FRED and TE stores."""
+        self._set_backend(self._memory_backend())
+        self.app.get_data_refresher.clear()
+        self.us._fetcher._entries.clear()
+        self.chart_cache.clear()
+        if cold:
+            for child in self.workdir.iterdir():
+                shutil.rmtree(child) if child.is_dir() else child.unlink()
+
+    def measure(self, universe: int, group: str, name: str, fn: Callable[[], Any],
+                before: Optional[Callable[[], None]] = None) -> Any:
+        """Time `fn` `repeat` times (calling `before` untimed ahead of each run); returns the last result."""
+        runs, requests, result = [], [], None
+        for _ in range(self.args.repeat):
+            if before is not None:
+                before()
+            sent = self.registry.total("http_requests_total")
+            started = time.perf_counter()
+            try:
+                result = fn()
+            except Exception as e:
+                logger.warning(f"{group}/{name} failed: {e}")
+                self.results.append({"universe": universe, "group": group, "name": name, "error": str(e)})
+                return None
+            runs.append(time.perf_counter() - started)
+            requests.append(int(self.registry.total("http_requests_total") - sent))
+        self.results.append({
+            "universe": universe, "group": group, "name": name, "runs": [round(r, 6) for r in runs],
+            "min": round(min(runs), 6), "median": round(statistics.median(runs), 6),
+            "mean": round(statistics.fmean(runs), 6), "requests": max(requests),
+        })
+        print(f"  {group:<10} {name:<48} median {statistics.median(runs) * 1000:9.1f} ms"
+              f"  ({max(requests)} requests)", flush=True)
+        return result
+
+    def run(self, universe: int) -> None:
+        symbols = self.replay.synthetic_universe(universe)
+        self.vn.get_listed_universe = lambda: list(symbols)
+        self.synthetic.prime([*self.vn.VIETNAM_INDICES, *symbols])
+        print(f"Universe {universe} ({self.args.latency * 1000:.0f} ms latency)", flush=True)
+
+        period = self.args.period
+        self.measure(universe, "load", "load_all_data (cold)", lambda: self.app.load_all_data(period),
+                     before=lambda: self.reset(cold=True))
+        self.measure(universe, "load", "load_all_data (warm stores)", lambda: self.app.load_all_data(period),
+                     before=lambda: self.reset(cold=False))
+        data = self.measure(universe, "load", "load_all_data (snapshot)", lambda: self.app.load_all_data(period))
+        if not data:
+            return
+        self.run_analytics(universe, data, symbols)
+        self.run_charts(universe, data)
+
+    def run_analytics(self, universe: int, data: Dict, symbols: List[str]) -> None:
+        from analysis.correlation import align_series, changes, rolling_correlation
+        from analysis.investment import (analyze_fed_vietnam_correlation, analyze_vietnam_macro_market_correlation,
+                                         generate_comprehensive_investment_recommendation)
+        from analysis.panel import build_panel, compute_breadth, compute_panel_indicators
+        from data.history import dashboard_metrics
+        from data.sql import HAS_DUCKDB, MarketSQL
+        from data.te import calculate_economic_score
+        from utils.analytics import EconomicAnalyzer, calculate_correlation_matrix
+
+        us_data, us_series = data['us_data'], data['us_series']
+        vn_market, vn_economic = data['vn_market'], data['vn_economic']
+        global_context = data['global_context']
+        analyzer = EconomicAnalyzer()
+
+        def run(name: str, fn: Callable[[], Any]) -> Any:
+            return self.measure(universe, "analytics", name, fn)
+
+        run("calculate_economic_score", lambda: calculate_economic_score(vn_economic))
+        fed = run("analyze_fed_vietnam_correlation",
+                  lambda: analyze_fed_vietnam_correlation(us_data, vn_market, global_context)) or {}
+        run("analyze_vietnam_macro_market_correlation",
+            lambda: analyze_vietnam_macro_market_correlation(vn_economic, vn_market))
+        run("generate_comprehensive_investment_recommendation",
+            lambda: generate_comprehensive_investment_recommendation(us_data, vn_economic, vn_market,
+                                                                     global_context, fed, "Moderate"))
+        run("EconomicAnalyzer.calculate_economic_momentum", lambda: analyzer.calculate_economic_momentum(vn_economic))
+        run("EconomicAnalyzer.detect_regime_changes", lambda: analyzer.detect_regime_changes(us_series))
+        run("EconomicAnalyzer.calculate_sector_rotation_signals",
+            lambda: analyzer.calculate_sector_rotation_signals(vn_market.get('sectors', {})))
+        run("EconomicAnalyzer.calculate_market_stress_index", lambda: analyzer.calculate_market_stress_index(vn_market))
+        run("EconomicAnalyzer.detect_divergences", lambda: analyzer.detect_divergences(vn_market, vn_economic))
+        run("EconomicAnalyzer.generate_tactical_signals",
+            lambda: analyzer.generate_tactical_signals(us_data, vn_market, vn_economic, global_context))
+        run("dashboard_metrics", lambda: dashboard_metrics(us_data, vn_market, vn_economic, global_context))
+
+        # Panel analytics over the universe's stored daily bars
+        if self.vn.BAR_CACHE is not None:
+            frames = {s: self.vn.BAR_CACHE.load(s) for s in symbols}
+            frames = {s: f for s, f in frames.items() if f is not None and not f.empty}
+            close, volume = build_panel(frames, "close"), build_panel(frames, "volume")
+            run(f"build_panel ({len(frames)} symbols)", lambda: build_panel(frames, "close"))
+            run("compute_panel_indicators", lambda: compute_panel_indicators(close, volume))
+            run("compute_breadth", lambda: compute_breadth(close, volume))
+            if HAS_DUCKDB:
+                sql = MarketSQL(self.workdir)
+                run("sql breadth_daily", lambda: sql.query("SELECT * FROM breadth_daily ORDER BY date"))
+
+        history = data.get('market_history') or {}
+        if history:
+            panel = changes(align_series(history))
+            run("calculate_correlation_matrix", lambda: calculate_correlation_matrix(history))
+            run("rolling_correlation (63d)", lambda: rolling_correlation(panel, 63))
+
+    def run_charts(self, universe: int, data: Dict) -> None:
+        from charts.builders import chart_builders
+
+        builders = chart_builders(data['us_series'], data['vn_market'], data['vn_economic'], data['global_context'])
+        for name, (builder, args) in builders.items():
+            self.measure(universe, "charts", name, lambda: builder(*args))
+
+
+def compare(results: List[Dict], baseline_path: Path, threshold: float) -> List[str]:
+    """Benchmarks whose median exceeds `threshold` times the baseline's, as report lines."""
+    baseline = json.loads(baseline_path.read_text())
+    previous = {(r["universe"], r["group"], r["name"]): r["median"] for r in baseline.get("results", []) if "median" in r}
+    regressions = []
+    for r in results:
+        before = previous.get((r["universe"], r["group"], r["name"]))
+        if before and "median" in r and r["median"] > before * threshold:
+            regressions.append(f"{r['universe']:>5} {r['group']}/{r['name']}: "
+                               f"{before * 1000:.1f} ms -> {r['median'] * 1000:.1f} ms ({r['median'] / before:.2f}x)")
+    return regressions
+
+
+def _synthetic_warning(synthesized: int, total: int, fixtures: str) -> str:
+    rule = "!" * 78
+    return (f"{rule}\n"
+            f"WARNING: {synthesized} of {total} provider responses were SYNTHETIC (no recorded fixture in {fixtures}).\n"
+            f"Their payload shapes are made up, so these timings say little about the real providers.\n"
+            f"Record fixtures first with `python -m bench --record`.\n"
+            f"{rule}")
+
+
+def record(args: argparse.Namespace) -> int:
+    """Run the loaders once against the live providers, saving every response as a fixture."""
+    import app
+    from bench import replay
+
+    fixtures = replay.Fixtures(Path(args.fixtures))
+    undo = replay.Recorder(fixtures).install()
+    try:
+        app.load_all_data(args.period)
+    finally:
+        undo()
+    print(f"{len(fixtures)} fixtures in {args.fixtures}")
+    return 0
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    from bench.replay import FIXTURE_DIR
+
+    parser = argparse.ArgumentParser(prog="python -m bench", description=__doc__ or
+                                     "Offline benchmarks of data loading, analytics and chart building.")
+    parser.add_argument("--universes", type=int, nargs="+", default=UNIVERSES, help="listed-universe sizes to run")
+    parser.add_argument("--latency", type=float, default=DEFAULT_LATENCY, help="seconds added to each replayed request")
+    parser.add_argument("--jitter", type=float, default=0.5, help="latency varies by +/- this fraction")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="runs per benchmark (median reported)")
+    parser.add_argument("--period", type=int, default=12, help="history period in months")
+    parser.add_argument("--rate-limits", action="store_true", help="apply the provider rate limits to replayed requests")
+    parser.add_argument("--fixtures", default=str(FIXTURE_DIR), help="directory of recorded responses")
+    parser.add_argument("--out", default=None, help="results file (default bench/results/<commit>-<time>.json)")
+    parser.add_argument("--compare", type=Path, default=None, help="baseline results file; exit 1 on regressions")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help="slowdown factor counted as a regression by --compare")
+    parser.add_argument("--allow-synthetic", action="store_true",
+                        help="let --compare use runs that served synthetic responses (refused by default)")
+    parser.add_argument("--record", action="store_true", help="record live provider responses as fixtures and exit")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    workdir = Path(tempfile.mkdtemp(prefix="ecotrack-bench-"))
+    _isolate(workdir)
+    logging.basicConfig(level=logging.ERROR)
+    args = parse_args(argv)
+    if args.record:
+        return record(args)
+    if args.compare is not None and not args.allow_synthetic:
+        baseline = json.loads(args.compare.read_text()).get("meta", {})
+        if baseline.get("synthetic", baseline.get("synthesized", 0) > 0):
+            print(f"Refusing to compare against {args.compare}: its run served synthetic responses "
+                  f"(pass --allow-synthetic to compare anyway)", file=sys.stderr)
+            return 2
+
+    suite = Suite(args, workdir)
+    if not len(suite.transport.fixtures):
+        print(f"WARNING: no recorded fixtures in {args.fixtures}; every response will be synthetic", file=sys.stderr)
+    restore = [suite.transport.install(), suite.yahoo.install()]
+    started = time.time()
+    try:
+        for universe in args.universes:
+            suite.run(universe)
+    finally:
+        for undo in restore:
+            undo()
+        shutil.rmtree(workdir, ignore_errors=True)
+        workdir.with_suffix(".log").unlink(missing_ok=True)
+
+    replayed = suite.transport.replayed + suite.yahoo.replayed
+    synthesized = suite.transport.synthesized + suite.yahoo.synthesized
+    commit = _git_commit()
+    output = {
+        "meta": {
+            "commit": commit,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "started": dt.datetime.fromtimestamp(started, tz=dt.timezone.utc).isoformat(),
+            "duration": round(time.time() - started, 2),
+            "params": {k: str(v) if isinstance(v, Path) else v for k, v in vars(args).items()},
+            "replayed": replayed,
+            "synthesized": synthesized,
+            "synthetic": synthesized > 0,
+        },
+        "results": suite.results,
+    }
+    out = Path(args.out or Path(__file__).parent / "results" /
+               f"{commit or 'local'}-{dt.datetime.now():%Y%m%d-%H%M%S}.json")
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(output, indent=2))
+    print(f"Results written to {out} ({replayed} replayed, {synthesized} synthetic responses)")
+    if synthesized:
+        print(_synthetic_warning(synthesized, replayed + synthesized, args.fixtures), file=sys.stderr)
+
+    if args.compare is not None:
+        if synthesized and not args.allow_synthetic:
+            print("Refusing to compare a run that served synthetic responses "
+                  "(pass --allow-synthetic to compare anyway)", file=sys.stderr)
+            return 2
+        regressions = compare(suite.results, args.compare, args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
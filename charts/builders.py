@@ -4,44 +4,62 @@ import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import numpy as np
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, List, Optional
 
+from charts.cache import CHART_CACHE
 from data.vn import get_index_history
-
-
-def create_comprehensive_charts(us_series, vn_market_data, vn_economic_data, global_context):
+from utils.metrics import timed
+
+
+# Data sources (data.sources.SOURCES) each chart is built from
+CHART_SOURCES = {
+    'us_indicators': ('us',),
+    'vn_indices_comparison': ('vn_market',),
+    'vn30_analysis': ('vn_market',),
+    'vn_economic_dashboard': ('vn_economic',),
+    'market_breadth': ('vn_market',),
+    'sector_heatmap': ('vn_market',),
+    'global_context': ('global_context', 'us'),
+    'fed_vietnam_correlation': ('us', 'vn_market'),
+}
+
+
+def chart_builders(us_series, vn_market_data, vn_economic_data, global_context) -> Dict[str, tuple]:
+    """Chart name -> (builder, args) for every chart in CHART_SOURCES."""
+    return {
+        # Enhanced US indicators chart
+        'us_indicators': (create_us_indicators_chart, (us_series,)),
+        # Vietnam indices comparison
+        'vn_indices_comparison': (create_vietnam_indices_comparison, (vn_market_data,)),
+        # VN30 analysis charts
+        'vn30_analysis': (create_vn30_analysis_charts, (vn_market_data,)),
+        # Vietnam economic dashboard
+        'vn_economic_dashboard': (create_vietnam_economic_dashboard, (vn_economic_data,)),
+        # Market breadth analysis
+        'market_breadth': (create_market_breadth_chart, (vn_market_data,)),
+        # Sector performance heatmap
+        'sector_heatmap': (create_sector_heatmap, (vn_market_data,)),
+        # Global context chart
+        'global_context': (create_global_context_chart, (global_context, us_series)),
+        # Fed vs Vietnam correlation
+        'fed_vietnam_correlation': (create_fed_vietnam_correlation_chart, (us_series, vn_market_data)),
+    }
+
+
+@timed()
+def create_comprehensive_charts(us_series, vn_market_data, vn_economic_data, global_context,
+                                only: Optional[Iterable[str]] = None, theme: Optional[str] = None):
     """
     Create comprehensive charts incorporating all enhanced data sources.
+    `only` restricts the build to a subset of chart names (see CHART_SOURCES). Figures are
+    memoized in CHART_CACHE and rebuilt only when their inputs or the theme change.
     """
-    charts = {}
-
-    # Enhanced US indicators chart
-    charts['us_indicators'] = create_us_indicators_chart(us_series)
-
-    # Vietnam indices comparison
-    charts['vn_indices_comparison'] = create_vietnam_indices_comparison(vn_market_data)
-
-    # VN30 analysis charts
-    charts['vn30_analysis'] = create_vn30_analysis_charts(vn_market_data)
-
-    # Vietnam economic dashboard
-    charts['vn_economic_dashboard'] = create_vietnam_economic_dashboard(vn_economic_data)
-
-    # Market breadth analysis
-    charts['market_breadth'] = create_market_breadth_chart(vn_market_data)
-
-    # Sector performance heatmap
-    charts['sector_heatmap'] = create_sector_heatmap(vn_market_data)
-
-    # Global context chart
-    charts['global_context'] = create_global_context_chart(global_context, us_series)
-
-    # Fed vs Vietnam correlation
-    charts['fed_vietnam_correlation'] = create_fed_vietnam_correlation_chart(us_series, vn_market_data)
-
-    return charts
+    builders = chart_builders(us_series, vn_market_data, vn_economic_data, global_context)
+    wanted = builders.keys() if only is None else [name for name in builders if name in set(only)]
+    return {name: CHART_CACHE.get_or_build(name, *builders[name], theme=theme) for name in wanted}
 
 
+@timed()
 def create_us_indicators_chart(us_series):
     """Enhanced US economic indicators with additional context."""
     if not us_series:
@@ -114,6 +132,7 @@ def create_us_indicators_chart(us_series):
     return fig
 
 
+@timed()
 def create_vietnam_indices_comparison(vn_market_data):
     """Compare performance of all Vietnam indices."""
     if 'indices' not in vn_market_data:
@@ -159,6 +178,7 @@ def create_vietnam_indices_comparison(vn_market_data):
     return fig
 
 
+@timed()
 def create_vn30_analysis_charts(vn_market_data):
     """Create comprehensive VN30 analysis charts."""
     if 'vn30_analysis' not in vn_market_data or not vn_market_data['vn30_analysis']:
@@ -219,6 +239,7 @@ def create_vn30_analysis_charts(vn_market_data):
     return fig
 
 
+@timed()
 def create_vietnam_economic_dashboard(vn_economic_data):
     """Create Vietnam economic indicators dashboard."""
     if not vn_economic_data:
@@ -297,6 +318,7 @@ def create_vietnam_economic_dashboard(vn_economic_data):
     return fig
 
 
+@timed()
 def create_market_breadth_chart(vn_market_data):
     """Create market breadth analysis chart."""
     if 'market_breadth' not in vn_market_data:
@@ -335,6 +357,7 @@ def create_market_breadth_chart(vn_market_data):
     return fig
 
 
+@timed()
 def create_sector_heatmap(vn_market_data):
     """Create sector performance heatmap."""
     if 'sectors' not in vn_market_data:
@@ -374,6 +397,7 @@ def create_sector_heatmap(vn_market_data):
     return fig
 
 
+@timed()
 def create_global_context_chart(global_context, us_series):
     """Create chart showing global economic context affecting Vietnam."""
     if not global_context and not us_series:
@@ -419,6 +443,7 @@ def create_global_context_chart(global_context, us_series):
     return fig
 
 
+@timed()
 def create_fed_vietnam_correlation_chart(us_series, vn_market_data):
     """Create chart showing Fed policy vs Vietnam market correlation."""
     if not us_series or 'indices' not in vn_market_data:
@@ -456,6 +481,7 @@ def create_fed_vietnam_correlation_chart(us_series, vn_market_data):
     return fig
 
 
+@timed()
 def create_economic_score_gauge(economic_score: float, rating: str) -> go.Figure:
     """Create a gauge chart for the economic health score."""
     fig = go.Figure(go.Indicator(
@@ -0,0 +1,97 @@
+# charts/cache.py - LRU memo of Plotly figures keyed on a content fingerprint of their inputs
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from utils.metrics import count_cache
+
+
+def _feed(h, obj: Any) -> None:
+    """Feed a stable byte representation of `obj` into hash `h`."""
+    if isinstance(obj, (pd.Series, pd.DataFrame)):
+        h.update(type(obj).__name__.encode())
+        if isinstance(obj, pd.DataFrame):
+            h.update(repr(list(obj.columns)).encode())
+        h.update(pd.util.hash_pandas_object(obj, index=True).values.tobytes())
+    elif isinstance(obj, np.ndarray):
+        h.update(str(obj.dtype).encode() + repr(obj.shape).encode())
+        h.update(np.ascontiguousarray(obj).tobytes())
+    elif isinstance(obj, dict):
+        h.update(b"{")
+        for key in sorted(obj, key=repr):
+            h.update(repr(key).encode() + b":")
+            _feed(h, obj[key])
+            h.update(b",")
+        h.update(b"}")
+    elif isinstance(obj, (list, tuple)):
+        h.update(b"[")
+        for item in obj:
+            _feed(h, item)
+            h.update(b",")
+        h.update(b"]")
+    else:
+        h.update(repr(obj).encode())
+
+
+def fingerprint(*objs: Any) -> str:
+    """Cheap content hash of nested dicts/lists/Series/DataFrames (equal data -> equal hash)."""
+    h = hashlib.blake2b(digest_size=16)
+    for obj in objs:
+        _feed(h, obj)
+    return h.hexdigest()
+
+
+class ChartCache:
+    """
+    Process-wide LRU of built figures. A figure is rebuilt only when the fingerprint
+    of its builder's inputs (or the theme) changes.
+    """
+
+    def __init__(self, maxsize: int = 64):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._figures: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_build(self, name: str, builder: Callable, args: Sequence[Any], theme: Optional[str] = None) -> Any:
+        key = f"{name}:{theme}:{fingerprint(*args)}"
+        with self._lock:
+            if key in self._figures:
+                self._figures.move_to_end(key)
+                self.hits += 1
+                count_cache("chart", True, chart=name)
+                return self._figures[key]
+            self.misses += 1
+        count_cache("chart", False, chart=name)
+
+        figure = builder(*args)
+        with self._lock:
+            self._figures[key] = figure
+            self._figures.move_to_end(key)
+            while len(self._figures) > self.maxsize:
+                self._figures.popitem(last=False)
+        return figure
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / total if total else 0.0,
+                'size': len(self._figures),
+                'maxsize': self.maxsize,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._figures.clear()
+            self.hits = self.misses = 0
+
+
+CHART_CACHE = ChartCache()
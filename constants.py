@@ -425,20 +425,34 @@ DATA_SOURCES = {
     'fred': {
         'base_url': 'https://api.stlouisfed.org/fred/',
         'rate_limit': 120,  # requests per minute
-        'cache_ttl': 3600  # 1 hour
+        'rate_period': 60,  # seconds
+        'cache_ttl': 3600,  # 1 hour
+        'max_concurrency': 4  # parallel series requests
     },
     'trading_economics': {
         'base_url': 'https://api.tradingeconomics.com/',
         'rate_limit': 100,  # requests per hour
+        'rate_period': 3600,  # seconds
         'cache_ttl': 900  # 15 minutes
     },
     'tcbs': {
         'base_url': 'https://apipubaws.tcbs.com.vn/',
         'rate_limit': 1000,  # requests per hour
-        'cache_ttl': 300  # 5 minutes for market data
+        'rate_period': 3600,  # seconds
+        'cache_ttl': 300,  # 5 minutes for market data
+        'max_concurrency': 8,  # parallel bar requests per batch
+        # Every consumer of the limiter above, in requests per hour at most; the rest is headroom
+        # for retries and cold starts. Each consumer sizes its request rate from its share.
+        'budget': {
+            'daily_bars': 240,  # bar deltas for vn_market, market_history, index charts (data.vn)
+            'breadth': 200,  # full-exchange breadth (data.vn)
+            'intraday': 400,  # minute-bar polls (data.intraday)
+            'overview': 40  # VN30 share counts, refreshed once per review period (data.vn)
+        }
     },
     'yahoo_finance': {
         'rate_limit': 2000,  # requests per hour
+        'rate_period': 3600,  # seconds
         'cache_ttl': 600  # 10 minutes
     }
 }
\ No newline at end of file
@@ -0,0 +1,80 @@
+# data/cross_asset.py - Daily history of every source's series, for cross-asset correlation
+import datetime as dt
+import logging
+import math
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict
+
+import pandas as pd
+
+from constants import ECONOMIC_INDICATORS
+from data.global_markets import get_global_history
+from data.te import TE_VN_INDICATORS, get_vn_economic_series
+from data.us import get_enhanced_us_data
+from data.vn import vn_market_series
+from utils.cache import cached
+from utils.metrics import timed
+
+logger = logging.getLogger(__name__)
+
+# Vietnam macro series worth correlating against markets (keys of TE_VN_INDICATORS)
+TE_HISTORY_KEYS = ['inflation_rate', 'policy_rate', 'manufacturing_pmi', 'industrial_yoy',
+                   'retail_sales_yoy', 'balance_of_trade', 'government_bond_10y']
+
+# Longest "Historical Data Period" option (data.sources.HISTORY_PERIODS); shorter periods slice it
+VN_HISTORY_MONTHS = 36
+
+
+@cached('tcbs')
+def _vn_market_history(months_back: int) -> Dict[str, pd.Series]:
+    return vn_market_series(days=months_back * 31)
+
+
+def _vn_markets(months_back: int) -> Dict[str, pd.Series]:
+    # One pass over the ~56 symbols serves every period: the daemon refreshes all five together,
+    # and get_cross_asset_history trims each series to its own window
+    return _vn_market_history(max(months_back, VN_HISTORY_MONTHS))
+
+
+def _fred(months_back: int) -> Dict[str, pd.Series]:
+    _, series = get_enhanced_us_data(months_back)
+    return {ECONOMIC_INDICATORS[key]['name']: s for key, s in series.items() if key in ECONOMIC_INDICATORS}
+
+
+def _te(months_back: int) -> Dict[str, pd.Series]:
+    series = get_vn_economic_series(TE_HISTORY_KEYS, years_back=max(1, math.ceil(months_back / 12)))
+    return {TE_VN_INDICATORS[key]['name']: s for key, s in series.items()}
+
+
+def _yahoo(months_back: int) -> Dict[str, pd.Series]:
+    return get_global_history(period=f"{max(1, math.ceil(months_back / 12))}y")
+
+
+GROUPS = {'VN': _vn_markets, 'US': _fred, 'VN Macro': _te, 'Global': _yahoo}
+
+
+@timed()
+def get_cross_asset_history(months_back: int = 12) -> Dict[str, pd.Series]:
+    """
+    Raw series from TCBS (indices, sectors), FRED, Trading Economics and Yahoo over the
+    history period, keyed '<group>: <name>'. Every part comes from its provider's cache.
+    """
+    start = pd.Timestamp(dt.date.today() - dt.timedelta(days=months_back * 31))
+    history: Dict[str, pd.Series] = {}
+    with ThreadPoolExecutor(max_workers=len(GROUPS), thread_name_prefix="history") as pool:
+        futures = {group: pool.submit(loader, months_back) for group, loader in GROUPS.items()}
+        for group, fut in futures.items():
+            try:
+                series = fut.result()
+            except Exception as e:
+                logger.warning(f"Cross-asset history for {group} unavailable: {e}")
+                continue
+            for name, s in series.items():
+                s = s.sort_index()
+                index = pd.DatetimeIndex(pd.to_datetime(s.index))
+                if index.tz is not None:
+                    index = index.tz_localize(None)
+                # Keep one observation before the window so slow series have a value at its start
+                history[f"{group}: {name}"] = s.iloc[max(index.searchsorted(start) - 1, 0):]
+    logger.info(f"Cross-asset history: {len(history)} series")
+    return history
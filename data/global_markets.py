@@ -1,10 +1,11 @@
 # data/global_markets.py - FIXED VERSION
 import logging
-from typing import Dict, Optional, Tuple
-import streamlit as st
+from typing import Dict, List, Optional, Tuple
 import yfinance as yf
 import pandas as pd
 import numpy as np
+from utils.cache import cached
+from utils.metrics import timed
 
 logger = logging.getLogger(__name__)
 
@@ -39,6 +40,28 @@ VN_RELATED_INSTRUMENTS = {
 }
 
 
+def _clean_history(symbol: str, hist: Optional[pd.DataFrame]) -> Optional[pd.DataFrame]:
+    """Validate a downloaded history frame; None if it cannot be used for change metrics."""
+    if hist is None or hist.empty:
+        logger.info(f"No data returned for {symbol}")
+        return None
+
+    # Check if we have the required columns
+    if 'Close' not in hist.columns:
+        logger.warning(f"No Close price data for {symbol}")
+        return None
+
+    # Clean the data (batch frames carry the union of all symbols' dates)
+    hist = hist.dropna(subset=['Close'])
+
+    # Need at least 2 data points for change calculation
+    if len(hist) < 2:
+        logger.info(f"Insufficient clean data for {symbol} (only {len(hist)} points)")
+        return None
+
+    return hist
+
+
 def _safe_download(symbol: str, period: str = '7d', interval: str = '1d') -> Optional[pd.DataFrame]:
     """Safely download data from Yahoo Finance with comprehensive error handling."""
     try:
@@ -57,32 +80,51 @@ def _safe_download(symbol: str, period: str = '7d', interval: str = '1d') -> Opt
                 ticker = yf.Ticker(symbol)
                 hist = ticker.history(period=period, interval=interval)
 
-        if hist is None or hist.empty:
-            logger.info(f"No data returned for {symbol}")
-            return None
+        # Single-symbol downloads may still come back with (field, ticker) columns
+        if hist is not None and isinstance(hist.columns, pd.MultiIndex):
+            hist = hist.droplevel(1, axis=1)
 
-        # Check if we have the required columns
-        if 'Close' not in hist.columns:
-            logger.warning(f"No Close price data for {symbol}")
-            return None
+        return _clean_history(symbol, hist)
 
-        # Need at least 2 data points for change calculation
-        if len(hist) < 2:
-            logger.info(f"Insufficient data for {symbol} (only {len(hist)} points)")
-            return None
-
-        # Clean the data
-        hist = hist.dropna(subset=['Close'])
+    except Exception as e:
+        logger.warning(f"Download failed for {symbol}: {e}")
+        return None
 
-        if len(hist) < 2:
-            logger.info(f"Insufficient clean data for {symbol}")
-            return None
 
-        return hist
+def _batch_download(symbols: List[str], period: str = '7d', interval: str = '1d') -> Dict[str, pd.DataFrame]:
+    """
+    Download many symbols in one multi-ticker request and split into per-symbol frames.
+    Only symbols missing from the batch fall back to individual downloads.
+    """
+    frames: Dict[str, pd.DataFrame] = {}
+    symbols = list(dict.fromkeys(symbols))
 
+    try:
+        raw = yf.download(symbols, period=period, interval=interval, group_by='ticker',
+                          threads=True, progress=False)
     except Exception as e:
-        logger.warning(f"Download failed for {symbol}: {e}")
-        return None
+        logger.warning(f"Batch download failed for {len(symbols)} symbols: {e}")
+        raw = None
+
+    if raw is not None and not raw.empty and isinstance(raw.columns, pd.MultiIndex):
+        # group_by='ticker' puts tickers on level 0; tolerate the (field, ticker) layout too
+        level = 0 if set(symbols) & set(raw.columns.get_level_values(0)) else 1
+        available = set(raw.columns.get_level_values(level))
+        for symbol in symbols:
+            if symbol in available:
+                hist = _clean_history(symbol, raw.xs(symbol, axis=1, level=level))
+                if hist is not None:
+                    frames[symbol] = hist
+
+    missing = [s for s in symbols if s not in frames]
+    if missing:
+        logger.info(f"Batch download ({period}) returned {len(frames)}/{len(symbols)}; retrying {len(missing)} individually")
+        for symbol in missing:
+            hist = _safe_download(symbol, period=period, interval=interval)
+            if hist is not None:
+                frames[symbol] = hist
+
+    return frames
 
 
 def _calculate_change_metrics(hist: pd.DataFrame) -> Tuple[float, float, float]:
@@ -115,18 +157,23 @@ def _calculate_change_metrics(hist: pd.DataFrame) -> Tuple[float, float, float]:
         return np.nan, np.nan, np.nan
 
 
-@st.cache_data(ttl=3600, show_spinner=False)
+@timed()
+@cached('yahoo_finance')
 def get_global_market_data() -> Dict:
     """Get global market data with enhanced error handling and Vietnam context."""
     data = {}
 
     logger.info("Fetching global market data...")
 
+    # One batch per period class: 7d for indices/ETFs, 5d for FX/commodities
+    weekly = _batch_download(list(GLOBAL_INDICES) + list(VN_RELATED_INSTRUMENTS), period='7d', interval='1d')
+    fx_daily = _batch_download(list(CURRENCIES_AND_COMMODITIES), period='5d', interval='1d')
+
     # Process major indices
     indices_processed = 0
     for symbol, name in GLOBAL_INDICES.items():
         try:
-            hist = _safe_download(symbol, period='7d', interval='1d')
+            hist = weekly.get(symbol)
             if hist is not None:
                 latest, daily_change, weekly_change = _calculate_change_metrics(hist)
 
@@ -156,7 +203,7 @@ def get_global_market_data() -> Dict:
     fx_commodities_processed = 0
     for symbol, name in CURRENCIES_AND_COMMODITIES.items():
         try:
-            hist = _safe_download(symbol, period='5d', interval='1d')  # Slightly shorter period for FX
+            hist = fx_daily.get(symbol)
             if hist is not None:
                 latest, daily_change, weekly_change = _calculate_change_metrics(hist)
 
@@ -175,8 +222,8 @@ def get_global_market_data() -> Dict:
                         'category': category
                     }
                     fx_commodities_processed += 1
-                    logger.info(
-                        f"✅ {name}: {latest:.4f if category == 'currency' else latest:.2f} ({daily_change:+.2f}%)")
+                    price_fmt = f"{latest:.4f}" if category == 'currency' else f"{latest:.2f}"
+                    logger.info(f"✅ {name}: {price_fmt} ({daily_change:+.2f}%)")
 
         except Exception as e:
             logger.warning(f"❌ Failed to process {symbol}: {e}")
@@ -188,7 +235,7 @@ def get_global_market_data() -> Dict:
     vn_etfs_processed = 0
     for symbol, name in VN_RELATED_INSTRUMENTS.items():
         try:
-            hist = _safe_download(symbol, period='7d', interval='1d')
+            hist = weekly.get(symbol)
             if hist is not None:
                 latest, daily_change, weekly_change = _calculate_change_metrics(hist)
 
@@ -230,7 +277,17 @@ def get_global_market_data() -> Dict:
     return data
 
 
-@st.cache_data(ttl=1800, show_spinner=False)
+@timed()
+@cached('yahoo_finance')
+def get_global_history(period: str = '1y') -> Dict[str, pd.Series]:
+    """Daily closes of the global indices, FX and commodities, keyed by display name."""
+    names = {**GLOBAL_INDICES, **CURRENCIES_AND_COMMODITIES}
+    frames = _batch_download(list(names), period=period, interval='1d')
+    return {names[symbol]: hist['Close'].astype(float) for symbol, hist in frames.items()}
+
+
+@timed()
+@cached('yahoo_finance')
 def get_vietnam_proxy_indicators() -> Dict:
     """Get indicators that serve as proxies for Vietnam market performance."""
     proxies = {}
@@ -244,9 +301,11 @@ def get_vietnam_proxy_indicators() -> Dict:
         '000001.SS': 'Shanghai Composite'
     }
 
+    history = _batch_download(list(regional_indices), period='7d')
+
     for symbol, name in regional_indices.items():
         try:
-            hist = _safe_download(symbol, period='7d')
+            hist = history.get(symbol)
             if hist is not None:
                 latest, daily_change, weekly_change = _calculate_change_metrics(hist)
 
@@ -267,6 +326,7 @@ def get_vietnam_proxy_indicators() -> Dict:
     return proxies
 
 
+@timed()
 def get_market_risk_indicators() -> Dict:
     """Get key risk indicators that affect emerging markets including Vietnam."""
     risk_indicators = {}
@@ -286,9 +346,11 @@ def get_market_risk_indicators() -> Dict:
 
     all_risk_instruments = {**volatility_instruments, **treasury_instruments}
 
+    history = _batch_download(list(all_risk_instruments), period='5d')
+
     for symbol, name in all_risk_instruments.items():
         try:
-            hist = _safe_download(symbol, period='5d')
+            hist = history.get(symbol)
             if hist is not None:
                 latest, daily_change, weekly_change = _calculate_change_metrics(hist)
 
@@ -0,0 +1,113 @@
+# data/history.py - Snapshots of computed dashboard metrics, recorded per data refresh and read back by time range
+import datetime as dt
+import importlib.util
+import logging
+import os
+from typing import Dict, Optional, Tuple
+
+import pandas as pd
+
+from analysis.investment import analyze_fed_vietnam_correlation
+from data.store import MetricHistoryStore
+from data.te import calculate_economic_score
+from utils.analytics import EconomicAnalyzer
+
+logger = logging.getLogger(__name__)
+
+# Set ECOTRACK_METRIC_HISTORY=0 to stop recording (pyarrow is required either way)
+_RECORD = os.getenv("ECOTRACK_METRIC_HISTORY", "1") != "0" and importlib.util.find_spec("pyarrow") is not None
+METRIC_HISTORY: Optional[MetricHistoryStore] = MetricHistoryStore() if _RECORD else None
+# Trading Economics indicator values as published in each snapshot ('global.<key>' for the global context)
+TE_HISTORY: Optional[MetricHistoryStore] = MetricHistoryStore(dataset="te_snapshots") if _RECORD else None
+
+TREND_LOOKBACK = dt.timedelta(days=7)
+# Sources the metrics are computed from; a snapshot is as of the newest of them
+METRIC_SOURCES = ('us', 'vn_market', 'vn_economic', 'global_context')
+
+
+def dashboard_metrics(us_data: Dict, vn_market: Dict, vn_economic: Dict,
+                      global_context: Dict) -> Tuple[Dict[str, float], Dict[str, str]]:
+    """
+    Economic score, Fed-Vietnam impact score and market stress index (with its components)
+    from one set of source data, as ({metric: value}, {metric: label}). Metrics whose inputs
+    are missing are left out.
+    """
+    values: Dict[str, float] = {}
+    labels: Dict[str, str] = {}
+
+    if vn_economic:
+        try:
+            score, rating, _ = calculate_economic_score(vn_economic)
+            values['economic_score'], labels['economic_score'] = score, rating
+        except Exception as e:
+            logger.warning(f"Economic score snapshot failed: {e}")
+
+    if us_data and vn_market:
+        try:
+            fed = analyze_fed_vietnam_correlation(us_data, vn_market, global_context or {})
+            values['fed_impact_score'], labels['fed_impact_score'] = fed['fed_impact_score'], fed['risk_level']
+        except Exception as e:
+            logger.warning(f"Fed-Vietnam snapshot failed: {e}")
+
+    if vn_market:
+        try:
+            stress = EconomicAnalyzer().calculate_market_stress_index(vn_market)
+            values['market_stress_index'] = stress['composite_stress_index']
+            labels['market_stress_index'] = stress['stress_level']
+            values.update({f"stress.{name}": v for name, v in stress['stress_components'].items()})
+        except Exception as e:
+            logger.warning(f"Market stress snapshot failed: {e}")
+
+    return values, labels
+
+
+def te_values(vn_economic: Dict, global_context: Dict) -> Tuple[Dict[str, float], Dict[str, str]]:
+    """Trading Economics indicator values keyed like the snapshot dicts, with units as labels."""
+    values: Dict[str, float] = {}
+    labels: Dict[str, str] = {}
+    for prefix, data in (("", vn_economic or {}), ("global.", global_context or {})):
+        for key, item in data.items():
+            if isinstance(item, dict) and item.get('value') is not None:
+                values[prefix + key] = item['value']
+                labels[prefix + key] = item.get('unit') or ""
+    return values, labels
+
+
+def record_dashboard_metrics(us_data: Dict, vn_market: Dict, vn_economic: Dict, global_context: Dict,
+                             at: dt.datetime) -> bool:
+    """
+    Append the metrics and Trading Economics values for data fetched at `at`; a snapshot
+    already recorded is not written again. True if any new metric was written.
+    """
+    if METRIC_HISTORY is None:
+        return False
+    te, units = te_values(vn_economic, global_context)
+    TE_HISTORY.append(te, at, units)
+    values, labels = dashboard_metrics(us_data, vn_market, vn_economic, global_context)
+    return METRIC_HISTORY.append(values, at, labels)
+
+
+def metric_history(metric: str, days: int = 90) -> pd.Series:
+    """Recorded values of `metric` over the last `days` days."""
+    if METRIC_HISTORY is None:
+        return pd.Series(dtype=float, name=metric)
+    return METRIC_HISTORY.series(metric, start=pd.Timestamp.now(tz="UTC") - pd.Timedelta(days=days))
+
+
+def metric_trend(metric: str, lookback: dt.timedelta = TREND_LOOKBACK) -> Optional[Dict]:
+    """
+    Latest recorded value of `metric` against the last one at least `lookback` older
+    (or the oldest in that window), or None with fewer than two snapshots.
+    """
+    history = metric_history(metric, days=max(lookback.days * 2, 1))
+    if len(history) < 2:
+        return None
+    latest_at = history.index[-1]
+    earlier = history[history.index <= latest_at - lookback]
+    base_at, base = (earlier.index[-1], earlier.iloc[-1]) if len(earlier) else (history.index[0], history.iloc[0])
+    return {
+        "value": float(history.iloc[-1]),
+        "change": float(history.iloc[-1] - base),
+        "since": base_at.to_pydatetime(),
+        "as_of": latest_at.to_pydatetime(),
+    }
@@ -0,0 +1,301 @@
+# data/intraday.py - Minute bars polled during HOSE sessions into fixed-size per-symbol ring buffers
+import asyncio
+import datetime as dt
+import logging
+import math
+import threading
+import time
+from typing import Dict, List, Optional
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pandas as pd
+
+from analysis.indicators import get_market_sentiment
+from analysis.panel import TECHNICAL_FIELDS
+from analysis.streaming import IndicatorSet
+from constants import VIETNAM_MARKET_PARAMS
+from data import vn
+from data.vn import TCBS_BUDGET, VIETNAM_INDICES, VN30_STOCKS, _cached_tcbs_bars_async, _tcbs_bars_async, vn30_summary
+from utils import http
+
+logger = logging.getLogger(__name__)
+
+_HOURS = VIETNAM_MARKET_PARAMS['trading_hours']
+MARKET_TZ = ZoneInfo(_HOURS['timezone'])
+SESSIONS = [tuple(dt.time.fromisoformat(t) for t in _HOURS[name]) for name in ('morning_session', 'afternoon_session')]
+SESSION_MINUTES = sum((b.hour * 60 + b.minute) - (a.hour * 60 + a.minute) for a, b in SESSIONS)
+
+POLL_INTERVAL = 60  # shortest wait between polls while a session is open
+IDLE_WAIT_MAX = 3600  # re-check the clock at least hourly while the market is closed
+REFERENCE_DAYS = 10  # calendar days searched for the previous session's close
+FIELDS = ("open", "high", "low", "close", "volume")
+_OPEN, _HIGH, _LOW, _CLOSE, _VOLUME = range(len(FIELDS))
+
+
+def poll_interval(symbols: int) -> float:
+    """
+    Seconds between polls that keep one minute-bar request per symbol within the intraday
+    share of the TCBS budget. Each request returns the whole session, so no bars are missed.
+    """
+    return max(POLL_INTERVAL, symbols * 3600 / TCBS_BUDGET["intraday"])
+
+
+def market_now() -> dt.datetime:
+    return dt.datetime.now(MARKET_TZ)
+
+
+def in_session(now: Optional[dt.datetime] = None) -> bool:
+    """True during the morning or afternoon session of a weekday (the lunch break is closed)."""
+    now = now or market_now()
+    return now.weekday() < 5 and any(start <= now.time() < end for start, end in SESSIONS)
+
+
+def seconds_to_next_session(now: Optional[dt.datetime] = None) -> float:
+    """Seconds until the next session opens; 0 while one is open. Exchange holidays are not modelled."""
+    now = now or market_now()
+    if in_session(now):
+        return 0.0
+    for offset in range(8):
+        day = now.date() + dt.timedelta(days=offset)
+        if day.weekday() >= 5:
+            continue
+        for start, _ in SESSIONS:
+            opens = dt.datetime.combine(day, start, tzinfo=MARKET_TZ)
+            if opens > now:
+                return (opens - now).total_seconds()
+    return float(IDLE_WAIT_MAX)
+
+
+class MinuteRingBuffer:
+    """
+    Minute OHLCV bars of one symbol in arrays allocated once; new bars overwrite the oldest
+    slot. The default capacity holds a full trading day, so a session never wraps.
+    """
+
+    def __init__(self, capacity: int = SESSION_MINUTES + 1):
+        self.capacity = capacity
+        self.times = np.zeros(capacity, dtype=np.int64)  # epoch seconds of each bar
+        self.values = np.full((capacity, len(FIELDS)), np.nan)
+        self.head = 0  # next slot to write
+        self.size = 0
+        self.reference = math.nan  # previous session's close
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def last_time(self) -> Optional[int]:
+        return int(self.times[(self.head - 1) % self.capacity]) if self.size else None
+
+    def clear(self) -> None:
+        self.head = self.size = 0
+
+    def write(self, times: np.ndarray, values: np.ndarray) -> int:
+        """
+        Store time-sorted bars. Bars older than the newest stored one are skipped; one with the
+        same minute replaces it (it was still forming when last polled). Returns bars written.
+        """
+        last = self.last_time
+        if last is not None:
+            start = int(np.searchsorted(times, last))
+            if start < len(times) and times[start] == last:
+                self.values[(self.head - 1) % self.capacity] = values[start]
+                start += 1
+            times, values = times[start:], values[start:]
+
+        n = min(len(times), self.capacity)
+        if n:
+            slots = (self.head + np.arange(n)) % self.capacity
+            self.times[slots] = times[-n:]
+            self.values[slots] = values[-n:]
+            self.head = (self.head + n) % self.capacity
+            self.size = min(self.size + n, self.capacity)
+        return n
+
+    def _segments(self) -> List[np.ndarray]:
+        """Views of the stored rows, oldest first (two when the ring has wrapped)."""
+        start = (self.head - self.size) % self.capacity
+        if start + self.size <= self.capacity:
+            return [self.values[start:start + self.size]]
+        return [self.values[start:], self.values[:self.head]]
+
+    def quote(self) -> Dict:
+        """Session-to-date price, change vs the previous close, range and volume, without copying the buffer."""
+        if not self.size:
+            return {}
+        parts = self._segments()
+        price = float(self.values[(self.head - 1) % self.capacity, _CLOSE])
+        reference = self.reference if self.reference > 0 else float(parts[0][0, _OPEN])
+        return {
+            "price": price,
+            "open": float(parts[0][0, _OPEN]),
+            "high": float(max(np.nanmax(p[:, _HIGH]) for p in parts)),
+            "low": float(min(np.nanmin(p[:, _LOW]) for p in parts)),
+            "volume": float(sum(np.nansum(p[:, _VOLUME]) for p in parts)),
+            "change_pct": (price / reference - 1) * 100 if reference > 0 else 0.0,
+            "as_of": dt.datetime.fromtimestamp(self.last_time, MARKET_TZ).strftime('%H:%M'),
+        }
+
+    def to_frame(self) -> pd.DataFrame:
+        """Ordered copy of the stored bars (for charts)."""
+        start = (self.head - self.size) % self.capacity
+        order = (start + np.arange(self.size)) % self.capacity
+        frame = pd.DataFrame(self.values[order], columns=FIELDS)
+        frame.insert(0, "date", pd.to_datetime(self.times[order], unit="s", utc=True).tz_convert(MARKET_TZ))
+        return frame
+
+
+class IntradayFeed:
+    """Background poller filling one ring buffer per symbol while the market is open."""
+
+    def __init__(self, symbols: List[str], interval: Optional[float] = None):
+        self.buffers = {s.upper(): MinuteRingBuffer() for s in symbols}
+        # Daily indicator state per symbol from the bar cache; today's bar is the latest minute close
+        self.states: Dict[str, IndicatorSet] = {}
+        self._technicals: Dict[str, Dict[str, float]] = {}
+        # Never faster than the budget allows: 36 symbols poll every ~5.4 minutes, the indices alone every minute
+        self.interval = max(interval or 0.0, poll_interval(len(self.buffers)))
+        self.session_date: Optional[dt.date] = None
+        self.polls = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _map(self, fn, day: dt.date) -> list:
+        """Run coroutine `fn(symbol, day)` for every symbol concurrently on the shared HTTP loop."""
+        async def gather():
+            return await asyncio.gather(*(fn(symbol, day) for symbol in self.buffers))
+        return http.run(gather())
+
+    async def _reference(self, symbol: str, day: dt.date) -> float:
+        bars = await _cached_tcbs_bars_async(symbol, day - dt.timedelta(days=REFERENCE_DAYS), day - dt.timedelta(days=1))
+        bars = bars[pd.to_datetime(bars["date"]).dt.date < day] if not bars.empty else bars
+        return float(bars["close"].iloc[-1]) if not bars.empty else math.nan
+
+    def _start_session(self, day: dt.date) -> None:
+        """New trading day: empty the buffers and load each symbol's previous close."""
+        references = self._map(self._reference, day)
+        states = {}
+        if vn.BAR_CACHE is not None:
+            # Kept current by the delta refreshes above; a read of each symbol's saved state
+            states = {s: state for s in self.buffers if (state := vn.BAR_CACHE.indicator_state(s)) is not None}
+        with self._lock:
+            for buffer, reference in zip(self.buffers.values(), references):
+                buffer.clear()
+                buffer.reference = reference
+            self.states, self._technicals = states, {}
+            self.session_date = day
+        logger.info(f"Intraday session {day}: tracking {len(self.buffers)} symbols every {self.interval:.0f}s")
+
+    async def _fetch(self, symbol: str, day: dt.date) -> int:
+        bars = await _tcbs_bars_async(symbol, day, day, resolution="1")
+        if bars.empty:
+            return 0
+        dates = pd.to_datetime(bars["date"])
+        bars = bars[(dates.dt.date == day).to_numpy()]
+        if bars.empty:
+            return 0
+        times = pd.to_datetime(bars["date"], utc=True).dt.as_unit("s").astype("int64").to_numpy()
+        with self._lock:
+            return self.buffers[symbol].write(times, bars[list(FIELDS)].to_numpy(dtype=float))
+
+    def poll(self, now: Optional[dt.datetime] = None) -> int:
+        """Fetch new minute bars for every symbol; returns the number of bars written."""
+        day = (now or market_now()).date()
+        if self.session_date != day:
+            self._start_session(day)
+        written = sum(self._map(self._fetch, day))
+        self._advance_technicals(day)
+        self.polls += 1
+        logger.debug(f"Intraday poll {self.polls}: {written} bars")
+        return written
+
+    def _advance_technicals(self, day: dt.date) -> None:
+        """Re-apply today's bar at each symbol's latest price: O(window) per symbol, no history replay."""
+        with self._lock:
+            for symbol, state in self.states.items():
+                quote = self.buffers[symbol].quote()
+                if quote:
+                    state.update(day.isoformat(), quote["price"], revisable=True)
+                    self._technicals[symbol] = {k: v for k, v in state.values().items() if k in TECHNICAL_FIELDS}
+
+    def run(self) -> None:
+        was_open = False
+        while not self._stop.is_set():
+            now = market_now()
+            if in_session(now):
+                started = time.monotonic()
+                try:
+                    self.poll(now)
+                except Exception as e:
+                    logger.warning(f"Intraday poll failed: {e}")
+                was_open = True
+                wait = max(self.interval - (time.monotonic() - started), 1.0)
+            else:
+                if was_open:
+                    # One last poll after the session ends picks up its closing bars
+                    try:
+                        self.poll(now)
+                    except Exception as e:
+                        logger.warning(f"Intraday poll failed: {e}")
+                    was_open = False
+                wait = min(seconds_to_next_session(now), IDLE_WAIT_MAX)
+            self._stop.wait(wait)
+
+    def start(self) -> "IntradayFeed":
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self.run, name="intraday-feed", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def quotes(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {symbol: q for symbol, buffer in self.buffers.items() if (q := buffer.quote())}
+
+    def technicals(self) -> Dict[str, Dict[str, float]]:
+        """Daily technical indicators with the session so far as today's bar, per symbol."""
+        with self._lock:
+            return {symbol: dict(values) for symbol, values in self._technicals.items()}
+
+
+def apply_intraday(vn_market: Dict, feed: IntradayFeed) -> Dict:
+    """
+    Copy of the daily VN market data with index and VN30 figures taken from the minute buffers;
+    index technicals come from the streaming state advanced with today's price.
+    """
+    quotes = feed.quotes()
+    if not quotes or not vn_market:
+        return vn_market
+
+    out = dict(vn_market)
+    technicals = feed.technicals()
+    indices = {key: dict(value) for key, value in vn_market.get("indices", {}).items()}
+    for code in VIETNAM_INDICES:
+        quote, key = quotes.get(code), code.lower()
+        if quote and key in indices:
+            indices[key].update(price=quote["price"], change_pct=quote["change_pct"], volume=quote["volume"])
+            technical = technicals.get(code, {})
+            if "rsi" in technical:
+                technical["rsi_signal"], technical["rsi_sentiment"] = get_market_sentiment(technical["rsi"])
+            indices[key].update(technical)
+    out["indices"] = indices
+
+    vn30 = [s for s in VN30_STOCKS if s in quotes]
+    if vn30:
+        price = pd.Series({s: quotes[s]["price"] for s in vn30})
+        change = pd.Series({s: quotes[s]["change_pct"] for s in vn30})
+        volume = pd.Series({s: quotes[s]["volume"] for s in vn30})
+        out["vn30_analysis"] = vn30_summary(price, change, volume, feed.session_date)
+
+    out["intraday_as_of"] = max(q["as_of"] for q in quotes.values())
+    return out
+
+
+def intraday_symbols() -> List[str]:
+    """Indices plus VN30 constituents, the symbols the intraday overlay updates."""
+    return list(dict.fromkeys([*VIETNAM_INDICES, *VN30_STOCKS]))
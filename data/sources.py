@@ -0,0 +1,61 @@
+# data/sources.py - Registry of dashboard data sources shared by the app and the ingestion daemon
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+from constants import DATA_SOURCES
+from data.cross_asset import get_cross_asset_history
+from data.global_markets import get_global_market_data
+from data.te import get_comprehensive_vn_data, get_global_economic_context
+from data.us import get_enhanced_us_data, get_fed_probability
+from data.vn import get_comprehensive_vn_market_data
+from utils.executor import Task
+
+# Options of the "Historical Data Period" selector (months)
+HISTORY_PERIODS = [6, 12, 18, 24, 36]
+DEFAULT_HISTORY_PERIOD = 12
+
+
+@dataclass(frozen=True)
+class Source:
+    """
+    One dashboard data source.
+
+    `provider` is the DATA_SOURCES entry whose cache_ttl sets the refresh interval;
+    `periodic` sources take the history period (months) as their only argument.
+    """
+    name: str
+    loader: Callable[..., Any]
+    provider: str
+    timeout: float
+    default: Any = None
+    periodic: bool = False
+
+    @property
+    def interval(self) -> float:
+        return DATA_SOURCES[self.provider]['cache_ttl']
+
+    def key(self, data_period: int) -> str:
+        """Snapshot key; periodic sources get one snapshot per history period."""
+        return f"{self.name}@{data_period}" if self.periodic else self.name
+
+    def task(self, data_period: int, fresh: bool = False) -> Task:
+        """Task loading this source; `fresh` bypasses (and overwrites) the loader cache."""
+        fn = getattr(self.loader, 'refresh', self.loader) if fresh else self.loader
+        args = (data_period,) if self.periodic else ()
+        return Task(self.key(data_period), lambda: fn(*args), timeout=self.timeout, default=self.default)
+
+
+SOURCES: Dict[str, Source] = {s.name: s for s in [
+    Source('us', get_enhanced_us_data, 'fred', timeout=60, default=({}, {}), periodic=True),
+    Source('fed_data', get_fed_probability, 'fred', timeout=30, default={}),
+    Source('vn_market', get_comprehensive_vn_market_data, 'tcbs', timeout=180, default={}),
+    Source('vn_economic', get_comprehensive_vn_data, 'trading_economics', timeout=30, default={}),
+    Source('global_context', get_global_economic_context, 'trading_economics', timeout=30, default={}),
+    Source('global_markets', get_global_market_data, 'yahoo_finance', timeout=60, default={}),
+    Source('market_history', get_cross_asset_history, 'yahoo_finance', timeout=180, default={}, periodic=True),
+]}
+
+
+def source_tasks(data_period: int, names: Optional[List[str]] = None, fresh: bool = False) -> List[Task]:
+    """Tasks for the selected sources (default: all), named by their snapshot key."""
+    return [s.task(data_period, fresh) for s in SOURCES.values() if names is None or s.name in names]
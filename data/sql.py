@@ -0,0 +1,192 @@
+# data/sql.py - Embedded DuckDB SQL layer over the local bar, FRED, TE and metric stores
+import importlib.util
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import pandas as pd
+
+from analysis.panel import BREADTH_THRESHOLD, HIGH_LOW_WINDOW, TRADING_DAYS
+from constants import VN_MAJOR_STOCKS
+from data.store import CACHE_DIR
+from data.vn import VIETNAM_INDICES, VN30_STOCKS
+
+logger = logging.getLogger(__name__)
+
+HAS_DUCKDB = importlib.util.find_spec("duckdb") is not None
+MARKET_TZ = "Asia/Ho_Chi_Minh"
+
+# Parquet stores exposed as views: view -> (glob under CACHE_DIR, select list, columns when nothing is stored yet).
+# Bar dates are stored as UTC instants of Vietnamese midnight, so they are converted to market time before
+# the DATE cast; FRED dates are stored without a zone and cast as they are.
+STORES = {
+    "bars": ("tcbs_daily/symbol=*/bars.parquet",
+             f"upper(symbol) AS symbol, timezone('{MARKET_TZ}', date)::DATE AS date, open, high, low, close, volume",
+             "symbol VARCHAR, date DATE, open DOUBLE, high DOUBLE, low DOUBLE, close DOUBLE, volume DOUBLE"),
+    "fred": ("fred/series_id=*/observations.parquet",
+             "upper(series_id) AS series_id, CAST(date AS DATE) AS date, value",
+             "series_id VARCHAR, date DATE, value DOUBLE"),
+    "te": ("te_snapshots/month=*/part-*.parquet",
+           "ts, metric AS indicator, value, label AS unit",
+           "ts TIMESTAMPTZ, indicator VARCHAR, value DOUBLE, unit VARCHAR"),
+    "metrics": ("metrics/month=*/part-*.parquet",
+                "ts, metric, value, label",
+                "ts TIMESTAMPTZ, metric VARCHAR, value DOUBLE, label VARCHAR"),
+}
+
+# Views derived from the stores; created in order, so later views may use earlier ones
+VIEWS = {
+    "returns": """
+        SELECT symbol, date, close, volume, close / lag(close) OVER w - 1 AS ret
+        FROM bars WINDOW w AS (PARTITION BY symbol ORDER BY date)
+    """,
+    "sector_daily": """
+        SELECT m.sector, r.date, avg(r.ret) AS avg_return, median(r.ret) AS median_return,
+               count(r.ret) AS stocks, sum(r.close * r.volume) AS turnover
+        FROM returns r JOIN sector_members m USING (symbol)
+        WHERE r.ret IS NOT NULL
+        GROUP BY m.sector, r.date
+    """,
+    "vn30_daily": """
+        SELECT r.symbol, r.date, r.ret, i.ret AS index_ret, r.ret - i.ret AS excess_return,
+               r.ret > i.ret AS beat_index
+        FROM returns r
+        JOIN vn30_members USING (symbol)
+        JOIN returns i ON i.symbol = 'VN30' AND i.date = r.date
+        WHERE r.ret IS NOT NULL AND i.ret IS NOT NULL
+    """,
+    "breadth_daily": f"""
+        WITH s AS (
+            SELECT symbol, date, volume, ret * 100 AS change_pct, close,
+                   max(close) OVER w AS prior_high, min(close) OVER w AS prior_low
+            FROM returns
+            WHERE symbol NOT IN (SELECT code FROM vn_indices)
+            WINDOW w AS (PARTITION BY symbol ORDER BY date
+                         ROWS BETWEEN {HIGH_LOW_WINDOW} PRECEDING AND 1 PRECEDING)
+        ), d AS (
+            SELECT date,
+                   count(*) FILTER (WHERE change_pct > {BREADTH_THRESHOLD}) AS advancing,
+                   count(*) FILTER (WHERE change_pct < -{BREADTH_THRESHOLD}) AS declining,
+                   count(*) FILTER (WHERE abs(change_pct) <= {BREADTH_THRESHOLD}) AS unchanged,
+                   coalesce(sum(volume) FILTER (WHERE change_pct > {BREADTH_THRESHOLD}), 0) AS up_volume,
+                   coalesce(sum(volume) FILTER (WHERE change_pct < -{BREADTH_THRESHOLD}), 0) AS down_volume,
+                   count(*) FILTER (WHERE close > prior_high) AS new_highs,
+                   count(*) FILTER (WHERE close < prior_low) AS new_lows
+            FROM s WHERE change_pct IS NOT NULL
+            GROUP BY date
+        )
+        SELECT *, sum(advancing - declining) OVER (ORDER BY date) AS ad_line FROM d
+    """,
+}
+
+# Table macros: parameterised cuts over the views
+MACROS = {
+    "sector_returns": ("start_date, end_date", f"""
+        SELECT sector, count(*) AS days, exp(sum(ln(1 + avg_return))) - 1 AS total_return,
+               stddev_samp(avg_return) * sqrt({TRADING_DAYS}) AS volatility
+        FROM sector_daily WHERE date > start_date AND date <= end_date
+        GROUP BY sector ORDER BY total_return DESC
+    """),
+    "vn30_vs_index": ("start_date, end_date", """
+        SELECT symbol, count(*) AS days, exp(sum(ln(1 + ret))) - 1 AS total_return,
+               exp(sum(ln(1 + index_ret))) - 1 AS index_return, avg(beat_index::INT) AS hit_rate
+        FROM vn30_daily WHERE date > start_date AND date <= end_date
+        GROUP BY symbol ORDER BY total_return - index_return DESC
+    """),
+}
+
+
+def _reference_tables() -> Dict[str, pd.DataFrame]:
+    members = [(sector, s) for sector, info in VN_MAJOR_STOCKS.items() if isinstance(info, dict)
+               for s in info.get('stocks', [])]
+    return {
+        "sector_members": pd.DataFrame(members, columns=["sector", "symbol"]),
+        "vn30_members": pd.DataFrame({"symbol": VN30_STOCKS}),
+        "vn_indices": pd.DataFrame([(code, info["name"], info["exchange"]) for code, info in VIETNAM_INDICES.items()],
+                                   columns=["code", "name", "exchange"]),
+    }
+
+
+class MarketSQL:
+    """
+    In-process DuckDB database whose views read the local Parquet stores directly, so
+    queries always see the latest cached bars, FRED observations, TE snapshots and
+    metric history without an import step.
+
+        sql = get_sql()
+        sql.query("SELECT * FROM sector_returns(DATE '2025-01-01', current_date)")
+        sql.query('''SELECT v.symbol, avg(v.excess_return) FROM vn30_daily v
+                     JOIN (SELECT date, value - lag(value) OVER (ORDER BY date) AS move
+                           FROM fred WHERE series_id = 'FEDFUNDS') f
+                       ON date_trunc('month', v.date) = f.date
+                     WHERE f.move < 0 GROUP BY 1 ORDER BY 2 DESC''')
+    """
+
+    def __init__(self, root: Optional[Path] = None):
+        import duckdb
+
+        self.root = Path(root or CACHE_DIR)
+        self._con = duckdb.connect(":memory:")
+        # GLOBAL: the per-query cursors do not inherit session settings of the parent connection
+        self._con.execute(f"SET GLOBAL TimeZone = '{MARKET_TZ}'")
+        self._lock = threading.Lock()
+        self.refresh()
+
+    def _store_sql(self, pattern: str, select: str, columns: str) -> str:
+        if not any(self.root.glob(pattern)):
+            # No file yet: an empty view with the store's columns
+            nulls = ", ".join(f"NULL::{kind} AS {name}" for name, kind in (c.split() for c in columns.split(", ")))
+            return f"SELECT {nulls} WHERE false"
+        return (f"SELECT {select} FROM read_parquet('{(self.root / pattern).as_posix()}', "
+                f"hive_partitioning = true, union_by_name = true)")
+
+    def refresh(self) -> None:
+        """(Re)create every view; needed only when a store that was empty gets its first file."""
+        with self._lock:
+            for name, frame in _reference_tables().items():
+                self._con.register(f"_{name}", frame)
+                self._con.execute(f"CREATE OR REPLACE TABLE {name} AS SELECT * FROM _{name}")
+                self._con.unregister(f"_{name}")
+            for name, (pattern, select, columns) in STORES.items():
+                self._con.execute(f"CREATE OR REPLACE VIEW {name} AS {self._store_sql(pattern, select, columns)}")
+            for name, body in VIEWS.items():
+                self._con.execute(f"CREATE OR REPLACE VIEW {name} AS {body}")
+            for name, (params, body) in MACROS.items():
+                self._con.execute(f"CREATE OR REPLACE MACRO {name}({params}) AS TABLE {body}")
+            self._empty = [name for name, (pattern, _, _) in STORES.items() if not any(self.root.glob(pattern))]
+
+    def query(self, sql: str, params: Optional[Sequence] = None) -> pd.DataFrame:
+        """Run `sql` (with optional positional `?` parameters) and return the result as a DataFrame."""
+        if any(any(self.root.glob(STORES[name][0])) for name in self._empty):
+            self.refresh()
+        # A cursor per call: DuckDB connections are not shared safely across threads
+        with self._lock:
+            cursor = self._con.cursor()
+        try:
+            return cursor.execute(sql, params or []).df()
+        finally:
+            cursor.close()
+
+    def tables(self) -> List[str]:
+        return self.query("SELECT table_name FROM information_schema.tables ORDER BY 1")["table_name"].tolist()
+
+
+_sql: Optional[MarketSQL] = None
+_sql_lock = threading.Lock()
+
+
+def get_sql() -> MarketSQL:
+    """Process-wide SQL layer over the default cache directory (requires the duckdb package)."""
+    global _sql
+    if not HAS_DUCKDB:
+        raise RuntimeError("duckdb is not installed; the SQL layer is unavailable")
+    with _sql_lock:
+        if _sql is None:
+            _sql = MarketSQL()
+        return _sql
+
+
+def query(sql: str, params: Optional[Sequence] = None) -> pd.DataFrame:
+    """Run ad-hoc SQL against the local stores; see MarketSQL for the available views."""
+    return get_sql().query(sql, params)
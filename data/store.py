@@ -0,0 +1,445 @@
+# data/store.py - Local on-disk stores for provider data
+import contextlib
+import datetime as dt
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import pandas as pd
+
+from analysis.streaming import IndicatorSet
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+# Root directory for all local stores; override with ECOTRACK_CACHE_DIR
+CACHE_DIR = Path(os.getenv("ECOTRACK_CACHE_DIR", ".cache"))
+
+
+def _atomic_write_parquet(df: pd.DataFrame, path: Path) -> None:
+    """Write to a temp file and rename so readers never see a partial file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+    df.to_parquet(tmp, index=False)
+    os.replace(tmp, path)
+
+
+def _atomic_write_json(obj: Dict, path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_text(json.dumps(obj))
+    os.replace(tmp, path)
+
+
+@contextlib.contextmanager
+def _file_lock(path: Path):
+    """Exclusive lock on `path` held across processes (flock, or msvcrt on Windows) until the block exits."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:  # LK_LOCK gives up after ~10s; keep waiting
+                    continue
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class _PartitionedStore:
+    """One directory per key under <root>/<dataset>/<partition>=<KEY>/ with a data file and meta.json."""
+
+    partition = "key"
+    filename = "data.parquet"
+
+    def __init__(self, root: Optional[Path] = None, dataset: str = "data"):
+        self.root = Path(root or CACHE_DIR) / dataset
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    def _dir(self, key: str) -> Path:
+        return self.root / f"{self.partition}={key.upper()}"
+
+    def _lock(self, key: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(key.upper(), threading.Lock())
+
+    @contextlib.contextmanager
+    def _locked(self, key: str):
+        """Hold `key` against other threads and, through `.lock` in its partition, other processes."""
+        with self._lock(key), _file_lock(self._dir(key) / ".lock"):
+            yield
+
+    def _read_json(self, key: str, name: str) -> Optional[Dict]:
+        try:
+            return json.loads((self._dir(key) / name).read_text())
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Corrupt {self.root.name} {name} for {key}: {e}")
+            return None
+
+    def _read_meta(self, key: str) -> Optional[Dict]:
+        return self._read_json(key, "meta.json")
+
+    def _read_frame(self, key: str) -> pd.DataFrame:
+        path = self._dir(key) / self.filename
+        if not path.exists():
+            return pd.DataFrame()
+        try:
+            return pd.read_parquet(path)
+        except Exception as e:
+            logger.warning(f"Failed to read {self.root.name} cache for {key}: {e}")
+            return pd.DataFrame()
+
+    def _write(self, key: str, df: pd.DataFrame, meta: Dict) -> None:
+        try:
+            _atomic_write_parquet(df, self._dir(key) / self.filename)
+            _atomic_write_json(meta, self._dir(key) / "meta.json")
+        except Exception as e:
+            logger.warning(f"Failed to write {self.root.name} cache for {key}: {e}")
+
+
+class ParquetBarCache(_PartitionedStore):
+    """
+    Columnar store for daily OHLCV bars, one partition per symbol:
+        <root>/tcbs_daily/symbol=<SYMBOL>/bars.parquet
+        <root>/tcbs_daily/symbol=<SYMBOL>/meta.json   {"covered_from", "last_date"}
+        <root>/tcbs_daily/symbol=<SYMBOL>/indicators.json   streaming indicator state
+
+    `covered_from` is the earliest start date already requested, so symbols listed
+    after that date are not refetched forever; `last_date` is the delta watermark.
+    The ingest daemon and the dashboard both write here, so read-merge-writes of a
+    symbol hold its partition's `.lock`.
+    The indicator state is only kept for symbols someone asked for (`indicator_state`);
+    from then on each append advances it with just the delta bars instead of replaying the history.
+    """
+
+    partition = "symbol"
+    filename = "bars.parquet"
+
+    def __init__(self, root: Optional[Path] = None, dataset: str = "tcbs_daily"):
+        super().__init__(root, dataset)
+
+    def meta(self, symbol: str) -> Optional[Dict[str, dt.date]]:
+        """Coverage metadata for `symbol`, or None if nothing is stored."""
+        raw = self._read_meta(symbol)
+        if not raw:
+            return None
+        try:
+            return {k: dt.date.fromisoformat(v) for k, v in raw.items()}
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Corrupt bar cache metadata for {symbol}: {e}")
+            return None
+
+    def load(self, symbol: str) -> pd.DataFrame:
+        return self._read_frame(symbol)
+
+    def refreshed_at(self, symbol: str) -> Optional[float]:
+        """Epoch seconds of the last append for `symbol` (the delta path always re-appends the last bar), or None."""
+        try:
+            return (self._dir(symbol) / "meta.json").stat().st_mtime
+        except OSError:
+            return None
+
+    def append(self, symbol: str, bars: pd.DataFrame, covered_from: dt.date) -> pd.DataFrame:
+        """Merge new bars into the partition (newer rows win on the same date) and return the full history."""
+        with self._locked(symbol):
+            existing = self.load(symbol)
+            frames = [f for f in (existing, bars) if not f.empty]
+            if not frames:
+                return pd.DataFrame()
+
+            merged = (pd.concat(frames, ignore_index=True)
+                      .drop_duplicates(subset="date", keep="last")
+                      .sort_values("date")
+                      .reset_index(drop=True))
+
+            meta = self.meta(symbol)
+            if meta:
+                covered_from = min(covered_from, meta["covered_from"])
+
+            self._write(symbol, merged, {
+                "covered_from": covered_from.isoformat(),
+                "last_date": merged["date"].iloc[-1].date().isoformat(),
+            })
+            self._advance_indicators(symbol, merged, bars)
+            return merged
+
+    def indicator_state(self, symbol: str) -> Optional[IndicatorSet]:
+        """
+        Streaming indicator state as of the last stored bar, or None if no bars are stored.
+        The first call for a symbol builds it from the stored history; later appends keep it
+        current, so this is a read of indicators.json.
+        """
+        state = self._read_indicators(symbol)
+        if state is not None:
+            return state
+        with self._locked(symbol):
+            bars = self.load(symbol)
+            if bars.empty:
+                return None
+            return self._write_indicators(symbol, bars, IndicatorSet().update_frame(bars))
+
+    def _read_indicators(self, symbol: str) -> Optional[IndicatorSet]:
+        raw = self._read_json(symbol, "indicators.json")
+        if not raw:
+            return None
+        try:
+            return IndicatorSet.from_dict(raw)
+        except (KeyError, TypeError, ValueError) as e:
+            logger.warning(f"Corrupt indicator state for {symbol}: {e}")
+            return None
+
+    def _write_indicators(self, symbol: str, history: pd.DataFrame, state: IndicatorSet) -> IndicatorSet:
+        first_date = history["date"].iloc[0].date().isoformat()
+        try:
+            _atomic_write_json({"first_date": first_date, **state.to_dict()}, self._dir(symbol) / "indicators.json")
+        except Exception as e:
+            logger.warning(f"Failed to write indicator state for {symbol}: {e}")
+        return state
+
+    def _advance_indicators(self, symbol: str, merged: pd.DataFrame, bars: pd.DataFrame) -> None:
+        """
+        Apply a delta to the state of a subscribed symbol. Bars at or after the watermark are
+        applied in O(1) each (the last stored bar may be revised); a delta reaching further back,
+        or a history extended backwards, rebuilds the state from `merged`, already in memory.
+        """
+        raw = self._read_json(symbol, "indicators.json") if not bars.empty else None
+        if not raw:
+            return
+        state = None
+        if raw.get("first_date") == merged["date"].iloc[0].date().isoformat():
+            try:
+                state = IndicatorSet.from_dict(raw)
+            except (KeyError, TypeError, ValueError) as e:
+                logger.warning(f"Rebuilding corrupt indicator state for {symbol}: {e}")
+        delta = bars.drop_duplicates(subset="date", keep="last").sort_values("date")
+        if state is None or state.last_date is None or delta["date"].iloc[0].date().isoformat() < state.last_date:
+            state = IndicatorSet().update_frame(merged)
+        else:
+            state.update_frame(delta)
+        self._write_indicators(symbol, merged, state)
+
+
+class FredSeriesStore(_PartitionedStore):
+    """
+    Observation store for FRED series, one partition per series ID:
+        <root>/fred/series_id=<ID>/observations.parquet   columns: date, value
+        <root>/fred/series_id=<ID>/meta.json   {"covered_from", "watermark", "last_updated"}
+
+    `watermark` is the latest stored observation date; `last_updated` is FRED's own
+    revision timestamp from the series metadata, used to skip unchanged series.
+    Like the bar cache, merges hold the partition's `.lock` against other processes.
+    """
+
+    partition = "series_id"
+    filename = "observations.parquet"
+
+    def __init__(self, root: Optional[Path] = None, dataset: str = "fred"):
+        super().__init__(root, dataset)
+
+    def meta(self, series_id: str) -> Optional[Dict]:
+        raw = self._read_meta(series_id)
+        if not raw:
+            return None
+        try:
+            return {
+                "covered_from": dt.date.fromisoformat(raw["covered_from"]),
+                "watermark": dt.date.fromisoformat(raw["watermark"]),
+                "last_updated": raw.get("last_updated"),
+            }
+        except (KeyError, TypeError, ValueError) as e:
+            logger.warning(f"Corrupt FRED store metadata for {series_id}: {e}")
+            return None
+
+    def load(self, series_id: str) -> pd.Series:
+        df = self._read_frame(series_id)
+        if df.empty:
+            return pd.Series(dtype=float, name=series_id)
+        return pd.Series(df["value"].values, index=pd.DatetimeIndex(df["date"]), name=series_id)
+
+    def append(self, series_id: str, observations: pd.Series, covered_from: dt.date,
+               last_updated: Optional[str]) -> pd.Series:
+        """Merge observations (newer values win on the same date) and advance the watermark."""
+        with self._locked(series_id):
+            existing = self.load(series_id)
+            parts = [p for p in (existing, observations.dropna()) if len(p)]
+            if not parts:
+                return existing
+
+            merged = pd.concat(parts)
+            merged = merged[~merged.index.duplicated(keep="last")].sort_index()
+            merged.name = series_id
+
+            meta = self.meta(series_id)
+            if meta:
+                covered_from = min(covered_from, meta["covered_from"])
+
+            self._write(series_id, pd.DataFrame({"date": merged.index, "value": merged.values}), {
+                "covered_from": covered_from.isoformat(),
+                "watermark": merged.index[-1].date().isoformat(),
+                "last_updated": last_updated,
+            })
+            return merged
+
+
+class MetricHistoryStore:
+    """
+    Append-only history of computed dashboard metrics, partitioned by month:
+        <root>/metrics/month=<YYYY-MM>/part-<write ns>.parquet   columns: ts, metric, value, label
+        <root>/metrics/meta.json   {"last_ts": {metric: ISO timestamp}}
+        <root>/metrics/.lock   held by writers (appends and compactions) in any process
+
+    Each append writes one small file and never touches existing ones; months with
+    many parts are merged into a single file. Range queries only open the month
+    partitions that overlap the range, so a trend is a scan, not a recomputation.
+    The ingest daemon and the dashboard both append, so writers serialize on `.lock`;
+    readers take no lock.
+    """
+
+    COMPACT_PARTS = 64
+
+    def __init__(self, root: Optional[Path] = None, dataset: str = "metrics"):
+        self.root = Path(root or CACHE_DIR) / dataset
+        self._lock = threading.Lock()
+
+    def last_ts(self) -> Dict[str, pd.Timestamp]:
+        """Time of the latest recorded snapshot of each metric."""
+        try:
+            raw = json.loads((self.root / "meta.json").read_text())["last_ts"]
+            return {metric: pd.Timestamp(ts) for metric, ts in raw.items()}
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.warning(f"Corrupt metric history metadata: {e}")
+            return {}
+
+    def append(self, values: Dict[str, float], at: dt.datetime, labels: Optional[Dict[str, str]] = None) -> bool:
+        """
+        Record one snapshot of `values` taken at `at`. Metrics already recorded at or after
+        `at` are skipped, so re-running the same computation adds nothing.
+        """
+        ts = _utc(at)
+        labels = labels or {}
+        with self._lock, _file_lock(self.root / ".lock"):
+            last = self.last_ts()
+            rows = {k: float(v) for k, v in values.items()
+                    if v is not None and pd.notna(v) and (k not in last or ts > last[k])}
+            if not rows:
+                return False
+            month = self.root / f"month={ts:%Y-%m}"
+            frame = pd.DataFrame({
+                "ts": pd.Series([ts] * len(rows), dtype="datetime64[ns, UTC]"),
+                "metric": list(rows),
+                "value": list(rows.values()),
+                "label": [labels.get(k, "") for k in rows],
+            })
+            last.update(dict.fromkeys(rows, ts))
+            try:
+                _atomic_write_parquet(frame, month / f"part-{time.time_ns()}.parquet")
+                _atomic_write_json({"last_ts": {k: v.isoformat() for k, v in last.items()}}, self.root / "meta.json")
+            except Exception as e:
+                logger.warning(f"Failed to append metric snapshot: {e}")
+                return False
+            if len(list(month.glob("part-*.parquet"))) > self.COMPACT_PARTS:
+                self._compact(month)
+        return True
+
+    def _compact(self, month: Path) -> None:
+        """
+        Merge a month's part files into one; called with the writer lock held. The merged file
+        is written before the parts are removed, so a reader that listed the parts earlier finds
+        one missing rather than reading a partial month, and lists the month again (`_read_month`).
+        """
+        parts = sorted(month.glob("part-*.parquet"))
+        try:
+            merged = pd.concat([pd.read_parquet(p) for p in parts], ignore_index=True)
+            merged = merged.drop_duplicates(subset=["ts", "metric"], keep="last").sort_values(["ts", "metric"])
+            # Named after its newest part so it sorts after every part it replaces
+            _atomic_write_parquet(merged, month / f"{parts[-1].stem}-c.parquet")
+            for p in parts:
+                p.unlink()
+        except Exception as e:
+            logger.warning(f"Failed to compact metric history {month.name}: {e}")
+
+    def _partitions(self, start: Optional[pd.Timestamp], end: Optional[pd.Timestamp]) -> List[Path]:
+        lo = f"month={start:%Y-%m}" if start is not None else ""
+        hi = f"month={end:%Y-%m}" if end is not None else "month=9999"
+        return sorted(d for d in self.root.glob("month=*") if lo <= d.name <= hi)
+
+    def _read_month(self, month: Path, filters: list, attempts: int = 5) -> List[pd.DataFrame]:
+        """
+        Every part of `month`. A part that vanished between listing and reading was merged
+        away by a compaction whose merged file was not in the listing, so the month is read again.
+        """
+        for _ in range(attempts):
+            frames = []
+            for part in sorted(month.glob("part-*.parquet")):
+                try:
+                    frames.append(pd.read_parquet(part, filters=filters or None))
+                except FileNotFoundError:
+                    break
+                except Exception as e:
+                    logger.warning(f"Failed to read metric history {part.name}: {e}")
+            else:
+                return frames
+        logger.warning(f"Metric history {month.name} kept changing while being read; rows may be missing")
+        return frames
+
+    def query(self, start=None, end=None, metrics: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """Long-format rows (ts, metric, value, label) with start <= ts <= end, oldest first."""
+        start = None if start is None else _utc(start)
+        end = None if end is None else _utc(end)
+        filters = []
+        if start is not None:
+            filters.append(("ts", ">=", start))
+        if end is not None:
+            filters.append(("ts", "<=", end))
+        if metrics is not None:
+            filters.append(("metric", "in", list(metrics)))
+
+        frames = []
+        for month in self._partitions(start, end):
+            frames.extend(self._read_month(month, filters))
+        frames = [f for f in frames if not f.empty]
+        if not frames:
+            return pd.DataFrame(columns=["ts", "metric", "value", "label"])
+        rows = pd.concat(frames, ignore_index=True)
+        return (rows.drop_duplicates(subset=["ts", "metric"], keep="last")
+                .sort_values(["ts", "metric"]).reset_index(drop=True))
+
+    def frame(self, start=None, end=None, metrics: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """Wide view of `query`: one row per snapshot time, one column per metric."""
+        rows = self.query(start, end, metrics)
+        if rows.empty:
+            return pd.DataFrame()
+        return rows.pivot(index="ts", columns="metric", values="value")
+
+    def series(self, metric: str, start=None, end=None) -> pd.Series:
+        rows = self.query(start, end, [metric])
+        return pd.Series(rows["value"].to_numpy(), index=pd.DatetimeIndex(rows["ts"]), name=metric, dtype=float)
+
+
+def _utc(value) -> pd.Timestamp:
+    ts = pd.Timestamp(value)
+    return ts.tz_localize("UTC") if ts.tzinfo is None else ts.tz_convert("UTC")
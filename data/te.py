@@ -1,17 +1,20 @@
 # data/te.py
 # Enhanced Trading Economics integration for Vietnam
+import asyncio
 import datetime as dt
 import urllib.parse as _up
-from typing import Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 import pandas as pd
-import requests
-import streamlit as st
 import numpy as np
 
 from config.keys import load_tradingEconomic_key
+from utils import http
+from utils.cache import cached
+from utils.metrics import timed
 
 TE_BASE = "https://api.tradingeconomics.com"
+TE_TIMEOUT = 15  # seconds per attempt
 
 # Comprehensive Vietnam economic indicators
 TE_VN_INDICATORS: Dict[str, Dict[str, str]] = {
@@ -59,14 +62,13 @@ def _te_cred() -> str:
     return load_tradingEconomic_key()
 
 
-def _get(url: str, params: Optional[Dict] = None) -> Optional[requests.Response]:
-    try:
-        r = requests.get(url, params=params, timeout=15)
-        if not r.ok:
-            return None
-        return r
-    except Exception:
-        return None
+async def _get_json(url: str, params: Optional[Dict] = None) -> Optional[Any]:
+    return await http.get_json(url, params, provider="trading_economics", timeout=TE_TIMEOUT)
+
+
+def _get(url: str, params: Optional[Dict] = None) -> Optional[Any]:
+    """Decoded JSON of a TE endpoint, or None (blocking wrapper for the cached loaders)."""
+    return http.run(_get_json(url, params))
 
 
 def _as_float(x):
@@ -78,33 +80,40 @@ def _as_float(x):
         return None
 
 
-@st.cache_data(ttl=900)
+@timed()
+@cached('trading_economics')
+def get_country_snapshot(country: str) -> Dict[str, Dict]:
+    """
+    Latest values of every indicator for one country, fetched once per TTL.
+    Returns: {lowercase category name: raw TE item}
+    """
+    items = _get(f"{TE_BASE}/indicators/country/{country}", {"c": _te_cred(), "format": "json"})
+    if not isinstance(items, list):
+        return {}
+
+    snapshot: Dict[str, Dict] = {}
+    for item in items:
+        name = (item.get("Category") or item.get("Indicator") or "").lower()
+        if name and name not in snapshot:
+            snapshot[name] = item
+    return snapshot
+
+
+@timed()
+@cached('trading_economics')
 def get_comprehensive_vn_data() -> Dict[str, Dict]:
     """
     Get comprehensive Vietnam economic data from Trading Economics.
     Returns: {indicator_key: {'name','value','previous','date','unit','change'}}
     """
-    cred = _te_cred()
-    url = f"{TE_BASE}/indicators/country/vietnam"
-    r = _get(url, {"c": cred, "format": "json"})
+    snapshot = get_country_snapshot("vietnam")
     out: Dict[str, Dict] = {}
 
-    if not r:
-        return out
-
-    try:
-        items = r.json() or []
-    except Exception:
-        return out
-
-    wanted = {v["te"].lower(): (k, v) for k, v in TE_VN_INDICATORS.items()}
-
-    for item in items:
-        te_name = (item.get("Category") or item.get("Indicator") or "").lower()
-        if te_name not in wanted:
+    for key, meta in TE_VN_INDICATORS.items():
+        item = snapshot.get(meta["te"].lower())
+        if item is None:
             continue
 
-        key, meta = wanted[te_name]
         val = _as_float(item.get("Last") or item.get("LatestValue"))
         prev = _as_float(item.get("Previous") or item.get("Prior"))
         date = item.get("Date") or item.get("LatestValueDate")
@@ -127,88 +136,82 @@ def get_comprehensive_vn_data() -> Dict[str, Dict]:
     return out
 
 
-@st.cache_data(ttl=1800)
+@timed()
+@cached('trading_economics')
 def get_global_economic_context() -> Dict[str, Dict]:
     """Get global indicators that impact Vietnam markets."""
-    cred = _te_cred()
     out = {}
 
     for key, config in GLOBAL_INDICATORS.items():
-        country = config["country"]
-        indicator = config["te"]
-
-        url = f"{TE_BASE}/indicators/country/{country}"
-        r = _get(url, {"c": cred, "format": "json"})
+        snapshot = get_country_snapshot(config["country"])
+        if not snapshot:
+            continue
 
-        if not r:
+        indicator = config["te"].lower()
+        item = snapshot.get(indicator)
+        if item is None:
+            # Fall back to the first category containing the indicator name
+            item = next((v for name, v in snapshot.items() if indicator in name), None)
+        if item is None:
             continue
 
         try:
-            items = r.json() or []
-            for item in items:
-                item_name = (item.get("Category") or item.get("Indicator") or "").lower()
-                if indicator.lower() in item_name:
-                    val = _as_float(item.get("Last") or item.get("LatestValue"))
-                    prev = _as_float(item.get("Previous"))
-                    date = item.get("Date")
-
-                    change = None
-                    if val is not None and prev is not None and prev != 0:
-                        change = ((val - prev) / abs(prev)) * 100
-
-                    out[key] = {
-                        "name": config["name"],
-                        "value": val,
-                        "previous": prev,
-                        "date": date,
-                        "change": change
-                    }
-                    break
+            val = _as_float(item.get("Last") or item.get("LatestValue"))
+            prev = _as_float(item.get("Previous"))
+            date = item.get("Date")
+
+            change = None
+            if val is not None and prev is not None and prev != 0:
+                change = ((val - prev) / abs(prev)) * 100
+
+            out[key] = {
+                "name": config["name"],
+                "value": val,
+                "previous": prev,
+                "date": date,
+                "change": change
+            }
         except Exception:
             continue
 
     return out
 
 
-@st.cache_data(ttl=1800)
-def get_vn_economic_series(keys: List[str], years_back: int = 3) -> Dict[str, pd.Series]:
-    """Get historical series for Vietnam economic indicators."""
-    cred = _te_cred()
-    start = (dt.date.today() - dt.timedelta(days=365 * years_back)).isoformat()
-    series: Dict[str, pd.Series] = {}
-
-    for key in keys:
-        if key not in TE_VN_INDICATORS:
-            continue
+async def _historical_series(key: str, cred: str, start: str) -> Optional[pd.Series]:
+    te_name = TE_VN_INDICATORS[key]["te"]
+    encoded_name = _up.quote(te_name, safe="")
+    url = f"{TE_BASE}/historical/country/vietnam/indicator/{encoded_name}"
 
-        te_name = TE_VN_INDICATORS[key]["te"]
-        encoded_name = _up.quote(te_name, safe="")
-        url = f"{TE_BASE}/historical/country/vietnam/indicator/{encoded_name}"
+    data = await _get_json(url, {"c": cred, "format": "json", "d1": start})
+    if not data:
+        return None
 
-        r = _get(url, {"c": cred, "format": "json", "d1": start})
-        if not r:
-            continue
+    try:
+        df = pd.DataFrame(data)
+        if "Date" not in df or "Value" not in df:
+            return None
 
-        try:
-            data = r.json() or []
-            if not data:
-                continue
+        idx = pd.to_datetime(df["Date"], errors="coerce")
+        vals = pd.to_numeric(df["Value"], errors="coerce")
+        s = pd.Series(vals.values, index=idx).dropna().sort_index()
+        return s if len(s) > 0 else None
 
-            df = pd.DataFrame(data)
-            if "Date" not in df or "Value" not in df:
-                continue
+    except Exception:
+        return None
 
-            idx = pd.to_datetime(df["Date"], errors="coerce")
-            vals = pd.to_numeric(df["Value"], errors="coerce")
-            s = pd.Series(vals.values, index=idx).dropna().sort_index()
 
-            if len(s) > 0:
-                series[key] = s
+@timed()
+@cached('trading_economics')
+def get_vn_economic_series(keys: List[str], years_back: int = 3) -> Dict[str, pd.Series]:
+    """Get historical series for Vietnam economic indicators (all keys requested concurrently)."""
+    cred = _te_cred()
+    start = (dt.date.today() - dt.timedelta(days=365 * years_back)).isoformat()
+    keys = [key for key in keys if key in TE_VN_INDICATORS]
 
-        except Exception:
-            continue
+    async def fetch_all():
+        return await asyncio.gather(*(_historical_series(key, cred, start) for key in keys))
 
-    return series
+    return {key: s for key, s in zip(keys, http.run(fetch_all())) if s is not None}
 
 
 def calculate_economic_score(vn_data: Dict[str, Dict]) -> Tuple[float, str, List[str]]:
@@ -1,6 +1,14 @@
 # data/us.py
+import asyncio
+import datetime as dt
+import importlib.util
 import logging
-from typing import Tuple, Dict
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import Future
+from typing import Iterable, Optional, Tuple, Dict
 
 import pandas as pd
 import streamlit as st
@@ -8,10 +16,31 @@ from fredapi import Fred
 from tenacity import retry, stop_after_attempt, wait_fixed
 
 from config.keys import load_fred_key
-from constants import ECONOMIC_INDICATORS
+from constants import DATA_SOURCES, ECONOMIC_INDICATORS
+from data.store import FredSeriesStore
+from utils import http
+from utils.cache import cached
+from utils.metrics import timed
 
 logger = logging.getLogger(__name__)
 
+# Persistent observation store; set ECOTRACK_FRED_STORE=0 to always download full ranges
+FRED_STORE: Optional[FredSeriesStore] = (
+    FredSeriesStore() if os.getenv("ECOTRACK_FRED_STORE", "1") != "0" and importlib.util.find_spec("pyarrow") else None
+)
+
+
+FRED_BASE = DATA_SOURCES['fred']['base_url']
+FRED_TIMEOUT = 30  # seconds per attempt
+FRED_MAX_WORKERS = DATA_SOURCES['fred'].get('max_concurrency', 4)
+# One semaphore per event loop: an asyncio.Semaphore binds to the loop that first waits on it
+_fred_gates: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+# Results are shared between callers for this long (one dashboard refresh)
+FRED_SHARE_WINDOW = 300
+# Every fetch covers at least this much history, so the widest "Historical Data Period" (36 months)
+# plus the YoY padding is served by the same request as narrower callers
+FRED_MIN_HISTORY = pd.DateOffset(months=36 + 13)
+
 
 @st.cache_resource
 def get_fred_client():
@@ -23,17 +52,143 @@ def get_fred_client():
         return None
 
 
-@st.cache_data(ttl=1800)
+def _fred_gate() -> asyncio.Semaphore:
+    """Semaphore capping concurrent FRED series loads on the running loop."""
+    loop = asyncio.get_running_loop()
+    gate = _fred_gates.get(loop)
+    if gate is None:
+        gate = _fred_gates[loop] = asyncio.Semaphore(FRED_MAX_WORKERS)
+    return gate
+
+
+async def _fred_get(path: str, api_key: str, **params):
+    data = await http.get_json(f"{FRED_BASE}{path}", {**params, "api_key": api_key, "file_type": "json"},
+                               provider='fred', timeout=FRED_TIMEOUT)
+    if data is None:
+        raise RuntimeError(f"FRED request failed: {path} {params.get('series_id', '')}")
+    return data
+
+
+async def _fred_observations(api_key: str, series_id: str, start: dt.date) -> pd.Series:
+    """Observations of `series_id` since `start` ('.' placeholders become NaN)."""
+    data = await _fred_get("series/observations", api_key, series_id=series_id, observation_start=start.isoformat())
+    obs = data.get("observations", [])
+    return pd.Series(pd.to_numeric([o.get("value") for o in obs], errors="coerce"),
+                     index=pd.to_datetime([o.get("date") for o in obs]), name=series_id, dtype=float)
+
+
+async def _fred_last_updated(api_key: str, series_id: str) -> str:
+    data = await _fred_get("series", api_key, series_id=series_id)
+    return str((data.get("seriess") or [{}])[0].get("last_updated"))
+
+
+async def _fred_series(api_key: str, series_id: str, start: dt.date) -> pd.Series:
+    """
+    Observations of `series_id` from `start`, served from the local store.
+
+    FRED's `last_updated` metadata is checked first: unrevised series cost one
+    metadata call and no download; revised ones fetch only from the watermark on.
+    """
+    async with _fred_gate():
+        if FRED_STORE is None:
+            return (await _fred_observations(api_key, series_id, start)).dropna()
+
+        meta = await asyncio.to_thread(FRED_STORE.meta, series_id)
+        try:
+            last_updated = await _fred_last_updated(api_key, series_id)
+        except Exception as e:
+            logger.warning(f"FRED metadata unavailable for {series_id}: {e}")
+            last_updated = None
+
+        if meta and meta["covered_from"] <= start:
+            if last_updated is not None and last_updated == meta["last_updated"]:
+                series = await asyncio.to_thread(FRED_STORE.load, series_id)
+            else:
+                # Include the watermark itself so a revised latest observation is replaced
+                try:
+                    fresh = await _fred_observations(api_key, series_id, meta["watermark"])
+                    series = await asyncio.to_thread(FRED_STORE.append, series_id, fresh, meta["covered_from"], last_updated)
+                except Exception as e:
+                    logger.warning(f"FRED delta fetch failed for {series_id}, serving stored data: {e}")
+                    series = await asyncio.to_thread(FRED_STORE.load, series_id)
+        else:
+            fresh = await _fred_observations(api_key, series_id, start)
+            series = await asyncio.to_thread(FRED_STORE.append, series_id, fresh, start, last_updated)
+
+    return series[series.index >= pd.Timestamp(start)].dropna()
+
+
+class FredFetcher:
+    """
+    Concurrent FRED loader shared by every caller in the process.
+
+    Series IDs are de-duplicated across callers, including requests still in flight,
+    so one refresh downloads each ID at most once. Downloads run on the shared HTTP
+    event loop and every call draws from the 'fred' rate limiter (120 requests/minute).
+    """
+
+    def __init__(self, share_window: float = FRED_SHARE_WINDOW):
+        self.share_window = share_window
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Tuple[dt.date, float, Future]] = {}
+
+    def _reusable(self, entry: Optional[Tuple[dt.date, float, Future]], start: dt.date, now: float) -> bool:
+        if entry is None:
+            return False
+        covered_from, submitted, fut = entry
+        if covered_from > start or now - submitted > self.share_window:
+            return False
+        return not (fut.done() and fut.exception() is not None)
+
+    def fetch(self, fred: Fred, series_ids: Iterable[str], start: dt.date) -> Dict[str, pd.Series]:
+        """Return {series_id: observations since `start`}; failed series are omitted."""
+        floor = min(start, (pd.Timestamp.now() - FRED_MIN_HISTORY).date())
+        now = time.monotonic()
+        futures: Dict[str, Future] = {}
+
+        with self._lock:
+            for series_id in dict.fromkeys(series_ids):
+                entry = self._entries.get(series_id)
+                if not self._reusable(entry, start, now):
+                    entry = (floor, now, http.HTTP.submit(_fred_series(fred.api_key, series_id, floor)))
+                    self._entries[series_id] = entry
+                futures[series_id] = entry[2]
+
+        out: Dict[str, pd.Series] = {}
+        for series_id, fut in futures.items():
+            try:
+                series = fut.result()
+                out[series_id] = series[series.index >= pd.Timestamp(start)]
+            except Exception as e:
+                logger.error(f"Error fetching FRED series {series_id}: {e}")
+        return out
+
+
+_fetcher = FredFetcher()
+
+
+def fetch_fred_series(series_ids: Iterable[str], start: dt.date) -> Dict[str, pd.Series]:
+    """Fetch several FRED series concurrently through the shared fetcher."""
+    fred = get_fred_client()
+    if not fred:
+        return {}
+    return _fetcher.fetch(fred, series_ids, start)
+
+
+@timed()
+@cached('fred')
 @retry(stop=stop_after_attempt(3), wait=wait_fixed(2))
 def get_enhanced_us_data(months_back: int = 12) -> Tuple[Dict, Dict]:
     fred = get_fred_client()
     if not fred:
         return {}, {}
     data, series_data = {}, {}
-    start_date = pd.Timestamp.now() - pd.DateOffset(months=months_back)
+    # Extra 13 months of history so YoY changes are defined over the whole window
+    start_date = pd.Timestamp.now() - pd.DateOffset(months=months_back + 13)
+    fetched = fetch_fred_series([cfg['fred'] for cfg in ECONOMIC_INDICATORS.values()], start_date.date())
     for key, cfg in ECONOMIC_INDICATORS.items():
         try:
-            series = fred.get_series(cfg['fred'], start=start_date).dropna()
+            series = fetched.get(cfg['fred'])
             if series is None or len(series) == 0:
                 continue
             series_data[key] = series
@@ -60,15 +215,19 @@ def get_enhanced_us_data(months_back: int = 12) -> Tuple[Dict, Dict]:
     return data, series_data
 
 
-@st.cache_data(ttl=1800)
+@timed()
+@cached('fred')
 def get_fed_probability():
     """Heuristic Fed gauge from 10Y - Fed Funds (NOT CME probabilities)."""
     fred = get_fred_client()
     if not fred:
         return {'error': 'FRED not available'}
     try:
-        fed_rate = fred.get_series('FEDFUNDS', limit=12).dropna()
-        t10y = fred.get_series('GS10', limit=12).dropna()
+        # Shares the fetch with get_enhanced_us_data (both IDs are in ECONOMIC_INDICATORS)
+        start = (pd.Timestamp.now() - pd.DateOffset(months=12)).date()
+        fetched = fetch_fred_series(['FEDFUNDS', 'GS10'], start)
+        fed_rate = fetched.get('FEDFUNDS', pd.Series(dtype=float))
+        t10y = fetched.get('GS10', pd.Series(dtype=float))
         if len(fed_rate) and len(t10y):
             cur_fed = float(fed_rate.iloc[-1])
             cur_10y = float(t10y.iloc[-1])
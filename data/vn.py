@@ -1,25 +1,52 @@
 # data/vn.py - FIXED VERSION
+import asyncio
 import datetime as dt
+import importlib.util
 import logging
+import os
+import random
 import time
 from typing import Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
 import numpy as np
 import pandas as pd
-import requests
-import streamlit as st
-from analysis.indicators import calculate_rsi, get_market_sentiment
-from constants import VN_MAJOR_STOCKS
+from analysis.correlation import align_series, changes, correlation_matrix
+from analysis.index_weights import contributions, index_shares, rebalance_period
+from analysis.indicators import get_market_sentiment
+from analysis.panel import build_panel, compute_breadth, compute_panel_indicators, technical_dict
+from constants import DATA_SOURCES, VIETNAM_MARKET_PARAMS, VN_MAJOR_STOCKS
+from data.store import ParquetBarCache
+from utils import http
+from utils.cache import cached
+from utils.metrics import timed
 
 logger = logging.getLogger(__name__)
 
 # TCBS API endpoints
 TCBS_BARS_URL = "https://apipubaws.tcbs.com.vn/stock-insight/v1/stock/bars-long-term"
+TCBS_INTRADAY_URL = "https://apipubaws.tcbs.com.vn/stock-insight/v2/stock/bars"
+TCBS_OVERVIEW_URL = "https://apipubaws.tcbs.com.vn/tcanalysis/v1/ticker/{symbol}/overview"
 TCBS_HEADERS = {
     "User-Agent": "Mozilla/5.0",
     "Accept": "application/json, text/plain, */*",
     "Origin": "https://tcbs.com.vn",
     "Referer": "https://tcbs.com.vn/",
 }
+TCBS_TIMEOUT = 20  # seconds per attempt
+INTRADAY_COUNT_BACK = 300  # minute bars per request, more than one trading day
+TCBS_MAX_WORKERS = DATA_SOURCES["tcbs"].get("max_concurrency", 8)  # requests in flight per batch
+# Requests/hour each TCBS consumer may use (constants.DATA_SOURCES['tcbs']['budget']). Requests over
+# the limiter's 1,000/hour wait up to utils.http.RATE_LIMIT_WAIT for a token and then fail.
+TCBS_BUDGET = DATA_SOURCES["tcbs"]["budget"]
+
+# Persistent daily-bar cache; set ECOTRACK_BAR_CACHE=0 to always fetch full windows
+BAR_CACHE: Optional[ParquetBarCache] = (
+    ParquetBarCache() if os.getenv("ECOTRACK_BAR_CACHE", "1") != "0" and importlib.util.find_spec("pyarrow") else None
+)
+# Stored bars refreshed this recently (or since the bars settled) are served without a delta request.
+# vn_market, market_history, index charts and the intraday previous closes all read the same ~56
+# symbols, so together they cost at most 56 requests per interval: 240/hour, the daily_bars share.
+BAR_REFRESH_INTERVAL = 840
 
 # Comprehensive index tracking - FIXED: Use correct TCBS symbols
 VIETNAM_INDICES = {
@@ -41,6 +68,31 @@ VN30_STOCKS = [
     'VJC'  # Services
 ]
 
+# Lookback windows (calendar days) used by the analysis functions
+INDEX_RECENT_DAYS = 14
+INDEX_ANALYSIS_DAYS = 180
+CORRELATION_DAYS = 90
+STOCK_ANALYSIS_DAYS = 30
+BREADTH_HISTORY_DAYS = 365  # 52-week highs/lows and McClellan history
+
+# Full-exchange breadth: seconds allowed for fetching the listed universe, and how long results are reused.
+# The ~1,600 listings do not fit the TCBS budget on every refresh, so each refresh asks TCBS about at most
+# BREADTH_MAX_REQUESTS symbols, least recently refreshed first, and reads the rest from the bar cache:
+# 100 per 30 minutes is the breadth share (200 of 1,000 requests/hour) and cycles the universe in about
+# eight hours; daily bars, intraday polls and overviews take the rest (see TCBS_BUDGET).
+BREADTH_BUDGET = 90
+BREADTH_TTL = 1800
+BREADTH_MAX_REQUESTS = 100
+LISTED_EXCHANGES = {"HOSE", "HSX", "HNX", "UPCOM"}
+
+_HOURS = VIETNAM_MARKET_PARAMS['trading_hours']
+MARKET_TZ = ZoneInfo(_HOURS['timezone'])
+SESSION_OPEN = dt.time.fromisoformat(_HOURS['morning_session'][0])
+SESSION_CLOSE = dt.time.fromisoformat(_HOURS['afternoon_session'][1])
+
+# VN30 weights are rebuilt once per review period (see analysis.index_weights.rebalance_period)
+VN30_WEIGHTS_TTL = 200 * 86400
+
 
 def _epoch(d: dt.date) -> int:
     """Convert date to epoch timestamp."""
@@ -69,8 +121,9 @@ def _is_valid_symbol(symbol: str) -> bool:
     return True
 
 
-def _tcbs_bars(symbol: str, start: dt.date, end: dt.date) -> pd.DataFrame:
-    """Get OHLCV data from TCBS API - FIXED VERSION."""
+@timed("tcbs_bars")
+async def _tcbs_bars_async(symbol: str, start: dt.date, end: dt.date, resolution: str = "D") -> pd.DataFrame:
+    """Get OHLCV data from TCBS API - FIXED VERSION. `resolution` "1" gives minute bars up to now."""
     # Validate symbol first
     if not _is_valid_symbol(symbol):
         logger.warning(f"Invalid symbol '{symbol}' - skipping")
@@ -81,19 +134,22 @@ def _tcbs_bars(symbol: str, start: dt.date, end: dt.date) -> pd.DataFrame:
     params = {
         "ticker": symbol,
         "type": "index" if symbol in VIETNAM_INDICES else "stock",
-        "resolution": "D",
+        "resolution": resolution,
         "from": _epoch(start),
         "to": _epoch(end),
     }
+    url = TCBS_BARS_URL
+    if resolution != "D":
+        # Minute bars live on the short-term endpoint; `to` must cover the current session
+        url = TCBS_INTRADAY_URL
+        params["to"] = _epoch(end + dt.timedelta(days=1))
+        params["countBack"] = INTRADAY_COUNT_BACK
+
+    json_data = await http.get_json(url, params, provider="tcbs", headers=TCBS_HEADERS, timeout=TCBS_TIMEOUT)
+    if json_data is None:
+        return pd.DataFrame()
 
     try:
-        r = requests.get(TCBS_BARS_URL, headers=TCBS_HEADERS, params=params, timeout=15)
-
-        if not r.ok:
-            logger.warning(f"TCBS API returned {r.status_code} for {symbol}: {r.text[:200]}")
-            return pd.DataFrame()
-
-        json_data = r.json()
         data = json_data.get("data", [])
 
         if not data:
@@ -136,7 +192,7 @@ def _tcbs_bars(symbol: str, start: dt.date, end: dt.date) -> pd.DataFrame:
             dates = pd.date_range(
                 start=start,
                 periods=len(df),
-                freq="B",
+                freq="B" if resolution == "D" else "min",
                 tz="Asia/Ho_Chi_Minh"
             )
 
@@ -164,159 +220,330 @@ def _tcbs_bars(symbol: str, start: dt.date, end: dt.date) -> pd.DataFrame:
         logger.info(f"Successfully fetched {len(result_df)} records for {symbol}")
         return result_df
 
-    except requests.exceptions.Timeout:
-        logger.error(f"Timeout fetching data for {symbol}")
-        return pd.DataFrame()
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Request error for {symbol}: {e}")
-        return pd.DataFrame()
     except Exception as e:
         logger.error(f"TCBS bars error for {symbol}: {e}")
         return pd.DataFrame()
 
 
-def _calculate_technical_indicators(df: pd.DataFrame) -> Dict:
-    """Calculate comprehensive technical indicators - ENHANCED ERROR HANDLING."""
-    if df.empty or 'close' not in df:
-        return {}
+def _tcbs_bars(symbol: str, start: dt.date, end: dt.date, resolution: str = "D") -> pd.DataFrame:
+    """Blocking wrapper of _tcbs_bars_async for sync callers."""
+    return http.run(_tcbs_bars_async(symbol, start, end, resolution))
 
-    try:
-        close = df['close'].dropna()
-        if len(close) < 5:  # Need minimum data points
-            return {}
 
-        indicators = {}
+async def _cached_tcbs_bars_async(symbol: str, start: dt.date, end: dt.date) -> pd.DataFrame:
+    """Serve bars from the on-disk cache, asking TCBS only for bars since the last stored trading date."""
+    if BAR_CACHE is None:
+        return await _tcbs_bars_async(symbol, start, end)
 
-        # RSI - with error handling
-        try:
-            if len(close) >= 14:
-                rsi = calculate_rsi(close)
-                if len(rsi.dropna()) > 0:
-                    indicators['rsi'] = float(rsi.iloc[-1])
-                    indicators['rsi_signal'], indicators['rsi_sentiment'] = get_market_sentiment(indicators['rsi'])
-        except Exception as e:
-            logger.warning(f"RSI calculation error: {e}")
+    symbol = symbol.upper().strip()
+    # Consumers refreshing the same symbol at once wait for the first one, then find it fresh
+    async with _BAR_LOCKS.setdefault(symbol, asyncio.Lock()):
+        meta = await asyncio.to_thread(BAR_CACHE.meta, symbol)
+
+        if meta and meta["covered_from"] <= start and _bars_fresh(symbol):
+            history = await asyncio.to_thread(BAR_CACHE.load, symbol)
+        elif meta and meta["covered_from"] <= start:
+            # Re-request the last stored bar too: it may have been a partial intraday bar
+            fresh = await _tcbs_bars_async(symbol, min(meta["last_date"], end), end)
+            if fresh.empty:
+                history = await asyncio.to_thread(BAR_CACHE.load, symbol)
+            else:
+                history = await asyncio.to_thread(BAR_CACHE.append, symbol, fresh, meta["covered_from"])
+        else:
+            fresh = await _tcbs_bars_async(symbol, start, end)
+            if fresh.empty:
+                history = await asyncio.to_thread(BAR_CACHE.load, symbol)
+            else:
+                history = await asyncio.to_thread(BAR_CACHE.append, symbol, fresh, start)
 
-        # Moving Averages - with error handling
-        try:
-            if len(close) >= 20:
-                sma_20 = close.rolling(20, min_periods=15).mean()
-                if not sma_20.empty and not pd.isna(sma_20.iloc[-1]):
-                    indicators['sma_20'] = float(sma_20.iloc[-1])
-
-            if len(close) >= 50:
-                sma_50 = close.rolling(50, min_periods=30).mean()
-                if not sma_50.empty and not pd.isna(sma_50.iloc[-1]):
-                    indicators['sma_50'] = float(sma_50.iloc[-1])
-
-            if len(close) >= 200:
-                sma_200 = close.rolling(200, min_periods=100).mean()
-                if not sma_200.empty and not pd.isna(sma_200.iloc[-1]):
-                    indicators['sma_200'] = float(sma_200.iloc[-1])
-        except Exception as e:
-            logger.warning(f"Moving averages calculation error: {e}")
+    return _window(history, start, end)
 
-        # Bollinger Bands
-        try:
-            if len(close) >= 20:
-                sma20 = close.rolling(20, min_periods=15).mean()
-                std20 = close.rolling(20, min_periods=15).std()
-                if not sma20.empty and not std20.empty:
-                    bb_upper = sma20 + 2 * std20
-                    bb_lower = sma20 - 2 * std20
-                    if not pd.isna(bb_upper.iloc[-1]) and not pd.isna(bb_lower.iloc[-1]):
-                        indicators['bb_upper'] = float(bb_upper.iloc[-1])
-                        indicators['bb_lower'] = float(bb_lower.iloc[-1])
-
-                        # BB position
-                        bb_range = indicators['bb_upper'] - indicators['bb_lower']
-                        if bb_range > 0:
-                            indicators['bb_position'] = float((close.iloc[-1] - indicators['bb_lower']) / bb_range)
-        except Exception as e:
-            logger.warning(f"Bollinger Bands calculation error: {e}")
 
-        # Support and Resistance
-        try:
-            if len(close) >= 20:
-                recent_high = close.rolling(20, min_periods=10).max().iloc[-1]
-                recent_low = close.rolling(20, min_periods=10).min().iloc[-1]
-                if not pd.isna(recent_high) and not pd.isna(recent_low):
-                    indicators['resistance'] = float(recent_high)
-                    indicators['support'] = float(recent_low)
-        except Exception as e:
-            logger.warning(f"Support/Resistance calculation error: {e}")
+_BAR_LOCKS: Dict[str, asyncio.Lock] = {}
+
+
+def _bars_fresh(symbol: str) -> bool:
+    """True if `symbol`'s stored bars were refreshed within BAR_REFRESH_INTERVAL or since the bars last settled."""
+    refreshed = BAR_CACHE.refreshed_at(symbol)
+    return refreshed is not None and refreshed >= min(time.time() - BAR_REFRESH_INTERVAL,
+                                                      _bars_settled_before().timestamp())
+
+
+def _window(history: pd.DataFrame, start: dt.date, end: dt.date) -> pd.DataFrame:
+    """Bars of `history` dated start..end inclusive."""
+    if history.empty:
+        return history
+
+    lo = pd.Timestamp(start, tz="Asia/Ho_Chi_Minh")
+    hi = pd.Timestamp(end, tz="Asia/Ho_Chi_Minh") + pd.Timedelta(days=1)
+    return history[(history["date"] >= lo) & (history["date"] < hi)].reset_index(drop=True)
+
+
+async def _gather(*coros):
+    return await asyncio.gather(*coros)
 
-        # Volatility
+
+def _cached_tcbs_bars(symbol: str, start: dt.date, end: dt.date) -> pd.DataFrame:
+    """Blocking wrapper of _cached_tcbs_bars_async for sync callers."""
+    return http.run(_cached_tcbs_bars_async(symbol, start, end))
+
+
+async def _fetch_bars_batch(symbols: List[str], start: dt.date, end: dt.date, limit: int,
+                            budget: Optional[float]) -> Dict[str, pd.DataFrame]:
+    gate = asyncio.Semaphore(limit)
+    expired = False
+
+    async def one(symbol: str) -> Optional[pd.DataFrame]:
+        async with gate:
+            # Symbols still queued when the budget runs out are dropped, not fetched
+            return None if expired else await _cached_tcbs_bars_async(symbol, start, end)
+
+    tasks = {asyncio.ensure_future(one(s)): s for s in symbols}
+    done, pending = await asyncio.wait(tasks, timeout=budget)
+    expired = True
+    if pending:
+        logger.warning(f"TCBS batch budget of {budget:g}s exhausted: {len(pending)}/{len(symbols)} symbols skipped")
+
+    out = {}
+    for task in done:
         try:
-            if len(close) >= 20:
-                returns = close.pct_change().dropna()
-                if len(returns) >= 20:
-                    vol_20d = returns.rolling(20, min_periods=15).std()
-                    if not vol_20d.empty and not pd.isna(vol_20d.iloc[-1]):
-                        indicators['volatility_20d'] = float(vol_20d.iloc[-1] * np.sqrt(252) * 100)
+            out[tasks[task]] = task.result()
         except Exception as e:
-            logger.warning(f"Volatility calculation error: {e}")
+            logger.error(f"TCBS bars error for {tasks[task]}: {e}")
+            out[tasks[task]] = pd.DataFrame()
+    return out
+
+
+def fetch_tcbs_bars_batch(symbols: List[str], start: dt.date, end: dt.date,
+                          max_workers: Optional[int] = None, budget: Optional[float] = None) -> Dict[str, pd.DataFrame]:
+    """Fetch daily bars for many symbols concurrently on the shared HTTP event loop.
+
+    Returns {symbol: DataFrame}; symbols that fail map to an empty frame. At most
+    `max_workers` requests are in flight. With `budget` (seconds), symbols not fetched in
+    time are left out; requests already in flight still finish in the background and warm
+    the bar cache for the next refresh.
+    """
+    unique = list(dict.fromkeys(s.upper().strip() for s in symbols if _is_valid_symbol(s)))
+    if not unique:
+        return {}
+    limit = max(1, min(max_workers or TCBS_MAX_WORKERS, len(unique)))
+    return http.run(_fetch_bars_batch(unique, start, end, limit, budget))
 
-        return indicators
 
-    except Exception as e:
-        logger.error(f"Technical indicators calculation failed: {e}")
+async def _tcbs_overview(symbol: str) -> Dict:
+    """Shares outstanding and free-float ratio for `symbol` from the TCBS ticker overview."""
+    data = await http.get_json(TCBS_OVERVIEW_URL.format(symbol=symbol), provider="tcbs",
+                               headers=TCBS_HEADERS, timeout=TCBS_TIMEOUT)
+    if not isinstance(data, dict):
         return {}
 
-
-def _last_change_pct(series: pd.Series) -> Optional[float]:
-    """Calculate last period percentage change - ENHANCED."""
+    shares = pd.to_numeric(data.get("outstandingShare"), errors="coerce")
+    if pd.isna(shares) or shares <= 0:
+        return {}
+    # Overview reports shares in millions; free float, when present, as a ratio or a percentage
+    free_float = next((pd.to_numeric(data[k], errors="coerce") for k in ("freeFloat", "freeFloatRate", "freeFloatPercent")
+                       if data.get(k) is not None), np.nan)
+    if pd.notna(free_float) and free_float > 1:
+        free_float /= 100.0
+    return {"shares": float(shares) * 1e6,
+            "free_float": float(free_float) if pd.notna(free_float) and 0 < free_float <= 1 else np.nan}
+
+
+@timed()
+@cached('tcbs', ttl=VN30_WEIGHTS_TTL)
+def get_vn30_index_shares(period: str, _prices: pd.Series) -> pd.Series:
+    """
+    Capped free-float share counts of the VN30 constituents for review `period`, fixed
+    with the prices seen when the period's table is first built.
+    """
+    symbols = [s for s in VN30_STOCKS if _is_valid_symbol(s)]
+    overviews = dict(zip(symbols, http.run(_gather(*(_tcbs_overview(s) for s in symbols)))))
+
+    table = pd.DataFrame.from_dict({s: o for s, o in overviews.items() if o}, orient="index")
+    if len(table) < len(symbols) // 2:
+        raise ValueError(f"shares outstanding for only {len(table)}/{len(symbols)} constituents")
+    missing_float = int(table["free_float"].isna().sum())
+    if missing_float:
+        logger.info(f"VN30 weights: no free-float ratio for {missing_float} constituents, using full float")
+
+    shares = index_shares(table["shares"], table["free_float"], _prices)
+    logger.info(f"VN30 weights rebuilt for {period} over {len(shares)} constituents")
+    return shares
+
+
+def _vn30_index_shares(day: dt.date, prices: pd.Series) -> pd.Series:
+    """Cached weighting shares for the period of `day`; equal weights if the overview is unavailable."""
     try:
-        series = series.dropna()
-        if len(series) < 2:
-            return None
+        return get_vn30_index_shares(rebalance_period(day), _prices=prices)
+    except Exception as e:
+        logger.warning(f"VN30 weights unavailable, falling back to equal weights: {e}")
+        return 1.0 / prices[prices > 0]
+
+
+class BarStore:
+    """Per-refresh OHLCV store: each symbol is fetched once over its widest window, narrower windows are slices."""
+
+    def __init__(self, end: Optional[dt.date] = None, max_workers: Optional[int] = None):
+        self.end = end or dt.date.today()
+        self.max_workers = max_workers
+        self.fetch_count = 0
+        self._windows: Dict[str, int] = {}
+        self._fetched: Dict[str, int] = {}
+        self._frames: Dict[str, pd.DataFrame] = {}
+        self._indicators: Dict[tuple, pd.DataFrame] = {}
+
+    def require(self, symbols: List[str], days: int) -> None:
+        """Declare that `symbols` will be read with a lookback of `days`."""
+        for symbol in symbols:
+            if not _is_valid_symbol(symbol):
+                continue
+            key = symbol.upper().strip()
+            self._windows[key] = max(days, self._windows.get(key, 0))
+
+    def prefetch(self) -> None:
+        """Fetch every declared symbol over its widest window, one concurrent batch per window."""
+        by_window: Dict[int, List[str]] = {}
+        for symbol, days in self._windows.items():
+            if self._fetched.get(symbol, 0) < days:
+                by_window.setdefault(days, []).append(symbol)
+
+        for days, symbols in by_window.items():
+            start = self.end - dt.timedelta(days=days)
+            frames = fetch_tcbs_bars_batch(symbols, start, self.end, self.max_workers)
+            for symbol in symbols:
+                self._frames[symbol] = frames.get(symbol, pd.DataFrame())
+                self._fetched[symbol] = days
+            self.fetch_count += len(symbols)
+
+    def _fetch(self, symbol: str, days: int) -> None:
+        """Late fetch of a symbol `prefetch` did not cover; goes through the bar cache like the batch path."""
+        start = self.end - dt.timedelta(days=days)
+        self._frames[symbol] = _cached_tcbs_bars(symbol, start, self.end)
+        self._fetched[symbol] = days
+        self.fetch_count += 1
+
+    def bars(self, symbol: str, days: int) -> pd.DataFrame:
+        """Return the last `days` calendar days of bars for `symbol`."""
+        if not _is_valid_symbol(symbol):
+            return pd.DataFrame()
+
+        key = symbol.upper().strip()
+        if self._fetched.get(key, 0) < days:
+            self.require([key], days)
+            self._fetch(key, self._windows[key])
+
+        df = self._frames.get(key)
+        if df is None or df.empty:
+            return pd.DataFrame()
+
+        start = pd.Timestamp(self.end - dt.timedelta(days=days), tz="Asia/Ho_Chi_Minh")
+        return df[df["date"] >= start]
+
+    def indicators(self, symbols: List[str], days: int) -> pd.DataFrame:
+        """Symbol x indicator table over the last `days` of bars, computed once per (symbols, days)."""
+        key = (tuple(symbols), days)
+        if key not in self._indicators:
+            frames = {s.upper().strip(): self.bars(s, days) for s in symbols if _is_valid_symbol(s)}
+            self._indicators[key] = compute_panel_indicators(build_panel(frames, "close"),
+                                                             build_panel(frames, "volume"))
+        return self._indicators[key]
+
+
+def _stock_universe() -> List[str]:
+    """All sector stocks plus VN30 constituents, de-duplicated in order."""
+    all_stocks = []
+    for sector_data in VN_MAJOR_STOCKS.values():
+        if isinstance(sector_data, dict):
+            all_stocks.extend(sector_data.get('stocks', []))
+        elif isinstance(sector_data, list):
+            all_stocks.extend(sector_data)
+
+    all_stocks.extend(VN30_STOCKS)
+    return list(dict.fromkeys(all_stocks))
 
-        prev, last = float(series.iloc[-2]), float(series.iloc[-1])
 
-        if prev == 0 or pd.isna(prev) or pd.isna(last):
-            return None
+@cached('tcbs', ttl=86400)
+def _listed_symbols() -> List[str]:
+    """Every stock listed on HOSE, HNX and UPCOM according to vnstock's listing."""
+    from vnstock import Listing
 
-        change = (last / prev - 1.0) * 100.0
+    listing = Listing().symbols_by_exchange()
+    if "type" in listing:
+        listing = listing[listing["type"].astype(str).str.upper() == "STOCK"]
+    listing = listing[listing["exchange"].astype(str).str.upper().isin(LISTED_EXCHANGES)]
+    symbols = [s for s in listing["symbol"].astype(str) if _is_valid_symbol(s)]
+    if not symbols:
+        raise ValueError("empty listing")
+    return sorted(set(s.upper().strip() for s in symbols))
 
-        # Sanity check for extreme values
-        if abs(change) > 50:  # > 50% change is suspicious for daily data
-            logger.warning(f"Extreme change detected: {change:.2f}%")
 
-        return change
-    except Exception:
+@timed()
+def get_listed_universe() -> List[str]:
+    """Full listed universe (~1,600 symbols); falls back to the tracked stocks if the listing is unavailable."""
+    try:
+        return _listed_symbols()
+    except Exception as e:
+        logger.warning(f"Listed universe unavailable, using tracked stocks: {e}")
+        return _stock_universe()
+
+
+def _indicator_row(table: pd.DataFrame, symbol: str) -> Optional[pd.Series]:
+    """Indicator row for `symbol`, or None without at least two closes."""
+    key = symbol.upper().strip()
+    if table.empty or key not in table.index or table.at[key, "n_obs"] < 2:
         return None
+    return table.loc[key]
+
 
+def _value(row: pd.Series, field: str, default=0.0):
+    value = row.get(field)
+    return default if value is None or pd.isna(value) else float(value)
 
-@st.cache_data(ttl=900, show_spinner=False)
+
+def _technical_fields(row: pd.Series) -> Dict:
+    """Technical indicators of one symbol plus the RSI sentiment labels."""
+    indicators = technical_dict(row)
+    if "rsi" in indicators:
+        indicators['rsi_signal'], indicators['rsi_sentiment'] = get_market_sentiment(indicators['rsi'])
+    return indicators
+
+
+@timed()
+@cached('tcbs')
 def get_comprehensive_vn_market_data() -> Dict:
     """Get comprehensive Vietnam market data including all major indices - FIXED."""
     data = {}
-    today = dt.date.today()
-    start_recent = today - dt.timedelta(days=14)
-    start_analysis = today - dt.timedelta(days=180)
+    store = BarStore()
+
+    # Declare every window up front so each symbol is fetched once at its widest range
+    store.require(list(VIETNAM_INDICES), INDEX_ANALYSIS_DAYS)
+    store.require(["VNINDEX", "VN30"], CORRELATION_DAYS)
+    store.require(_stock_universe(), CORRELATION_DAYS)
 
     logger.info("Starting comprehensive VN market data fetch...")
 
     try:
-        # Get all major indices with better error handling
+        store.prefetch()
+
+        # Get all major indices with better error handling; indicators for all of them in one pass
         indices_data = {}
+        index_table = store.indicators(list(VIETNAM_INDICES), INDEX_ANALYSIS_DAYS)
         for code, info in VIETNAM_INDICES.items():
             logger.info(f"Fetching data for index: {code}")
 
             try:
-                df_recent = _tcbs_bars(code, start_recent, today)
-                if df_recent.empty:
+                df_recent = store.bars(code, INDEX_RECENT_DAYS)
+                row = _indicator_row(index_table, code)
+                if df_recent.empty or row is None:
                     logger.warning(f"No recent data for {code}")
                     continue
 
-                price = float(df_recent["close"].iloc[-1])
-                change_pct = _last_change_pct(df_recent["close"]) or 0.0
-                volume = float(df_recent["volume"].iloc[-1]) if "volume" in df_recent and not pd.isna(
-                    df_recent["volume"].iloc[-1]) else 0.0
+                price = _value(row, "price")
+                change_pct = _value(row, "change_1d")
+                volume = _value(row, "volume")
 
-                # Get technical indicators with longer history
-                df_long = _tcbs_bars(code, start_analysis, today)
-                technical = _calculate_technical_indicators(df_long) if not df_long.empty else {}
+                # Technical indicators over the longer history
+                technical = _technical_fields(row)
 
                 indices_data[code.lower()] = {
                     "name": info["name"],
@@ -338,7 +565,7 @@ def get_comprehensive_vn_market_data() -> Dict:
 
         # Enhanced sector analysis with error handling
         try:
-            data["sectors"] = get_enhanced_sector_performance()
+            data["sectors"] = get_enhanced_sector_performance(_store=store)
             logger.info("Sector performance analysis completed")
         except Exception as e:
             logger.error(f"Sector analysis error: {e}")
@@ -346,7 +573,7 @@ def get_comprehensive_vn_market_data() -> Dict:
 
         # VN30 specific analysis
         try:
-            data["vn30_analysis"] = get_vn30_analysis()
+            data["vn30_analysis"] = get_vn30_analysis(_store=store)
             logger.info("VN30 analysis completed")
         except Exception as e:
             logger.error(f"VN30 analysis error: {e}")
@@ -354,7 +581,7 @@ def get_comprehensive_vn_market_data() -> Dict:
 
         # Top stocks with more metrics
         try:
-            data["top_stocks"] = get_enhanced_top_stocks_performance()
+            data["top_stocks"] = get_enhanced_top_stocks_performance(_store=store)
             logger.info("Top stocks analysis completed")
         except Exception as e:
             logger.error(f"Top stocks analysis error: {e}")
@@ -362,7 +589,7 @@ def get_comprehensive_vn_market_data() -> Dict:
 
         # Market breadth analysis
         try:
-            data["market_breadth"] = calculate_market_breadth()
+            data["market_breadth"] = calculate_market_breadth(_store=store)
             logger.info("Market breadth analysis completed")
         except Exception as e:
             logger.error(f"Market breadth analysis error: {e}")
@@ -370,13 +597,13 @@ def get_comprehensive_vn_market_data() -> Dict:
 
         # Market correlation analysis
         try:
-            data["correlations"] = calculate_market_correlations()
+            data["correlations"] = calculate_market_correlations(_store=store)
             logger.info("Correlation analysis completed")
         except Exception as e:
             logger.error(f"Correlation analysis error: {e}")
             data["correlations"] = {}
 
-        logger.info("Comprehensive VN market data fetch completed successfully")
+        logger.info(f"Comprehensive VN market data fetch completed successfully ({store.fetch_count} TCBS requests)")
 
     except Exception as e:
         logger.error(f"Comprehensive VN market data error: {e}")
@@ -385,11 +612,12 @@ def get_comprehensive_vn_market_data() -> Dict:
     return data
 
 
-@st.cache_data(ttl=1800, show_spinner=False)
-def get_enhanced_sector_performance() -> Dict[str, Dict]:
+@timed()
+@cached('tcbs')
+def get_enhanced_sector_performance(_store: Optional[BarStore] = None) -> Dict[str, Dict]:
     """Enhanced sector performance with more metrics - FIXED."""
-    today = dt.date.today()
-    start = today - dt.timedelta(days=30)
+    store = _store or BarStore()
+    table = store.indicators(_stock_universe(), STOCK_ANALYSIS_DAYS)
     sectors = {}
 
     for sector, tickers in VN_MAJOR_STOCKS.items():
@@ -405,40 +633,17 @@ def get_enhanced_sector_performance() -> Dict[str, Dict]:
                 continue
 
             try:
-                df = _tcbs_bars(ticker, start, today)
-                if df.empty:
+                row = _indicator_row(table, ticker)
+                if row is None:
                     continue
 
-                close_series = df["close"].dropna()
-                if len(close_series) < 2:
-                    continue
-
-                current_price = float(close_series.iloc[-1])
-                daily_change = _last_change_pct(close_series) or 0.0
-                volume = float(df["volume"].iloc[-1]) if "volume" in df and not pd.isna(df["volume"].iloc[-1]) else 0.0
-
-                # Weekly and monthly performance
-                weekly_change = 0.0
-                monthly_change = 0.0
-                if len(close_series) >= 7:
-                    try:
-                        weekly_change = ((current_price / float(close_series.iloc[-7])) - 1) * 100
-                    except (IndexError, ZeroDivisionError):
-                        pass
-
-                if len(close_series) >= 21:
-                    try:
-                        monthly_change = ((current_price / float(close_series.iloc[-21])) - 1) * 100
-                    except (IndexError, ZeroDivisionError):
-                        pass
-
                 stats.append({
                     "symbol": ticker,
-                    "price": current_price,
-                    "change_1d": daily_change,
-                    "change_1w": weekly_change,
-                    "change_1m": monthly_change,
-                    "volume": volume
+                    "price": _value(row, "price"),
+                    "change_1d": _value(row, "change_1d"),
+                    "change_1w": _value(row, "change_1w"),
+                    "change_1m": _value(row, "change_1m"),
+                    "volume": _value(row, "volume")
                 })
 
             except Exception as e:
@@ -468,44 +673,39 @@ def get_enhanced_sector_performance() -> Dict[str, Dict]:
     return sectors
 
 
-@st.cache_data(ttl=1200, show_spinner=False)
-def get_vn30_analysis() -> Dict:
-    """Detailed VN30 analysis including constituent performance - FIXED."""
-    today = dt.date.today()
-    start = today - dt.timedelta(days=30)
-
-    vn30_stocks = []
-    for stock in VN30_STOCKS:
-        if not _is_valid_symbol(stock):
-            continue
-
-        try:
-            df = _tcbs_bars(stock, start, today)
-            if df.empty:
-                continue
-
-            close_series = df["close"].dropna()
-            if len(close_series) < 2:
-                continue
-
-            current_price = float(close_series.iloc[-1])
-            daily_change = _last_change_pct(close_series) or 0.0
-            volume = float(df["volume"].iloc[-1]) if "volume" in df and not pd.isna(df["volume"].iloc[-1]) else 0.0
-
-            # Calculate contribution to VN30 (simplified - equal weight assumption)
-            contribution = daily_change / len(VN30_STOCKS) if VN30_STOCKS else 0
-
-            vn30_stocks.append({
-                "symbol": stock,
-                "price": current_price,
-                "change_pct": daily_change,
-                "volume": volume,
-                "contribution": contribution
-            })
+@timed()
+@cached('tcbs')
+def get_vn30_analysis(_store: Optional[BarStore] = None) -> Dict:
+    """VN30 constituent performance with cap-weighted contributions to the index move."""
+    store = _store or BarStore()
+    table = store.indicators(_stock_universe(), STOCK_ANALYSIS_DAYS)
+    if table.empty:
+        return {}
 
-        except Exception as e:
-            logger.warning(f"Error processing VN30 stock {stock}: {e}")
-            continue
+    rows = table.reindex([s for s in VN30_STOCKS if _is_valid_symbol(s)])
+    rows = rows[rows["n_obs"] >= 2]
+    volume = rows.get("volume", pd.Series(0.0, index=rows.index)).fillna(0.0)
+    return vn30_summary(rows["price"], rows["change_1d"].fillna(0.0), volume, store.end)
+
+
+def vn30_summary(price: pd.Series, change: pd.Series, volume: pd.Series, day: dt.date) -> Dict:
+    """VN30 metrics from per-constituent price, % change and volume (daily or intraday)."""
+    prev_close = price / (1 + change / 100)
+    impact = contributions(_vn30_index_shares(day, price), prev_close, change)
+    weight = impact["weight"].reindex(price.index).fillna(0.0)
+    contribution = impact["contribution"].reindex(price.index).fillna(0.0)
+
+    vn30_stocks = [
+        {
+            "symbol": symbol,
+            "price": float(price[symbol]),
+            "change_pct": float(change[symbol]),
+            "volume": float(volume.get(symbol, 0.0)),
+            "weight": float(weight[symbol]),
+            "contribution": float(contribution[symbol]),
+        }
+        for symbol in price.index
+    ]
 
     if not vn30_stocks:
         return {}
@@ -514,10 +714,10 @@ def get_vn30_analysis() -> Dict:
     vn30_stocks.sort(key=lambda x: abs(x["contribution"]), reverse=True)
 
     # Calculate VN30 metrics
-    changes = [s["change_pct"] for s in vn30_stocks if s["change_pct"] is not None]
+    pct_changes = [s["change_pct"] for s in vn30_stocks if s["change_pct"] is not None]
     volumes = [s["volume"] for s in vn30_stocks if s["volume"] is not None]
 
-    avg_change = np.mean(changes) if changes else 0.0
+    avg_change = np.mean(pct_changes) if pct_changes else 0.0
     total_volume = np.sum(volumes) if volumes else 0.0
     advancing = len([s for s in vn30_stocks if s["change_pct"] and s["change_pct"] > 0])
     declining = len([s for s in vn30_stocks if s["change_pct"] and s["change_pct"] < 0])
@@ -525,31 +725,24 @@ def get_vn30_analysis() -> Dict:
     return {
         "constituents": vn30_stocks,
         "avg_change": float(avg_change),
+        "weighted_change": impact["index_change"],
         "total_volume": float(total_volume),
         "advancing": advancing,
         "declining": declining,
         "unchanged": len(vn30_stocks) - advancing - declining,
         "advance_decline_ratio": advancing / declining if declining > 0 else None,
-        "top_contributors": vn30_stocks[:5],
+        "top_contributors": sorted(vn30_stocks, key=lambda x: x["contribution"], reverse=True)[:5],
         "top_detractors": sorted(vn30_stocks, key=lambda x: x["contribution"])[:5]
     }
 
 
-@st.cache_data(ttl=1200, show_spinner=False)
-def get_enhanced_top_stocks_performance(limit: int = 30) -> List[Dict]:
+@timed()
+@cached('tcbs')
+def get_enhanced_top_stocks_performance(limit: int = 30, _store: Optional[BarStore] = None) -> List[Dict]:
     """Enhanced top stocks performance with more metrics - FIXED."""
-    today = dt.date.today()
-    start = today - dt.timedelta(days=30)
-
-    all_stocks = []
-    for sector_data in VN_MAJOR_STOCKS.values():
-        if isinstance(sector_data, dict):
-            all_stocks.extend(sector_data.get('stocks', []))
-        elif isinstance(sector_data, list):
-            all_stocks.extend(sector_data)
-
-    all_stocks.extend(VN30_STOCKS)
-    unique_stocks = list(dict.fromkeys(all_stocks))  # Remove duplicates while preserving order
+    store = _store or BarStore()
+    unique_stocks = _stock_universe()
+    table = store.indicators(unique_stocks, STOCK_ANALYSIS_DAYS)
 
     stock_data = []
 
@@ -558,46 +751,19 @@ def get_enhanced_top_stocks_performance(limit: int = 30) -> List[Dict]:
             continue
 
         try:
-            df = _tcbs_bars(stock, start, today)
-            if df.empty:
-                continue
-
-            close_series = df["close"].dropna()
-            if len(close_series) < 2:
+            row = _indicator_row(table, stock)
+            if row is None:
                 continue
 
-            current_price = float(close_series.iloc[-1])
-            daily_change = _last_change_pct(close_series) or 0.0
-            volume = float(df["volume"].iloc[-1]) if "volume" in df and not pd.isna(df["volume"].iloc[-1]) else 0.0
-
-            # Additional metrics with error handling
-            weekly_change = 0.0
-            monthly_change = 0.0
-
-            if len(close_series) >= 7:
-                try:
-                    weekly_change = ((current_price / float(close_series.iloc[-7])) - 1) * 100
-                except (IndexError, ZeroDivisionError):
-                    pass
-
-            if len(close_series) >= 21:
-                try:
-                    monthly_change = ((current_price / float(close_series.iloc[-21])) - 1) * 100
-                except (IndexError, ZeroDivisionError):
-                    pass
+            current_price = _value(row, "price")
+            daily_change = _value(row, "change_1d")
+            volume = _value(row, "volume")
+            weekly_change = _value(row, "change_1w")
+            monthly_change = _value(row, "change_1m")
 
             # Volume analysis
-            avg_volume = 0.0
-            volume_ratio = 1.0
-
-            if len(df) >= 10:
-                try:
-                    avg_vol_series = df["volume"].rolling(10).mean()
-                    if not avg_vol_series.empty and not pd.isna(avg_vol_series.iloc[-1]):
-                        avg_volume = float(avg_vol_series.iloc[-1])
-                        volume_ratio = volume / avg_volume if avg_volume > 0 else 1.0
-                except Exception:
-                    pass
+            avg_volume = _value(row, "avg_volume_10d")
+            volume_ratio = _value(row, "volume_ratio", 1.0)
 
             # Find sector
             sector = "Other"
@@ -629,119 +795,121 @@ def get_enhanced_top_stocks_performance(limit: int = 30) -> List[Dict]:
     return stock_data[:limit]
 
 
-@st.cache_data(ttl=1800, show_spinner=False)
-def calculate_market_breadth() -> Dict:
-    """Calculate market breadth indicators - FIXED."""
-    today = dt.date.today()
-    start = today - dt.timedelta(days=7)
-
-    all_stocks = []
-    for sector_data in VN_MAJOR_STOCKS.values():
-        if isinstance(sector_data, dict):
-            all_stocks.extend(sector_data.get('stocks', []))
-        elif isinstance(sector_data, list):
-            all_stocks.extend(sector_data)
-
-    all_stocks.extend(VN30_STOCKS)
-    unique_stocks = list(dict.fromkeys(all_stocks))
-
-    advancing = 0
-    declining = 0
-    unchanged = 0
-    total_volume_up = 0
-    total_volume_down = 0
-
-    for stock in unique_stocks:
-        if not _is_valid_symbol(stock):
+@cached('tcbs', ttl=BREADTH_TTL)
+def calculate_market_breadth(_store: Optional[BarStore] = None) -> Dict:
+    """Market breadth over every listed HOSE/HNX/UPCOM stock: one batched fetch, one vectorized pass."""
+    universe = get_listed_universe()
+    end = _store.end if _store else dt.date.today()
+    start = end - dt.timedelta(days=BREADTH_HISTORY_DAYS)
+
+    due = _breadth_due(universe, start, end)
+    frames = fetch_tcbs_bars_batch(due, start, end, budget=BREADTH_BUDGET)
+    if BAR_CACHE is not None:
+        for symbol in universe:
+            if symbol not in frames:
+                frames[symbol] = _window(BAR_CACHE.load(symbol), start, end)
+
+    breadth = compute_breadth(build_panel(frames, "close"), build_panel(frames, "volume"))
+    if breadth:
+        breadth["universe_requested"] = len(universe)
+        breadth["universe_refreshed"] = len(due)
+        logger.info(f"Market breadth over {breadth['universe_size']}/{len(universe)} listed stocks "
+                    f"({len(due)} refreshed from TCBS)")
+    return breadth
+
+
+def _bars_settled_before(now: Optional[dt.datetime] = None) -> dt.datetime:
+    """
+    Daily bars fetched before this time may be out of date: `now` on a weekday between the
+    open and the close (the last bar is still moving), otherwise the latest weekday close.
+    Exchange holidays are not modelled.
+    """
+    now = now or dt.datetime.now(MARKET_TZ)
+    if now.weekday() < 5 and SESSION_OPEN <= now.time() < SESSION_CLOSE:
+        return now
+    day = now.date() if now.weekday() < 5 and now.time() >= SESSION_CLOSE else now.date() - dt.timedelta(days=1)
+    while day.weekday() >= 5:
+        day -= dt.timedelta(days=1)
+    return dt.datetime.combine(day, SESSION_CLOSE, tzinfo=MARKET_TZ)
+
+
+def _breadth_due(universe: List[str], start: dt.date, end: dt.date,
+                 limit: int = BREADTH_MAX_REQUESTS) -> List[str]:
+    """
+    The at most `limit` symbols of `universe` worth a TCBS request this refresh: those with no
+    cached history back to `start` first, then the least recently refreshed. Symbols refreshed
+    since the bars settled are skipped. Without the bar cache, a sample stable for the day.
+    """
+    symbols = [s.upper().strip() for s in universe if _is_valid_symbol(s)]
+    if BAR_CACHE is None:
+        return random.Random(end.toordinal()).sample(symbols, min(limit, len(symbols)))
+
+    settled = _bars_settled_before()
+    due = []
+    for symbol in symbols:
+        meta = BAR_CACHE.meta(symbol)
+        refreshed = BAR_CACHE.refreshed_at(symbol) if meta and meta["covered_from"] <= start else None
+        if refreshed is None:
+            due.append((0.0, symbol))
+        elif refreshed < settled.timestamp() and not (meta["last_date"] >= end and end < settled.date()):
+            due.append((refreshed, symbol))
+    due.sort()
+    if len(due) > limit:
+        logger.info(f"Breadth refresh: {len(due) - limit}/{len(due)} stale symbols deferred to later refreshes")
+    return [symbol for _, symbol in due[:limit]]
+
+
+def vn_market_series(_store: Optional[BarStore] = None, days: int = CORRELATION_DAYS) -> Dict[str, pd.Series]:
+    """
+    Daily closes of the tracked indices plus one equal-weighted level series per sector
+    (cumulated mean daily return of its stocks), keyed by display name.
+    """
+    store = _store or BarStore()
+    sectors = {name: info['stocks'] for name, info in VN_MAJOR_STOCKS.items()
+               if isinstance(info, dict) and info.get('stocks')}
+    store.require(list(VIETNAM_INDICES), days)
+    store.require([s for stocks in sectors.values() for s in stocks], days)
+    store.prefetch()
+
+    series = {}
+    for code, info in VIETNAM_INDICES.items():
+        bars = store.bars(code, days)
+        if not bars.empty:
+            series[info["name"]] = bars.drop_duplicates(subset="date", keep="last").set_index("date")["close"]
+
+    for sector, stocks in sectors.items():
+        close = build_panel({s: store.bars(s, days) for s in stocks if _is_valid_symbol(s)}, "close")
+        if close.empty:
             continue
+        returns = close.pct_change(fill_method=None).mean(axis=1, skipna=True).fillna(0.0)
+        series[sector] = 100 * (1 + returns).cumprod()
+    return series
 
-        try:
-            df = _tcbs_bars(stock, start, today)
-            if df.empty:
-                continue
-
-            change = _last_change_pct(df["close"])
-            volume = float(df["volume"].iloc[-1]) if len(df) > 0 and "volume" in df and not pd.isna(
-                df["volume"].iloc[-1]) else 0
-
-            if change is None:
-                continue
-
-            if change > 0.1:  # > 0.1% threshold
-                advancing += 1
-                total_volume_up += volume
-            elif change < -0.1:  # < -0.1% threshold
-                declining += 1
-                total_volume_down += volume
-            else:
-                unchanged += 1
-
-        except Exception as e:
-            logger.warning(f"Error calculating breadth for {stock}: {e}")
-            continue
-
-    total_stocks = advancing + declining + unchanged
-
-    if total_stocks == 0:
-        return {}
-
-    return {
-        "advancing": advancing,
-        "declining": declining,
-        "unchanged": unchanged,
-        "advance_decline_ratio": advancing / declining if declining > 0 else None,
-        "advance_decline_line": (advancing - declining) / total_stocks * 100,
-        "up_volume": total_volume_up,
-        "down_volume": total_volume_down,
-        "volume_ratio": total_volume_up / total_volume_down if total_volume_down > 0 else None,
-        "breadth_momentum": "Positive" if advancing > declining else "Negative" if declining > advancing else "Neutral"
-    }
-
-
-@st.cache_data(ttl=1800, show_spinner=False)
-def calculate_market_correlations() -> Dict:
-    """Calculate correlations between major indices and sectors - FIXED."""
-    today = dt.date.today()
-    start = today - dt.timedelta(days=90)
-    correlations = {}
 
+@cached('tcbs')
+def calculate_market_correlations(_store: Optional[BarStore] = None) -> Dict:
+    """Daily-return correlations between the tracked indices and sectors, keyed 'a_b' by lowercase code."""
     try:
-        # Get data for major indices
-        vnindex_df = _tcbs_bars("VNINDEX", start, today)
-        vn30_df = _tcbs_bars("VN30", start, today)
-
-        if not vnindex_df.empty and not vn30_df.empty:
-            try:
-                # Calculate correlation between VN-Index and VN30
-                merged_df = pd.merge(
-                    vnindex_df[['date', 'close']].rename(columns={'close': 'vnindex'}),
-                    vn30_df[['date', 'close']].rename(columns={'close': 'vn30'}),
-                    on='date',
-                    how='inner'
-                )
-
-                if len(merged_df) > 30:
-                    vni_returns = merged_df['vnindex'].pct_change().dropna()
-                    vn30_returns = merged_df['vn30'].pct_change().dropna()
-
-                    if len(vni_returns) > 20 and len(vn30_returns) > 20:
-                        correlation = vni_returns.corr(vn30_returns)
-                        if not pd.isna(correlation):
-                            correlations['vnindex_vn30'] = float(correlation)
-
-            except Exception as e:
-                logger.warning(f"Correlation calculation error: {e}")
-
-        # Additional correlations could be added here
-        logger.info("Correlation analysis completed")
-
+        series = vn_market_series(_store=_store, days=CORRELATION_DAYS)
+        matrix = correlation_matrix(changes(align_series(series)), min_periods=20)
     except Exception as e:
         logger.error(f"Correlation calculation error: {e}")
+        return {}
+
+    codes = {info["name"]: code.lower() for code, info in VIETNAM_INDICES.items()}
+    keys = {name: codes.get(name, name.lower().replace(' ', '_')) for name in matrix.columns}
+    correlations = {}
+    for i, a in enumerate(matrix.columns):
+        for b in matrix.columns[i + 1:]:
+            if pd.notna(matrix.loc[a, b]):
+                correlations[f"{keys[a]}_{keys[b]}"] = float(matrix.loc[a, b])
 
+    logger.info(f"Correlation analysis completed ({len(correlations)} pairs)")
     return correlations
 
 
-@st.cache_data(ttl=900, show_spinner=False)
+@timed()
+@cached('tcbs')
 def get_index_history(index_code: str, days: int = 90) -> pd.DataFrame:
     """Get historical data for any Vietnam index - FIXED."""
     if not _is_valid_symbol(index_code):
@@ -752,7 +920,7 @@ def get_index_history(index_code: str, days: int = 90) -> pd.DataFrame:
     start = today - dt.timedelta(days=days)
 
     try:
-        df = _tcbs_bars(index_code, start, today)
+        df = _cached_tcbs_bars(index_code, start, today)
 
         if df.empty:
             logger.info(f"No historical data found for {index_code}")
@@ -0,0 +1,126 @@
+# ingest.py - Headless ingestion daemon: python -m ingest [--once] [--sources us vn_market ...]
+import argparse
+import datetime as dt
+import logging
+import signal
+import threading
+import time
+from typing import Dict, List, Optional
+
+from data.history import METRIC_SOURCES, record_dashboard_metrics
+from data.sources import DEFAULT_HISTORY_PERIOD, HISTORY_PERIODS, SOURCES
+from utils.cache import MemoryBackend, get_backend
+from utils.executor import Task, run_dag
+from utils.logging import init_logging
+from utils.refresh import Snapshot, publish_snapshots, read_snapshots
+
+logger = logging.getLogger(__name__)
+
+# Seconds before a failed source is retried (capped by its normal interval)
+RETRY_DELAY = 60
+
+
+class IngestionDaemon:
+    """
+    Refreshes every source on its own schedule (DATA_SOURCES[provider]['cache_ttl'])
+    and publishes the results as snapshots in the shared cache backend, where the
+    dashboard reads them. Upstream load is independent of the number of open dashboards.
+    """
+
+    def __init__(self, names: Optional[List[str]] = None, periods: List[int] = HISTORY_PERIODS):
+        self.tasks: Dict[str, Task] = {}
+        self.intervals: Dict[str, float] = {}
+        for source in SOURCES.values():
+            if names and source.name not in names:
+                continue
+            for period in (periods if source.periodic else periods[:1]):
+                task = source.task(period, fresh=True)
+                self.tasks[task.name] = task
+                self.intervals[task.name] = source.interval
+
+        # Resume from what is already published so a restart does not refetch everything
+        self.snapshots: Dict[str, Snapshot] = read_snapshots(list(self.tasks))
+        now = time.time()
+        self.next_due: Dict[str, float] = {
+            key: self.snapshots[key].fetched_at + interval if key in self.snapshots else now
+            for key, interval in self.intervals.items()
+        }
+
+    def due(self, now: float) -> List[str]:
+        return [key for key, at in self.next_due.items() if at <= now]
+
+    def run_once(self, keys: Optional[List[str]] = None) -> Dict[str, Snapshot]:
+        """Refresh `keys` (default: every source that is due) and publish the new snapshots."""
+        keys = keys if keys is not None else self.due(time.time())
+        if not keys:
+            return {}
+        logger.info(f"Ingesting {len(keys)} source(s): {keys}")
+        results = run_dag([self.tasks[k] for k in keys])
+
+        now = time.time()
+        updated: Dict[str, Snapshot] = {}
+        for key, r in results.items():
+            if r.ok:
+                updated[key] = Snapshot(r.value, now, r.elapsed)
+                self.next_due[key] = now + self.intervals[key]
+            else:
+                prev = self.snapshots.get(key)
+                updated[key] = (Snapshot(prev.value, prev.fetched_at, prev.elapsed, r.error) if prev
+                                else Snapshot(r.value, now, r.elapsed, r.error))
+                self.next_due[key] = now + min(RETRY_DELAY, self.intervals[key])
+
+        self.snapshots.update(updated)
+        try:
+            publish_snapshots(updated)
+        except Exception as e:
+            logger.error(f"Failed to publish snapshots: {e}")
+        self.record_metrics()
+        return updated
+
+    def record_metrics(self) -> None:
+        """Append the dashboard metrics computed from the current snapshots to the metric history."""
+        snapshots = {name: self.snapshots.get(SOURCES[name].key(DEFAULT_HISTORY_PERIOD)) for name in METRIC_SOURCES}
+        inputs = [s for s in snapshots.values() if s is not None and not s.error]
+        if not inputs:
+            return
+        value = {name: s.value if s is not None else SOURCES[name].default for name, s in snapshots.items()}
+        try:
+            record_dashboard_metrics(value['us'][0], value['vn_market'], value['vn_economic'], value['global_context'],
+                                     dt.datetime.fromtimestamp(max(s.fetched_at for s in inputs), tz=dt.timezone.utc))
+        except Exception as e:
+            logger.warning(f"Failed to record metric snapshot: {e}")
+
+    def run_forever(self, stop: threading.Event) -> None:
+        while not stop.is_set():
+            self.run_once()
+            wait = min(self.next_due.values()) - time.time()
+            if wait > 0:
+                stop.wait(wait)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Refresh dashboard data sources into the shared cache backend.")
+    parser.add_argument("--once", action="store_true", help="refresh every source once and exit")
+    parser.add_argument("--sources", nargs="+", choices=list(SOURCES), help="only ingest these sources")
+    args = parser.parse_args(argv)
+
+    init_logging()
+    if isinstance(get_backend(), MemoryBackend):
+        logger.warning("ECOTRACK_CACHE_BACKEND is 'memory': snapshots will not be visible to the dashboard; "
+                       "use 'sqlite' or 'redis'")
+
+    daemon = IngestionDaemon(args.sources)
+    if args.once:
+        daemon.run_once(list(daemon.tasks))
+        return
+
+    stop = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: stop.set())
+    logger.info(f"Ingestion daemon started: {daemon.intervals}")
+    daemon.run_forever(stop)
+    logger.info("Ingestion daemon stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+# tests/conftest.py - Shared fixtures: a local RESP2 stand-in for Redis
+import fnmatch
+import os
+import socketserver
+import tempfile
+import threading
+import time
+
+import pytest
+
+# Keep modules that call init_logging() at import from appending to the working tree's dashboard.log
+os.environ.setdefault("ECOTRACK_LOG_FILE", os.path.join(tempfile.gettempdir(), "ecotrack-tests.log"))
+
+
+class RespStub(socketserver.ThreadingTCPServer):
+    """
+    In-process Redis stand-in speaking RESP2 over a real socket: AUTH, SELECT, GET,
+    SET [PX ms], SCAN cursor [MATCH p] [COUNT n] and DEL. Every received command is
+    kept in `commands`; `drop_next` closes the connection instead of answering.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, password=None):
+        super().__init__(("127.0.0.1", 0), _RespHandler)
+        self.password = password
+        self.data = {}  # key -> (value, expires_at or None)
+        self.order = []  # every key ever set; SCAN cursors index this, so deletes never shift them
+        self.commands = []
+        self.connections = 0
+        self.drop_next = False
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address
+        return f"redis://{host}:{port}/0"
+
+    def live(self, key):
+        value, expires = self.data.get(key, (None, None))
+        if expires is not None and expires <= time.monotonic():
+            self.data.pop(key, None)
+            return None
+        return value
+
+
+class _RespHandler(socketserver.StreamRequestHandler):
+    def read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        assert line[:1] == b"*", line
+        args = []
+        for _ in range(int(line[1:])):
+            size = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(size + 2)[:-2])
+        return args
+
+    def handle(self):
+        server = self.server
+        server.connections += 1
+        authed = server.password is None
+        while True:
+            args = self.read_command()
+            if args is None:
+                return
+            name = args[0].decode().upper()
+            with server.lock:
+                server.commands.append([name, *args[1:]])
+                if server.drop_next:
+                    server.drop_next = False
+                    return
+                if name == "AUTH":
+                    authed = args[1].decode() == server.password
+                    reply = b"+OK\r\n" if authed else b"-WRONGPASS invalid password\r\n"
+                elif not authed:
+                    reply = b"-NOAUTH Authentication required.\r\n"
+                else:
+                    reply = self.execute(name, args[1:])
+            self.wfile.write(reply)
+
+    def execute(self, name, args):
+        server = self.server
+        if name == "SELECT":
+            return b"+OK\r\n"
+        if name == "GET":
+            value = server.live(args[0])
+            return b"$-1\r\n" if value is None else b"$%d\r\n%s\r\n" % (len(value), value)
+        if name == "SET":
+            expires = None
+            if len(args) == 4 and args[2].upper() == b"PX":
+                expires = time.monotonic() + int(args[3]) / 1000
+            if args[0] not in server.data:
+                server.order.append(args[0])
+            server.data[args[0]] = (args[1], expires)
+            return b"+OK\r\n"
+        if name == "DEL":
+            removed = sum(server.data.pop(k, None) is not None for k in args)
+            return b":%d\r\n" % removed
+        if name == "SCAN":
+            options = {args[i].upper(): args[i + 1] for i in range(1, len(args) - 1, 2)}
+            start, count = int(args[0]), int(options.get(b"COUNT", 10))
+            page = [k for k in server.order[start:start + count] if k in server.data
+                    and fnmatch.fnmatchcase(k.decode(), options.get(b"MATCH", b"*").decode())]
+            cursor = b"0" if start + count >= len(server.order) else str(start + count).encode()
+            body = b"".join(b"$%d\r\n%s\r\n" % (len(k), k) for k in page)
+            return b"*2\r\n$%d\r\n%s\r\n*%d\r\n%s" % (len(cursor), cursor, len(page), body)
+        return b"-ERR unknown command '%s'\r\n" % name.encode()
+
+
+@pytest.fixture
+def resp_server():
+    """Factory starting RespStub servers; all are shut down after the test."""
+    servers = []
+
+    def start(password=None) -> RespStub:
+        server = RespStub(password)
+        threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def redis_stub(resp_server):
+    return resp_server()
@@ -0,0 +1,70 @@
+# tests/test_breadth.py - Full-exchange breadth stays inside the TCBS request budget
+import datetime as dt
+import os
+
+import pandas as pd
+import pytest
+
+from constants import DATA_SOURCES
+from data import vn
+from data.store import ParquetBarCache
+
+SYMBOLS = [f"S{i:03d}" for i in range(50)]
+END = dt.date(2025, 3, 21)  # a Friday
+START = END - dt.timedelta(days=vn.BREADTH_HISTORY_DAYS)
+
+
+def _bars(symbol: str, last: dt.date) -> pd.DataFrame:
+    dates = pd.bdate_range(end=pd.Timestamp(last), periods=5, tz="Asia/Ho_Chi_Minh")
+    return pd.DataFrame({"code": symbol, "date": dates, "open": 10.0, "high": 10.0, "low": 10.0,
+                         "close": 10.0, "volume": 1e4})
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = ParquetBarCache(tmp_path)
+    monkeypatch.setattr(vn, "BAR_CACHE", cache)
+    # After Friday's close: bars refreshed since then are final
+    close = dt.datetime.combine(END, vn.SESSION_CLOSE, tzinfo=vn.MARKET_TZ)
+    monkeypatch.setattr(vn, "_bars_settled_before", lambda now=None: close)
+    return cache
+
+
+def _refreshed(cache: ParquetBarCache, symbol: str, at: dt.datetime) -> None:
+    cache.append(symbol, _bars(symbol, END), START)
+    os.utime(cache._dir(symbol) / "meta.json", (at.timestamp(), at.timestamp()))
+
+
+def test_tcbs_budget_is_not_raised_for_breadth():
+    assert DATA_SOURCES["tcbs"]["rate_limit"] * 3600 / DATA_SOURCES["tcbs"]["rate_period"] == 1000
+    per_hour = vn.BREADTH_MAX_REQUESTS * 3600 / vn.BREADTH_TTL
+    assert per_hour <= vn.TCBS_BUDGET["breadth"]
+
+
+def test_breadth_due_prefers_missing_then_stalest(cache):
+    close = vn._bars_settled_before()
+    for i, symbol in enumerate(SYMBOLS[:40]):
+        # S000..S019 refreshed before the close (S000 oldest), S020..S039 after it
+        offset = dt.timedelta(hours=i - 20) if i < 20 else dt.timedelta(minutes=i)
+        _refreshed(cache, symbol, close + offset)
+
+    due = vn._breadth_due(SYMBOLS, START, END, limit=15)
+    assert due == SYMBOLS[40:] + SYMBOLS[:5]
+
+    everything = vn._breadth_due(SYMBOLS, START, END, limit=len(SYMBOLS))
+    assert set(everything) == set(SYMBOLS[:20] + SYMBOLS[40:])
+
+
+def test_breadth_due_skips_final_history(cache):
+    # Bars through a past `end` do not change once stored, however old the refresh
+    past = END - dt.timedelta(days=7)
+    cache.append("OLD", _bars("OLD", past), START - dt.timedelta(days=7))
+    os.utime(cache._dir("OLD") / "meta.json", (0, 0))
+    assert vn._breadth_due(["OLD"], START - dt.timedelta(days=7), past) == []
+
+
+def test_breadth_due_samples_without_cache(monkeypatch):
+    monkeypatch.setattr(vn, "BAR_CACHE", None)
+    due = vn._breadth_due(SYMBOLS, START, END, limit=10)
+    assert len(due) == 10 and set(due) <= set(SYMBOLS)
+    assert due == vn._breadth_due(SYMBOLS, START, END, limit=10)
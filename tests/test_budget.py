@@ -0,0 +1,83 @@
+# tests/test_budget.py - Every TCBS consumer stays inside its share of the request budget
+import asyncio
+import datetime as dt
+import os
+import time
+
+import pandas as pd
+import pytest
+
+from constants import DATA_SOURCES, VN_MAJOR_STOCKS
+from data import vn
+from data.store import ParquetBarCache
+
+END = dt.date(2025, 3, 24)
+START = END - dt.timedelta(days=30)
+
+
+def _bars(first: str, periods: int) -> pd.DataFrame:
+    dates = pd.bdate_range(first, periods=periods, tz="Asia/Ho_Chi_Minh")
+    return pd.DataFrame({"code": "VNINDEX", "date": dates, "open": 10.0, "high": 10.0, "low": 10.0,
+                         "close": 10.0, "volume": 1e4})
+
+
+def test_shares_fit_the_limiter():
+    tcbs = DATA_SOURCES["tcbs"]
+    assert sum(vn.TCBS_BUDGET.values()) <= tcbs["rate_limit"] * 3600 / tcbs["rate_period"]
+
+
+def test_daily_bar_consumers_fit_their_share():
+    # vn_market's symbols; market_history's sectors, index charts and intraday closes read the same bars
+    tracked = set(vn._stock_universe()) | set(vn.VIETNAM_INDICES)
+    sectors = {s for info in VN_MAJOR_STOCKS.values() if isinstance(info, dict) for s in info.get("stocks", [])}
+    assert sectors | set(vn.VN30_STOCKS) <= tracked
+    assert len(tracked) * 3600 / vn.BAR_REFRESH_INTERVAL <= vn.TCBS_BUDGET["daily_bars"]
+    assert len(vn.VN30_STOCKS) <= vn.TCBS_BUDGET["overview"]  # all overviews in one hour, once per review
+
+
+@pytest.fixture
+def requests(tmp_path, monkeypatch):
+    cache = ParquetBarCache(tmp_path)
+    cache.append("VNINDEX", _bars("2025-01-02", 56), START)
+    monkeypatch.setattr(vn, "BAR_CACHE", cache)
+    monkeypatch.setattr(vn, "_bars_settled_before", lambda now=None: dt.datetime.now(vn.MARKET_TZ))  # in session
+    calls = []
+
+    async def fetch(symbol, start, end, resolution="D"):
+        calls.append((symbol, start, end))
+        await asyncio.sleep(0.05)
+        return _bars(str(start), 1)
+
+    monkeypatch.setattr(vn, "_tcbs_bars_async", fetch)
+    return calls
+
+
+def _age(seconds: float) -> None:
+    at = time.time() - seconds
+    os.utime(vn.BAR_CACHE._dir("VNINDEX") / "meta.json", (at, at))
+
+
+def test_fresh_bars_are_served_without_a_request(requests):
+    _age(vn.BAR_REFRESH_INTERVAL - 60)
+    assert len(vn._cached_tcbs_bars("VNINDEX", START, END)) > 0
+    assert requests == []
+
+    _age(vn.BAR_REFRESH_INTERVAL + 60)
+    vn._cached_tcbs_bars("VNINDEX", START, END)
+    assert requests == [("VNINDEX", dt.date(2025, 3, 20), END)]
+
+
+def test_settled_bars_are_served_without_a_request(requests, monkeypatch):
+    _age(6 * 3600)
+    settled = dt.datetime.fromtimestamp(time.time() - 7 * 3600, vn.MARKET_TZ)
+    monkeypatch.setattr(vn, "_bars_settled_before", lambda now=None: settled)
+    vn._cached_tcbs_bars("VNINDEX", START, END)
+    assert requests == []
+
+
+def test_concurrent_consumers_share_one_delta_request(requests):
+    _age(vn.BAR_REFRESH_INTERVAL + 60)
+    coros = [vn._cached_tcbs_bars_async("VNINDEX", START, END) for _ in range(3)]
+    frames = vn.http.run(vn._gather(*coros))
+    assert len(requests) == 1
+    assert all(f.equals(frames[0]) for f in frames)
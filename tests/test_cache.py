@@ -0,0 +1,120 @@
+# tests/test_cache.py - Cache backends (Redis client against a local RESP stand-in) and the cached decorator
+import threading
+import time
+
+import pytest
+
+from utils.cache import MemoryBackend, RedisBackend, RedisError, cached, set_backend
+
+
+@pytest.fixture
+def backend(redis_stub):
+    return RedisBackend.from_url(redis_stub.url)
+
+
+@pytest.fixture
+def shared_backend(backend):
+    set_backend(backend)
+    yield backend
+    set_backend(MemoryBackend())
+
+
+def test_redis_get_set_round_trip(backend):
+    assert backend.get("missing") is None
+    backend.set("k", b"value")
+    assert backend.get("k") == b"value"
+
+
+def test_redis_binary_and_large_values(backend):
+    # CRLF inside the payload and a body spanning many recv() calls
+    value = b"\r\n$5\r\n" + bytes(range(256)) * 1024
+    backend.set("big", value)
+    assert backend.get("big") == value
+
+
+def test_redis_ttl_sent_in_milliseconds(backend, redis_stub):
+    backend.set("short", b"x", ttl=0.05)
+    assert redis_stub.commands[-1] == ["SET", b"short", b"x", b"PX", b"50"]
+    assert backend.get("short") == b"x"
+    time.sleep(0.1)
+    assert backend.get("short") is None
+
+
+def test_redis_delete_prefix_follows_scan_cursor(backend, redis_stub):
+    for i in range(1234):
+        backend.set(f"ecotrack:tcbs:{i}", b"1")
+    backend.set("ecotrack:fred:keep", b"1")
+
+    backend.delete_prefix("ecotrack:tcbs:")
+
+    scans = [c for c in redis_stub.commands if c[0] == "SCAN"]
+    assert len(scans) > 1  # more keys than one COUNT page
+    assert [k for k in redis_stub.data] == [b"ecotrack:fred:keep"]
+
+
+def test_redis_error_reply_raises_and_connection_stays_usable(backend):
+    with pytest.raises(RedisError, match="unknown command"):
+        backend.command("NOPE")
+    backend.set("after", b"ok")
+    assert backend.get("after") == b"ok"
+
+
+def test_redis_reconnects_after_dropped_connection(backend, redis_stub):
+    backend.set("k", b"v")
+    redis_stub.drop_next = True
+    assert backend.get("k") == b"v"
+    assert redis_stub.connections == 2
+
+
+def test_redis_auth_and_select_from_url(resp_server):
+    server = resp_server(password="s3cret")
+    host, port = server.server_address
+    client = RedisBackend.from_url(f"redis://:s3cret@{host}:{port}/2")
+    client.set("k", b"v")
+    assert server.commands[:2] == [["AUTH", b"s3cret"], ["SELECT", b"2"]]
+
+    with pytest.raises(RedisError, match="WRONGPASS"):
+        RedisBackend.from_url(f"redis://:wrong@{host}:{port}/0").get("k")
+
+
+def test_cached_shares_results_through_redis(shared_backend, redis_stub):
+    calls = []
+
+    @cached('tcbs', ttl=60)
+    def load(symbol, _store=None):
+        calls.append(symbol)
+        return {"symbol": symbol}
+
+    assert load("FPT") == load("FPT", _store=object()) == {"symbol": "FPT"}
+    assert calls == ["FPT"]
+    assert any(k.startswith(load.cache_key_prefix.encode()) for k in redis_stub.data)
+
+    load.clear()
+    load("FPT")
+    assert calls == ["FPT", "FPT"]
+
+
+def test_cached_computes_once_and_releases_key_locks(shared_backend):
+    calls = []
+    started = threading.Event()
+
+    @cached('tcbs', ttl=60)
+    def slow(n):
+        calls.append(n)
+        if n == 1:
+            started.set()
+            time.sleep(0.05)
+        return n * 2
+
+    threads = [threading.Thread(target=slow, args=(1,)) for _ in range(8)]
+    for t in threads:
+        t.start()
+    started.wait(1)
+    assert len(slow._key_locks) == 1
+    for t in threads:
+        t.join()
+    assert calls == [1]
+
+    for n in range(100):
+        slow(n)
+    assert len(slow._key_locks) == 0
@@ -0,0 +1,59 @@
+# tests/test_correlation.py - One-pass correlation matrices against pandas, and the shared VN history
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis.correlation import correlation_matrix, rolling_correlation
+from data import cross_asset
+from data.sources import HISTORY_PERIODS
+from utils.cache import MemoryBackend, set_backend
+
+
+@pytest.fixture(scope="module")
+def panel():
+    rng = np.random.default_rng(5)
+    dates = pd.bdate_range("2024-01-01", periods=300)
+    common = rng.normal(0, 0.01, len(dates))
+    out = pd.DataFrame({f"S{i}": 0.4 * i * common + rng.normal(0.001 * i, 0.01, len(dates)) for i in range(6)},
+                       index=dates)
+    out.iloc[:40, 1] = np.nan  # shorter history
+    out.iloc[rng.random(len(dates)) < 0.1, 2] = np.nan  # scattered gaps
+    out.iloc[::21, 3] = np.nan
+    out["flat"] = 0.01  # zero variance
+    out.iloc[100:, 5] += 50.0  # large level, small moves
+    return out
+
+
+def test_correlation_matrix_matches_pandas(panel):
+    expected = panel.corr(min_periods=10)
+    got = correlation_matrix(panel, min_periods=10)
+    assert got.isna().equals(expected.isna())
+    np.testing.assert_allclose(got.to_numpy(), expected.to_numpy(), rtol=1e-10, atol=1e-12, equal_nan=True)
+
+
+def test_rolling_correlation_matches_pandas(panel):
+    expected = panel.drop(columns="flat").rolling(60, min_periods=20).corr()
+    got = rolling_correlation(panel.drop(columns="flat"), 60, min_periods=20)
+    assert got.index.equals(expected.index)
+    assert got.isna().equals(expected.isna())
+    np.testing.assert_allclose(got.to_numpy(), expected.to_numpy(), rtol=1e-8, atol=1e-10, equal_nan=True)
+
+
+def test_history_periods_share_one_vn_pass(monkeypatch):
+    set_backend(MemoryBackend())
+    calls = []
+    dates = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=800)
+    level = pd.Series(np.linspace(100, 140, len(dates)), index=dates)
+    monkeypatch.setattr(cross_asset, "vn_market_series", lambda days: calls.append(days) or {"VN-Index": level})
+    for group in ("US", "VN Macro", "Global"):
+        monkeypatch.setitem(cross_asset.GROUPS, group, lambda months_back: {})
+
+    try:
+        histories = {months: cross_asset.get_cross_asset_history(months) for months in HISTORY_PERIODS}
+    finally:
+        set_backend(MemoryBackend())
+    assert cross_asset.VN_HISTORY_MONTHS >= max(HISTORY_PERIODS)
+    assert calls == [cross_asset.VN_HISTORY_MONTHS * 31]
+    for months, history in histories.items():
+        start = pd.Timestamp.today().normalize() - pd.Timedelta(days=months * 31)
+        assert history["VN: VN-Index"].index[1] >= start > history["VN: VN-Index"].index[0]
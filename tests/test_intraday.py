@@ -0,0 +1,59 @@
+# tests/test_intraday.py - Intraday minute buffers and the live technicals they drive
+import datetime as dt
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis.panel import TECHNICAL_FIELDS
+from data import intraday, vn
+from data.store import ParquetBarCache
+from test_store import _bars, _batch
+
+DAY = dt.date(2025, 3, 24)
+
+
+def _minutes(*closes: float, start: str = "2025-03-24 09:15") -> tuple:
+    times = pd.date_range(start, periods=len(closes), freq="min", tz=intraday.MARKET_TZ)
+    values = np.array([[c, c, c, c, 1e3] for c in closes])
+    return times.as_unit("s").asi8, values
+
+
+@pytest.fixture
+def feed(tmp_path, monkeypatch):
+    cache = ParquetBarCache(tmp_path)
+    cache.append("VNINDEX", _bars("2024-04-01", 250).assign(code="VNINDEX"), dt.date(2024, 4, 1))
+    monkeypatch.setattr(vn, "BAR_CACHE", cache)
+    feed = intraday.IntradayFeed(["VNINDEX"])
+    monkeypatch.setattr(feed, "_map", lambda fn, day: [0 for _ in feed.buffers])  # no network
+    feed._start_session(DAY)
+    return feed
+
+
+def test_live_technicals_match_batch_over_history_plus_today(feed):
+    history = vn.BAR_CACHE.load("VNINDEX")
+    for closes in [(21.0, 21.3), (21.3, 20.8, 20.5)]:
+        feed.buffers["VNINDEX"].write(*_minutes(*closes, start="2025-03-24 09:15"))
+        feed._advance_technicals(DAY)
+        today = pd.DataFrame({"date": [pd.Timestamp(DAY, tz=intraday.MARKET_TZ)], "close": [closes[-1]]})
+        expected = {k: v for k, v in _batch(pd.concat([history, today])).items() if k in TECHNICAL_FIELDS}
+        assert feed.technicals()["VNINDEX"] == pytest.approx(expected, rel=1e-10)
+
+
+def test_apply_intraday_updates_index_technicals(feed):
+    feed.buffers["VNINDEX"].write(*_minutes(21.0, 21.4))
+    feed._advance_technicals(DAY)
+    daily = {"indices": {"vnindex": {"name": "VN-Index", "price": 20.0, "rsi": 50.0, "volatility_20d": 12.0}}}
+
+    live = intraday.apply_intraday(daily, feed)["indices"]["vnindex"]
+    assert live["price"] == 21.4
+    assert live["rsi"] == pytest.approx(feed.technicals()["VNINDEX"]["rsi"])
+    assert live["rsi_signal"] and live["volatility_20d"] == 12.0  # not tracked by the streaming state
+    assert daily["indices"]["vnindex"]["rsi"] == 50.0
+
+
+@pytest.mark.parametrize("symbols", [intraday.intraday_symbols(), list(vn.VIETNAM_INDICES)])
+def test_poll_rate_fits_the_intraday_share(symbols):
+    feed = intraday.IntradayFeed(symbols, interval=intraday.POLL_INTERVAL)
+    assert len(feed.buffers) * 3600 / feed.interval <= vn.TCBS_BUDGET["intraday"]
+    assert feed.interval == intraday.poll_interval(len(symbols)) >= intraday.POLL_INTERVAL
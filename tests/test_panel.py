@@ -0,0 +1,63 @@
+# tests/test_panel.py - Vectorized panel indicators against the per-symbol pandas implementation
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis.indicators import calculate_rsi
+from analysis.panel import TECHNICAL_FIELDS, build_panel, compute_panel_indicators
+
+
+def _per_symbol(close: pd.Series) -> dict:
+    """The per-frame indicators the panel replaced, on one symbol's own sessions."""
+    close = close.dropna()
+    out = dict.fromkeys(TECHNICAL_FIELDS, np.nan)
+    if len(close) < 5:
+        return out
+    if len(close) >= 14:
+        out["rsi"] = calculate_rsi(close).iloc[-1]
+    for window in (20, 50, 200):
+        if len(close) >= window:
+            out[f"sma_{window}"] = close.rolling(window).mean().iloc[-1]
+    if len(close) >= 20:
+        mean, std = close.rolling(20).mean().iloc[-1], close.rolling(20).std().iloc[-1]
+        out["bb_upper"], out["bb_lower"] = mean + 2 * std, mean - 2 * std
+        out["bb_position"] = (close.iloc[-1] - out["bb_lower"]) / (out["bb_upper"] - out["bb_lower"])
+        out["resistance"] = close.rolling(20).max().iloc[-1]
+        out["support"] = close.rolling(20).min().iloc[-1]
+        returns = close.pct_change().dropna()
+        if len(returns) >= 20:
+            out["volatility_20d"] = returns.rolling(20).std().iloc[-1] * np.sqrt(252) * 100
+    return out
+
+
+@pytest.fixture(scope="module")
+def frames():
+    rng = np.random.default_rng(11)
+    dates = pd.bdate_range("2024-01-01", periods=260, tz="Asia/Ho_Chi_Minh")
+    out = {}
+    for i, length in enumerate([3, 8, 14, 19, 25, 60, 150, 210, 260] * 4):
+        days = dates[-length:]
+        keep = rng.random(length) > 0.1  # halted sessions
+        keep[-1] = i % 5 != 0  # some symbols did not trade on the latest session
+        close = 20 * np.exp(np.cumsum(rng.normal(0, 0.02, length)))
+        out[f"S{i:02d}"] = pd.DataFrame({"date": days[keep], "close": close[keep]})
+    return out
+
+
+def test_build_panel_is_sorted_without_warnings(frames):
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        panel = build_panel(frames, "close")
+    assert panel.index.is_monotonic_increasing
+    assert list(panel.columns) == list(frames)
+
+
+def test_panel_indicators_match_per_symbol_pandas(frames):
+    close = build_panel(frames, "close")
+    table = compute_panel_indicators(close)
+    expected = pd.DataFrame({s: _per_symbol(close[s]) for s in close.columns}).T
+    got = table[TECHNICAL_FIELDS].astype(float)
+    assert got.isna().equals(expected.isna())
+    np.testing.assert_allclose(got.to_numpy(), expected.to_numpy(dtype=float), rtol=1e-12, equal_nan=True)
@@ -0,0 +1,77 @@
+# tests/test_sql.py - DuckDB views over the local stores agree with the pandas analysis path
+import datetime as dt
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("duckdb")
+
+from analysis.panel import build_panel, compute_breadth  # noqa: E402
+from data.sql import MarketSQL  # noqa: E402
+from data.store import FredSeriesStore, ParquetBarCache  # noqa: E402
+
+SYMBOLS = ["AAA", "BBB", "CCC", "DDD", "EEE", "FFF"]
+BREADTH_COLUMNS = ["advancing", "declining", "unchanged", "up_volume", "down_volume", "new_highs", "new_lows"]
+
+
+@pytest.fixture(scope="module")
+def frames():
+    rng = np.random.default_rng(7)
+    dates = pd.bdate_range("2024-12-02", "2025-03-24", tz="Asia/Ho_Chi_Minh")
+    out = {}
+    for i, symbol in enumerate(SYMBOLS):
+        close = 10 * np.exp(np.cumsum(rng.normal(0, 0.02, len(dates))))
+        bars = pd.DataFrame({"code": symbol, "date": dates, "open": close, "high": close, "low": close,
+                             "close": close.round(2), "volume": rng.integers(1_000, 50_000, len(dates)).astype(float)})
+        if i == 0:
+            bars = bars.drop(bars.index[[20, 40, len(bars) - 1]])  # halted sessions, including the latest
+        out[symbol] = bars.reset_index(drop=True)
+    return out
+
+
+@pytest.fixture(scope="module")
+def sql(frames, tmp_path_factory):
+    root = tmp_path_factory.mktemp("cache")
+    bars = ParquetBarCache(root)
+    for symbol, df in frames.items():
+        bars.append(symbol, df, dt.date(2024, 12, 1))
+    observations = pd.Series([4.33, 4.33, 4.33], index=pd.to_datetime(["2025-01-01", "2025-02-01", "2025-03-01"]))
+    FredSeriesStore(root).append("FEDFUNDS", observations, dt.date(2025, 1, 1), None)
+    return MarketSQL(root)
+
+
+def test_bar_dates_are_market_dates(sql, frames):
+    got = sql.query("SELECT date FROM bars WHERE symbol = 'BBB' ORDER BY date")["date"]
+    expected = frames["BBB"]["date"].dt.date
+    assert [d.date() for d in pd.to_datetime(got)] == list(expected)
+
+
+def test_fred_dates_are_observation_dates(sql):
+    got = sql.query("SELECT date FROM fred WHERE series_id = 'FEDFUNDS' ORDER BY date")["date"]
+    assert [str(d.date()) for d in pd.to_datetime(got)] == ["2025-01-01", "2025-02-01", "2025-03-01"]
+
+
+def test_breadth_daily_matches_compute_breadth(sql, frames):
+    daily = sql.query("SELECT * FROM breadth_daily ORDER BY date")
+    daily["date"] = pd.to_datetime(daily["date"]).dt.date
+    assert all(d.weekday() < 5 for d in daily["date"])
+
+    close, volume = build_panel(frames, "close"), build_panel(frames, "volume")
+    assert daily["date"].tolist() == [d.date() for d in close.index[1:]]
+    for i in range(2, len(close) + 1):
+        expected = compute_breadth(close.iloc[:i], volume.iloc[:i])
+        row = daily.iloc[i - 2]
+        assert str(row["date"]) == expected["as_of"]
+        assert {c: row[c] for c in BREADTH_COLUMNS} == pytest.approx({c: expected[c] for c in BREADTH_COLUMNS})
+
+
+def test_query_from_another_thread_keeps_market_time(sql):
+    # Every query runs on its own cursor; the market time zone must apply there too
+    result = {}
+    thread = threading.Thread(target=lambda: result.update(
+        tz=sql.query("SELECT current_setting('TimeZone') AS tz")["tz"][0]))
+    thread.start()
+    thread.join()
+    assert result["tz"] == "Asia/Ho_Chi_Minh"
@@ -0,0 +1,176 @@
+# tests/test_store.py - Local on-disk stores
+import datetime as dt
+import multiprocessing
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis.indicators import calculate_rsi
+from data import store as store_module
+from data.store import FredSeriesStore, MetricHistoryStore, ParquetBarCache
+
+
+def _bars(start: str, periods: int, seed: int = 0) -> pd.DataFrame:
+    dates = pd.bdate_range(start, periods=periods, tz="Asia/Ho_Chi_Minh")
+    close = 20 * np.exp(np.cumsum(np.random.default_rng(seed).normal(0, 0.02, periods)))
+    return pd.DataFrame({"code": "FPT", "date": dates, "open": close, "high": close, "low": close,
+                         "close": close, "volume": 1e5})
+
+
+def _batch(bars: pd.DataFrame) -> dict:
+    """The indicators recomputed over the whole history with the pandas batch functions."""
+    close = bars["close"].reset_index(drop=True)
+    mean20, std20 = close.rolling(20).mean().iloc[-1], close.rolling(20).std().iloc[-1]
+    upper, lower = mean20 + 2 * std20, mean20 - 2 * std20
+    return {
+        "rsi": calculate_rsi(close).iloc[-1],
+        "ema_20": close.ewm(span=20, adjust=False).mean().iloc[-1],
+        "sma_20": mean20,
+        "sma_50": close.rolling(50).mean().iloc[-1],
+        "sma_200": close.rolling(200).mean().iloc[-1],
+        "bb_upper": upper,
+        "bb_lower": lower,
+        "bb_position": (close.iloc[-1] - lower) / (upper - lower),
+        "resistance": close.rolling(20).max().iloc[-1],
+        "support": close.rolling(20).min().iloc[-1],
+    }
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ParquetBarCache(tmp_path)
+
+
+def test_append_keeps_no_state_for_unsubscribed_symbols(cache):
+    cache.append("FPT", _bars("2025-01-01", 60), dt.date(2025, 1, 1))
+    assert not (cache._dir("FPT") / "indicators.json").exists()
+
+
+def test_indicator_state_matches_batch_recomputation(cache):
+    history = _bars("2024-01-01", 250)
+    cache.append("FPT", history, dt.date(2024, 1, 1))
+    assert cache.indicator_state("FPT").values() == pytest.approx(_batch(history), rel=1e-10)
+
+
+def test_indicator_state_advances_with_deltas_without_reloading_bars(cache, monkeypatch):
+    history = _bars("2024-01-01", 300)
+    cache.append("FPT", history.iloc[:250], dt.date(2024, 1, 1))
+    cache.indicator_state("FPT")  # subscribe
+
+    merged = None
+    for end in range(251, 301, 7):
+        # Delta refresh: re-reads the last stored bar (revised) plus the new ones
+        delta = history.iloc[249 if merged is None else len(merged) - 1:end].copy()
+        delta.loc[delta.index[0], "close"] *= 1.01
+        merged = cache.append("FPT", delta, dt.date(2024, 1, 1))
+
+    monkeypatch.setattr(cache, "load", lambda symbol: pytest.fail("indicator_state reloaded the bars"))
+    state = cache.indicator_state("FPT")
+    assert state.last_date == merged["date"].iloc[-1].strftime("%Y-%m-%d")
+    assert state.values() == pytest.approx(_batch(merged), rel=1e-10)
+
+
+def test_indicator_state_rebuilds_when_history_extends_backwards(cache):
+    history = _bars("2024-01-01", 300)
+    cache.append("FPT", history.iloc[100:], dt.date(2024, 6, 1))
+    cache.indicator_state("FPT")
+    merged = cache.append("FPT", history.iloc[:100], dt.date(2024, 1, 1))
+    assert cache.indicator_state("FPT").values() == pytest.approx(_batch(merged), rel=1e-10)
+
+
+def test_indicator_state_without_bars(cache):
+    assert cache.indicator_state("NONE") is None
+
+
+def _append_bars(root: str, worker: int, workers: int, start) -> None:
+    cache = ParquetBarCache(root)
+    history = _bars("2024-01-01", 120)
+    start.wait()
+    for i in range(worker, len(history), workers):
+        cache.append("FPT", history.iloc[i:i + 1], dt.date(2024, 1, 1))
+
+
+def test_bar_cache_appends_from_several_processes(tmp_path):
+    # The ingest daemon and the dashboard merge into the same symbol; no bar may be lost
+    ctx = multiprocessing.get_context("spawn")
+    start = ctx.Barrier(4)
+    workers = [ctx.Process(target=_append_bars, args=(str(tmp_path), n, 4, start)) for n in range(4)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join(60)
+        assert w.exitcode == 0
+
+    cache = ParquetBarCache(tmp_path)
+    assert cache.load("FPT")["date"].tolist() == _bars("2024-01-01", 120)["date"].tolist()
+    assert cache.meta("FPT")["last_date"] == _bars("2024-01-01", 120)["date"].iloc[-1].date()
+
+
+def _append_observations(root: str, worker: int, workers: int, start) -> None:
+    store = FredSeriesStore(root)
+    dates = pd.date_range("2015-01-01", periods=120, freq="MS")
+    start.wait()
+    for i in range(worker, len(dates), workers):
+        store.append("FEDFUNDS", pd.Series([float(i)], index=dates[i:i + 1]), dt.date(2015, 1, 1), None)
+
+
+def test_fred_store_appends_from_several_processes(tmp_path):
+    ctx = multiprocessing.get_context("spawn")
+    start = ctx.Barrier(4)
+    workers = [ctx.Process(target=_append_observations, args=(str(tmp_path), n, 4, start)) for n in range(4)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join(60)
+        assert w.exitcode == 0
+
+    store = FredSeriesStore(tmp_path)
+    assert store.load("FEDFUNDS").tolist() == [float(i) for i in range(120)]
+    assert store.meta("FEDFUNDS")["watermark"] == dt.date(2024, 12, 1)
+
+
+def _append_metrics(root: str, count: int, start, recorded) -> None:
+    history = MetricHistoryStore(root)
+    history.COMPACT_PARTS = 8
+    start.wait()
+    added = sum(history.append({"m": float(i)}, dt.datetime(2025, 1, 1) + dt.timedelta(minutes=i))
+                for i in range(count))
+    recorded.put(added)
+
+
+def test_metric_history_appends_from_several_processes(tmp_path):
+    # The ingest daemon and the dashboard record the same snapshots; each must be written once
+    ctx = multiprocessing.get_context("spawn")
+    start, recorded = ctx.Barrier(4), ctx.Queue()
+    workers = [ctx.Process(target=_append_metrics, args=(str(tmp_path), 60, start, recorded)) for _ in range(4)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join(60)
+        assert w.exitcode == 0
+
+    assert sum(recorded.get() for _ in workers) == 60
+    history = MetricHistoryStore(tmp_path)
+    assert history.series("m").tolist() == [float(i) for i in range(60)]
+    assert history.last_ts() == {"m": pd.Timestamp("2025-01-01 00:59", tz="UTC")}
+
+
+def test_metric_history_query_relists_after_concurrent_compaction(tmp_path, monkeypatch):
+    history = MetricHistoryStore(tmp_path)
+    for i in range(5):
+        history.append({"m": float(i)}, dt.datetime(2025, 1, 1, 9, i))
+    month = next(history.root.glob("month=*"))
+    read = pd.read_parquet
+    compacted = []
+
+    def compact_mid_read(path, **kwargs):
+        # Another process compacts right after this reader listed the parts
+        if not compacted:
+            compacted.append(path)
+            history._compact(month)
+        return read(path, **kwargs)
+
+    monkeypatch.setattr(store_module.pd, "read_parquet", compact_mid_read)
+    assert history.series("m").tolist() == [0.0, 1.0, 2.0, 3.0, 4.0]
+    assert compacted and len(list(month.glob("part-*.parquet"))) == 1
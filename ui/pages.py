@@ -1,12 +1,18 @@
 # ui/pages.py
 import os
+from typing import Dict, Optional
 
 import pandas as pd
 import streamlit as st
 
 from analysis.indicators import format_number
 from analysis.recommendations import generate_investment_recommendation
-from constants import VN_MAJOR_STOCKS
+from charts.cache import CHART_CACHE
+from constants import DATA_SOURCES, VN_MAJOR_STOCKS
+from ui.registry import page
+from utils.cache import clear_source
+from utils.metrics import REGISTRY, process_rss
+from utils.ratelimit import get_rate_limiter
 
 
 def _fmt_value_unit(val: float, unit: str) -> str:
@@ -78,6 +84,7 @@ def header_card():
     """, unsafe_allow_html=True)
 
 
+@page(sources=['us', 'vn_market', 'fed_data', 'global_context'])
 def show_overview_page(us_data, vn_data, fed_data, global_data):
     st.subheader("🎯 Key Metrics at a Glance")
     col1, col2, col3, col4 = st.columns(4)
@@ -153,6 +160,7 @@ def show_overview_page(us_data, vn_data, fed_data, global_data):
                 st.write(f"{emo} {s}: {d['avg_return']:+.2f}%")
 
 
+@page(sources=['us', 'fed_data'], charts=['us_indicators'])
 def show_us_economy_page(us_data, us_series, fed_data):
     st.header("🇺🇸 United States Economic Dashboard")
 
@@ -238,6 +246,7 @@ def show_us_economy_page(us_data, us_series, fed_data):
     # charts are rendered by caller if available
 
 
+@page(sources=['vn_market'])
 def show_vietnam_market_page(vn_data, charts, show_technical=True):
     st.header("🇻🇳 Vietnam Stock Market Dashboard")
     if 'error' in vn_data:
@@ -293,6 +302,7 @@ def show_vietnam_market_page(vn_data, charts, show_technical=True):
         st.dataframe(df, use_container_width=True, hide_index=True)
 
 
+@page(sources=['global_context'])
 def show_global_markets_page(global_data):
     st.header("🌍 Global Markets Dashboard")
     if not global_data:
@@ -310,6 +320,7 @@ def show_global_markets_page(global_data):
             st.markdown('</div>', unsafe_allow_html=True)
 
 
+@page(sources=['us', 'vn_market', 'fed_data'])
 def show_investment_analysis_page(us_data, vn_data, fed_data, risk_tolerance):
     st.header("📊 Investment Analysis & Recommendations")
     rec = generate_investment_recommendation(us_data, vn_data, fed_data)
@@ -334,6 +345,7 @@ def show_investment_analysis_page(us_data, vn_data, fed_data, risk_tolerance):
         st.markdown(f"**Suggested Allocation:** {alloc}")
 
 
+@page()
 def show_settings_page(get_fred_client):
     st.header("⚙️ Dashboard Settings")
     st.subheader("🔑 API Configuration")
@@ -355,6 +367,7 @@ def show_settings_page(get_fred_client):
                 if new_key:
                     st.session_state['fred_api_key'] = new_key.strip()
                     get_fred_client.clear()
+                    clear_source('fred')
                     st.success("Session key set. Refreshing FRED client...")
                 else:
                     st.warning("Enter a valid key")
@@ -362,4 +375,100 @@ def show_settings_page(get_fred_client):
             if st.button("Clear Session Key"):
                 st.session_state.pop('fred_api_key', None)
                 get_fred_client.clear()
-                st.info("Session key cleared")
\ No newline at end of file
+                clear_source('fred')
+                st.info("Session key cleared")
+
+
+def _label_frame(counters: Dict, value: str = "count") -> pd.DataFrame:
+    """Counter series {label set: value} as rows of their labels plus the value."""
+    return pd.DataFrame([{**dict(labels), value: v} for labels, v in counters.items()])
+
+
+@page()
+def show_performance_page(last_refresh: Dict, profile: Optional[Dict] = None):
+    """Latency, cache, rate-limit and memory diagnostics read from the in-process metrics registry."""
+    st.header("⏱️ Performance Diagnostics")
+    st.caption("Figures cover this dashboard process since it started. With ECOTRACK_INGEST=daemon, "
+               "upstream fetching happens in the ingestion daemon and is not counted here.")
+
+    rss = process_rss()
+    chart_stats = CHART_CACHE.stats()
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("Process RSS", f"{rss / 2 ** 20:,.0f} MB" if rss else "n/a")
+    c2.metric("Requests in Last Refresh", f"{last_refresh['http_requests']:,.0f}" if last_refresh else "n/a",
+              f"{last_refresh['duration']:.1f}s" if last_refresh else None, delta_color="off",
+              help="Upstream HTTP attempts (TCBS, Trading Economics, FRED) while the last refresh ran")
+    c3.metric("Chart Cache Hit Ratio", f"{chart_stats['hit_ratio']:.0%}",
+              f"{chart_stats['size']}/{chart_stats['maxsize']} figures", delta_color="off")
+    c4.metric("Upstream Requests (total)", f"{REGISTRY.total('http_requests_total'):,.0f}")
+
+    st.subheader("Data Source Latency")
+    sources = REGISTRY.summary("source_seconds")
+    if sources.empty:
+        st.info("No data source has been refreshed in this process yet.")
+    else:
+        errors = {dict(k).get("source"): v for k, v in REGISTRY.counters("source_errors_total").items()}
+        sources["errors"] = sources["source"].map(errors).fillna(0).astype(int)
+        st.dataframe(sources.sort_values("p95", ascending=False).round(3), hide_index=True, use_container_width=True)
+
+    st.subheader("Upstream Requests by Provider")
+    http = REGISTRY.summary("http_request_seconds")
+    if http.empty:
+        st.info("No upstream HTTP request has been made yet.")
+    else:
+        by_status = _label_frame(REGISTRY.counters("http_requests_total"))
+        statuses = by_status.pivot_table(index="provider", columns="status", values="count", aggfunc="sum", fill_value=0)
+        st.dataframe(http.set_index("provider").join(statuses).round(3), use_container_width=True)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.subheader("Cache Hit Ratios")
+        lookups = _label_frame(REGISTRY.counters("cache_requests_total"))
+        if lookups.empty:
+            st.info("No cache lookups yet.")
+        else:
+            ratios = lookups.pivot_table(index="cache", columns="result", values="count", aggfunc="sum", fill_value=0)
+            ratios = ratios.reindex(columns=["hit", "miss"], fill_value=0)
+            ratios["hit_ratio"] = ratios["hit"] / (ratios["hit"] + ratios["miss"])
+            st.dataframe(ratios.round(3), use_container_width=True)
+
+    with col2:
+        st.subheader("Rate-Limit Headroom")
+        rows = []
+        for provider, cfg in DATA_SOURCES.items():
+            if 'rate_limit' not in cfg:
+                continue
+            available = get_rate_limiter(provider).available()
+            rows.append({"provider": provider, "available": int(available), "limit": cfg['rate_limit'],
+                         "per": f"{cfg.get('rate_period', 3600):.0f}s", "headroom": available / cfg['rate_limit']})
+        st.dataframe(pd.DataFrame(rows).round(3), hide_index=True, use_container_width=True)
+
+    st.subheader("Instrumented Calls")
+    spans = REGISTRY.summary("span_seconds")
+    if spans.empty:
+        st.info("No instrumented call has run yet.")
+    else:
+        charts = spans["span"].str.startswith("charts.builders.")
+        tab1, tab2 = st.tabs(["Chart builds", "Loaders & analytics"])
+        with tab1:
+            st.dataframe(spans[charts].assign(span=spans["span"].str.removeprefix("charts.builders."))
+                         .sort_values("p95", ascending=False).round(4), hide_index=True, use_container_width=True)
+        with tab2:
+            st.dataframe(spans[~charts].sort_values("sum", ascending=False).round(4),
+                         hide_index=True, use_container_width=True)
+
+    st.subheader("Profiler")
+    p1, p2 = st.columns(2)
+    with p1:
+        if st.button("Profile Next Rerun", help="Runs the next page load under cProfile; switch to the slow page, "
+                                                "then come back here for the report"):
+            st.session_state['profile_next_run'] = True
+            st.success("Profiler armed: the next rerun will be profiled.")
+    with p2:
+        st.download_button("Download Prometheus Metrics", REGISTRY.to_prometheus(), file_name="ecotrack_metrics.prom",
+                           mime="text/plain")
+    if profile:
+        st.caption(f"Last profile: {profile['page']} · {profile['calls']:,} calls · {profile['total']:.2f}s")
+        st.code(profile['text'], language=None)
+        st.download_button("Download .prof", profile['prof'], file_name="rerun.prof",
+                           mime="application/octet-stream")
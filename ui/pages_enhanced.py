@@ -12,6 +12,7 @@ from analysis.investment import (
 from data.te import calculate_economic_score
 from charts.builders import create_economic_score_gauge
 from constants import VN_MAJOR_STOCKS
+from ui.registry import page
 
 
 def apply_enhanced_css():
@@ -137,6 +138,7 @@ def enhanced_header_card():
     """, unsafe_allow_html=True)
 
 
+@page(sources=['us', 'vn_market', 'vn_economic', 'fed_data', 'global_context'])
 def show_enhanced_overview_page(us_data, vn_market_data, vn_economic_data, fed_data, global_context):
     """Enhanced overview page with comprehensive analysis."""
     st.subheader("🎯 Executive Dashboard")
@@ -305,6 +307,8 @@ def show_enhanced_overview_page(us_data, vn_market_data, vn_economic_data, fed_d
                     st.write(f"{emoji} **{stock['symbol']}** ({sector}): {change:+.2f}%")
 
 
+@page(sources=['vn_market', 'vn_economic'],
+      charts=['vn30_analysis', 'vn_indices_comparison', 'market_breadth', 'sector_heatmap', 'vn_economic_dashboard'])
 def show_enhanced_vietnam_page(vn_market_data, vn_economic_data, charts, show_technical=True):
     """Enhanced Vietnam market page with comprehensive analysis."""
     st.header("🇻🇳 Vietnam Market & Economic Analysis")
@@ -383,6 +387,17 @@ def show_enhanced_vietnam_page(vn_market_data, vn_economic_data, charts, show_te
                 # Market breadth interpretation
                 if 'market_breadth' in vn_market_data:
                     breadth = vn_market_data['market_breadth']
+                    col1, col2, col3, col4 = st.columns(4)
+                    with col1:
+                        st.metric("Stocks Counted", f"{breadth.get('universe_size', 0):,}",
+                                  help=f"of {breadth.get('universe_requested', 0):,} listed on HOSE/HNX/UPCOM")
+                    with col2:
+                        st.metric("52W Highs", breadth.get('new_highs', 0))
+                    with col3:
+                        st.metric("52W Lows", breadth.get('new_lows', 0))
+                    with col4:
+                        st.metric("McClellan Osc.", f"{breadth.get('mcclellan_oscillator', 0):.1f}")
+
                     momentum = breadth.get('breadth_momentum', 'Neutral')
                     if momentum == 'Positive':
                         st.success("🟢 Positive market breadth - broad-based strength")
@@ -457,9 +472,12 @@ def show_enhanced_vietnam_page(vn_market_data, vn_economic_data, charts, show_te
             st.dataframe(df, use_container_width=True, hide_index=True)
 
 
+@page(sources=['us', 'vn_market', 'vn_economic', 'fed_data', 'global_context'],
+      charts=['fed_vietnam_correlation', 'sector_heatmap'])
 def show_enhanced_investment_analysis_page(us_data, vn_market_data, vn_economic_data, fed_data, global_context,
-                                           risk_tolerance):
+                                           risk_tolerance, charts=None):
     """Enhanced investment analysis with comprehensive recommendations."""
+    charts = charts or {}
     st.header("💼 Advanced Investment Analysis")
 
     # Generate comprehensive recommendations
@@ -709,6 +727,7 @@ def get_portfolio_allocation_recommendations(risk_tolerance: str, overall_score:
     }
 
 
+@page(sources=['global_context', 'us'], charts=['global_context'])
 def show_enhanced_global_markets_page(global_context, us_data):
     """Enhanced global markets page with Vietnam context."""
     st.header("🌍 Global Markets & Vietnam Impact Analysis")
@@ -0,0 +1,42 @@
+# ui/registry.py - Per-page data requirements so only what a page shows is loaded
+from dataclasses import dataclass
+from typing import Callable, FrozenSet, Iterable, Optional
+
+from charts.builders import CHART_SOURCES
+
+
+@dataclass(frozen=True)
+class PageRequirements:
+    """Data sources (see data.sources.SOURCES) and chart names (see CHART_SOURCES) a page renders."""
+    sources: FrozenSet[str] = frozenset()
+    charts: FrozenSet[str] = frozenset()
+
+    @property
+    def all_sources(self) -> FrozenSet[str]:
+        """Declared sources plus the inputs of every declared chart."""
+        needed = set(self.sources)
+        for chart in self.charts:
+            needed.update(CHART_SOURCES[chart])
+        return frozenset(needed)
+
+
+def page(sources: Iterable[str] = (), charts: Iterable[str] = ()) -> Callable:
+    """Declare what a page function needs; the router loads and builds nothing else."""
+    reqs = PageRequirements(frozenset(sources), frozenset(charts))
+    unknown = reqs.charts - set(CHART_SOURCES)
+    if unknown:
+        raise ValueError(f"Unknown chart(s): {sorted(unknown)}")
+
+    def decorator(fn: Callable) -> Callable:
+        fn.requirements = reqs
+        return fn
+
+    return decorator
+
+
+def requirements(fn: Callable, extra: Optional[PageRequirements] = None) -> PageRequirements:
+    """Requirements declared on `fn` (nothing if undeclared), merged with `extra`."""
+    reqs = getattr(fn, 'requirements', PageRequirements())
+    if extra is None:
+        return reqs
+    return PageRequirements(reqs.sources | extra.sources, reqs.charts | extra.charts)
@@ -5,9 +5,12 @@ from typing import Dict, List, Tuple, Optional, Any
 from datetime import datetime, timedelta
 import logging
 import scipy
+from analysis.correlation import MIN_PERIODS, align_series, changes, correlation_matrix
+from utils.metrics import timed_methods
 logger = logging.getLogger(__name__)
 
 
+@timed_methods
 class EconomicAnalyzer:
     """Advanced economic analysis and correlation engine."""
 
@@ -459,10 +462,16 @@ class PortfolioOptimizer:
 
 
 # Utility functions
-def calculate_correlation_matrix(data_dict: Dict[str, pd.Series]) -> pd.DataFrame:
-    """Calculate correlation matrix from multiple time series."""
-    df = pd.DataFrame(data_dict)
-    return df.corr()
+def calculate_correlation_matrix(data_dict: Dict[str, pd.Series], periods: Optional[int] = None,
+                                 min_periods: int = MIN_PERIODS) -> pd.DataFrame:
+    """
+    Correlation matrix of multiple time series on a common business-day calendar
+    (mixed frequencies forward-filled); with `periods`, of their changes over that many days.
+    """
+    panel = align_series(data_dict)
+    if periods:
+        panel = changes(panel, periods)
+    return correlation_matrix(panel, min_periods=min_periods)
 
 
 def identify_outliers(series: pd.Series, method: str = 'iqr') -> pd.Series:
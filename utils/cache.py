@@ -0,0 +1,360 @@
+# utils/cache.py - Pluggable cache backends shared by the data loaders
+import contextlib
+import functools
+import hashlib
+import inspect
+import logging
+import os
+import pickle
+import socket
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from constants import DATA_SOURCES
+from utils.metrics import count_cache
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "ecotrack"
+
+
+class CacheBackend(ABC):
+    """Byte-oriented key/value store with per-key TTL."""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[bytes]:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        ...
+
+    @abstractmethod
+    def delete_prefix(self, prefix: str) -> None:
+        ...
+
+
+class MemoryBackend(CacheBackend):
+    """Per-process dictionary; equivalent to the old st.cache_data behaviour."""
+
+    def __init__(self):
+        self._data: Dict[str, Tuple[bytes, Optional[float]]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires is not None and expires <= time.time():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        with self._lock:
+            self._data[key] = (value, time.time() + ttl if ttl else None)
+
+    def delete_prefix(self, prefix: str) -> None:
+        with self._lock:
+            for key in [k for k in self._data if k.startswith(prefix)]:
+                del self._data[key]
+
+
+class SQLiteBackend(CacheBackend):
+    """Single-file cache that every process on the host can share (WAL mode)."""
+
+    def __init__(self, path: str):
+        self.path = str(path)
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB, expires REAL)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[bytes]:
+        row = self._conn().execute("SELECT value, expires FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        value, expires = row
+        if expires is not None and expires <= time.time():
+            self._conn().execute("DELETE FROM cache WHERE key = ? AND expires <= ?", (key, time.time()))
+            return None
+        return value
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        expires = time.time() + ttl if ttl else None
+        self._conn().execute("INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)",
+                             (key, sqlite3.Binary(value), expires))
+
+    def delete_prefix(self, prefix: str) -> None:
+        self._conn().execute("DELETE FROM cache WHERE substr(key, 1, ?) = ?", (len(prefix), prefix))
+
+
+class RedisError(Exception):
+    pass
+
+
+class RedisBackend(CacheBackend):
+    """Minimal RESP2 client (GET / SET EX / SCAN / DEL) so no redis package is required."""
+
+    def __init__(self, host: str = "localhost", port: int = 6379, db: int = 0,
+                 password: Optional[str] = None, timeout: float = 5.0):
+        self.host, self.port, self.db, self.password, self.timeout = host, port, db, password, timeout
+        self._sock: Optional[socket.socket] = None
+        self._buf = b""
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisBackend":
+        u = urlparse(url)
+        db = int(u.path.lstrip("/") or 0)
+        return cls(u.hostname or "localhost", u.port or 6379, db, u.password)
+
+    def _connect(self) -> None:
+        self._sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self._buf = b""
+        if self.password:
+            self._send("AUTH", self.password)
+        if self.db:
+            self._send("SELECT", str(self.db))
+
+    def _readline(self) -> bytes:
+        while b"\r\n" not in self._buf:
+            chunk = self._sock.recv(65536)
+            if not chunk:
+                raise ConnectionError("Redis connection closed")
+            self._buf += chunk
+        line, self._buf = self._buf.split(b"\r\n", 1)
+        return line
+
+    def _readexact(self, n: int) -> bytes:
+        while len(self._buf) < n + 2:
+            chunk = self._sock.recv(65536)
+            if not chunk:
+                raise ConnectionError("Redis connection closed")
+            self._buf += chunk
+        data, self._buf = self._buf[:n], self._buf[n + 2:]
+        return data
+
+    def _reply(self) -> Any:
+        line = self._readline()
+        kind, rest = line[:1], line[1:]
+        if kind == b"+":
+            return rest.decode()
+        if kind == b"-":
+            raise RedisError(rest.decode())
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            n = int(rest)
+            return None if n < 0 else self._readexact(n)
+        if kind == b"*":
+            n = int(rest)
+            return None if n < 0 else [self._reply() for _ in range(n)]
+        raise RedisError(f"Unexpected reply: {line[:50]!r}")
+
+    def _send(self, *args) -> Any:
+        parts = [f"*{len(args)}\r\n".encode()]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        self._sock.sendall(b"".join(parts))
+        return self._reply()
+
+    def command(self, *args) -> Any:
+        with self._lock:
+            for attempt in range(2):
+                try:
+                    if self._sock is None:
+                        self._connect()
+                    return self._send(*args)
+                except (OSError, ConnectionError):
+                    self._sock = None
+                    if attempt:
+                        raise
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.command("GET", key)
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        if ttl:
+            self.command("SET", key, value, "PX", int(ttl * 1000))
+        else:
+            self.command("SET", key, value)
+
+    def delete_prefix(self, prefix: str) -> None:
+        cursor = "0"
+        while True:
+            cursor, keys = self.command("SCAN", cursor, "MATCH", f"{prefix}*", "COUNT", 500)
+            cursor = cursor.decode() if isinstance(cursor, bytes) else str(cursor)
+            if keys:
+                self.command("DEL", *keys)
+            if cursor == "0":
+                break
+
+
+def create_backend(kind: Optional[str] = None, url: Optional[str] = None) -> CacheBackend:
+    """
+    Build a backend from ECOTRACK_CACHE_BACKEND (memory | sqlite | redis) and ECOTRACK_CACHE_URL
+    (SQLite file path or redis://host:port/db).
+    """
+    kind = (kind or os.getenv("ECOTRACK_CACHE_BACKEND", "memory")).lower()
+    url = url or os.getenv("ECOTRACK_CACHE_URL")
+    if kind == "sqlite":
+        cache_dir = Path(os.getenv("ECOTRACK_CACHE_DIR", ".cache"))
+        return SQLiteBackend(url or str(cache_dir / "shared_cache.sqlite"))
+    if kind == "redis":
+        return RedisBackend.from_url(url or "redis://localhost:6379/0")
+    if kind != "memory":
+        logger.warning(f"Unknown cache backend '{kind}', using memory")
+    return MemoryBackend()
+
+
+_backend: Optional[CacheBackend] = None
+_backend_lock = threading.Lock()
+
+
+def get_backend() -> CacheBackend:
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = create_backend()
+        return _backend
+
+
+def set_backend(backend: CacheBackend) -> None:
+    """Swap the process-wide backend (e.g. for a local stand-in)."""
+    global _backend
+    with _backend_lock:
+        _backend = backend
+
+
+def _digest(args: tuple, kwargs: dict) -> str:
+    try:
+        payload = pickle.dumps((args, sorted(kwargs.items())), protocol=4)
+    except Exception:
+        payload = repr((args, sorted(kwargs.items()))).encode()
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+
+class _KeyLocks:
+    """Per-key locks that exist only while some thread holds or waits for them."""
+
+    def __init__(self):
+        self._locks: Dict[str, List] = {}  # key -> [lock, threads holding or waiting]
+        self._guard = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._guard:
+            return len(self._locks)
+
+    @contextlib.contextmanager
+    def hold(self, key: str):
+        with self._guard:
+            entry = self._locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._guard:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._locks[key]
+
+
+def cached(source: str, ttl: Optional[float] = None) -> Callable:
+    """
+    Memoize a loader in the shared backend under "ecotrack:<source>:<function>:<args hash>".
+
+    TTL defaults to DATA_SOURCES[source]['cache_ttl']. Like st.cache_data, parameters whose
+    name starts with an underscore are left out of the key. Concurrent callers in one
+    process wait for a single computation; backend failures fall back to calling through.
+    """
+    ttl = ttl if ttl is not None else DATA_SOURCES[source]['cache_ttl']
+
+    def decorator(fn: Callable) -> Callable:
+        sig = inspect.signature(fn)
+        label = f"{fn.__module__}.{fn.__qualname__}"
+        prefix = f"{KEY_PREFIX}:{source}:{label}:"
+        key_locks = _KeyLocks()
+
+        def _key(args, kwargs) -> str:
+            bound = sig.bind(*args, **kwargs)
+            bound.apply_defaults()
+            hashed = {k: v for k, v in bound.arguments.items() if not k.startswith("_")}
+            return prefix + _digest((), hashed)
+
+        def _load(key: str) -> Tuple[bool, Any]:
+            try:
+                raw = get_backend().get(key)
+            except Exception as e:
+                logger.warning(f"Cache read failed for {key}: {e}")
+                return False, None
+            if raw is None:
+                return False, None
+            try:
+                return True, pickle.loads(raw)
+            except Exception as e:
+                logger.warning(f"Discarding unreadable cache entry {key}: {e}")
+                return False, None
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = _key(args, kwargs)
+            hit, value = _load(key)
+            if hit:
+                count_cache(source, True, function=label)
+                return value
+
+            return _compute(key, args, kwargs, force=False)
+
+        def _compute(key: str, args, kwargs, force: bool) -> Any:
+            with key_locks.hold(key):
+                if not force:
+                    hit, value = _load(key)
+                    count_cache(source, hit, function=label)
+                    if hit:
+                        return value
+                value = fn(*args, **kwargs)
+                try:
+                    get_backend().set(key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), ttl)
+                except Exception as e:
+                    logger.warning(f"Cache write failed for {key}: {e}")
+                return value
+
+        def refresh(*args, **kwargs):
+            """Recompute regardless of any cached entry and overwrite it."""
+            return _compute(_key(args, kwargs), args, kwargs, force=True)
+
+        def clear() -> None:
+            get_backend().delete_prefix(prefix)
+
+        wrapper.refresh = refresh
+        wrapper.clear = clear
+        wrapper.cache_key_prefix = prefix
+        wrapper._key_locks = key_locks
+        return wrapper
+
+    return decorator
+
+
+def clear_source(source: str) -> None:
+    """Drop every cached entry for one provider."""
+    get_backend().delete_prefix(f"{KEY_PREFIX}:{source}:")
+
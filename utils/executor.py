@@ -0,0 +1,109 @@
+# utils/executor.py - Dependency-aware parallel task runner
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from utils.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Task:
+    """A named unit of work. `fn` receives the values of its `deps` as keyword arguments."""
+    name: str
+    fn: Callable[..., Any]
+    deps: Sequence[str] = ()
+    timeout: Optional[float] = None
+    default: Any = None
+
+
+@dataclass
+class TaskResult:
+    name: str
+    value: Any = None
+    ok: bool = False
+    elapsed: float = 0.0
+    error: Optional[str] = None
+
+
+def run_dag(tasks: List[Task], max_workers: Optional[int] = None,
+            wrap: Optional[Callable[[Callable], Callable]] = None) -> Dict[str, TaskResult]:
+    """
+    Run tasks concurrently as soon as their dependencies have succeeded.
+
+    Each task is isolated: an exception or a timeout yields its `default` value and
+    skips its dependents, but never blocks unrelated tasks. Timed-out threads are
+    abandoned rather than joined. `wrap` can decorate every callable before it is
+    submitted (e.g. to attach a thread context).
+    """
+    by_name = {t.name: t for t in tasks}
+    for t in tasks:
+        missing = [d for d in t.deps if d not in by_name]
+        if missing:
+            raise ValueError(f"Task '{t.name}' depends on unknown task(s): {missing}")
+
+    results: Dict[str, TaskResult] = {}
+    pending = dict(by_name)
+    running: Dict[Future, str] = {}
+    started: Dict[str, float] = {}
+
+    def _finish(name: str, value: Any, ok: bool, error: Optional[str] = None) -> None:
+        task = by_name[name]
+        elapsed = time.perf_counter() - started[name] if name in started else 0.0
+        results[name] = TaskResult(name, value if ok else task.default, ok, elapsed, error)
+        if name in started:
+            REGISTRY.observe("source_seconds", elapsed, source=name)
+        if not ok:
+            REGISTRY.inc("source_errors_total", source=name)
+            logger.warning(f"Task '{name}' failed after {elapsed:.2f}s: {error}")
+
+    pool = ThreadPoolExecutor(max_workers=max_workers or max(len(tasks), 1), thread_name_prefix="dag")
+    try:
+        while pending or running:
+            # Submit ready tasks; skip those whose dependencies failed
+            for name, task in list(pending.items()):
+                if any(d in results and not results[d].ok for d in task.deps):
+                    del pending[name]
+                    _finish(name, None, False, "dependency failed")
+                    continue
+                if all(d in results for d in task.deps):
+                    del pending[name]
+                    kwargs = {d: results[d].value for d in task.deps}
+                    fn = wrap(task.fn) if wrap else task.fn
+                    started[name] = time.perf_counter()
+                    running[pool.submit(fn, **kwargs)] = name
+
+            if not running:
+                if pending:
+                    # Remaining tasks wait on dependencies that will never resolve
+                    for name in list(pending):
+                        del pending[name]
+                        _finish(name, None, False, "dependency failed")
+                break
+
+            now = time.perf_counter()
+            deadlines = [started[n] + by_name[n].timeout for n in running.values() if by_name[n].timeout]
+            wait_for = max(min(deadlines) - now, 0) if deadlines else None
+            done, _ = wait(list(running), timeout=wait_for, return_when=FIRST_COMPLETED)
+
+            for fut in done:
+                name = running.pop(fut)
+                try:
+                    _finish(name, fut.result(), True)
+                except Exception as e:
+                    _finish(name, None, False, str(e))
+
+            now = time.perf_counter()
+            for fut, name in list(running.items()):
+                timeout = by_name[name].timeout
+                if timeout and now - started[name] >= timeout:
+                    running.pop(fut)
+                    fut.cancel()
+                    _finish(name, None, False, f"timed out after {timeout:g}s")
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    return results
@@ -0,0 +1,138 @@
+# utils/http.py - Shared async HTTP layer: pooled connections, timeouts, jittered retries, provider rate limits
+import asyncio
+import atexit
+import logging
+import random
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Awaitable, Dict, Optional
+
+import aiohttp
+
+from utils.metrics import REGISTRY
+from utils.ratelimit import get_rate_limiter
+
+logger = logging.getLogger(__name__)
+
+# Connection pool: open sockets overall and per host (each provider is a single host)
+POOL_LIMIT = 256
+POOL_LIMIT_PER_HOST = 32
+DEFAULT_TIMEOUT = aiohttp.ClientTimeout(total=30, sock_connect=5, sock_read=15)
+
+# Retries: full-jitter exponential backoff on connection errors, timeouts and these statuses
+RETRIES = 3
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 8.0
+RETRY_STATUS = {429, 500, 502, 503, 504}
+RATE_LIMIT_WAIT = 120  # longest a request waits for a provider token before giving up
+
+
+class AsyncHttp:
+    """
+    One event loop on a background thread with one aiohttp session. Every provider's
+    requests run on it, so callers on any thread (Streamlit scripts, loader workers, the
+    ingestion daemon) share the loop, the connection pool and the rate limiters.
+    """
+
+    def __init__(self, limit: int = POOL_LIMIT, limit_per_host: int = POOL_LIMIT_PER_HOST):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None or self._loop.is_closed():
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name="http-loop", daemon=True)
+                self._thread.start()
+            return self._loop
+
+    def _session_for_loop(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.limit, limit_per_host=self.limit_per_host, ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=DEFAULT_TIMEOUT)
+        return self._session
+
+    async def get_json(self, url: str, params: Optional[Dict] = None, provider: Optional[str] = None,
+                       headers: Optional[Dict] = None, timeout: Optional[float] = None,
+                       retries: int = RETRIES) -> Optional[Any]:
+        """
+        GET `url` and decode its JSON body; None once retries are exhausted or on a client
+        error (4xx other than 429). Each attempt takes a token from `provider`'s limiter
+        and may last `timeout` seconds. Must run on the shared loop (see `run`/`submit`).
+        """
+        session = self._session_for_loop()
+        client_timeout = None if timeout is None else aiohttp.ClientTimeout(
+            total=timeout, sock_connect=DEFAULT_TIMEOUT.sock_connect)
+        limiter = get_rate_limiter(provider) if provider else None
+        error, delay = None, 0.0
+        for attempt in range(retries + 1):
+            if attempt:
+                await asyncio.sleep(delay or random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt)))
+            if limiter is not None and not await limiter.acquire_async(timeout=RATE_LIMIT_WAIT):
+                error = f"no {provider} rate-limit token within {RATE_LIMIT_WAIT}s"
+                break
+            delay = 0.0
+            started, status = time.perf_counter(), "error"
+            try:
+                async with session.get(url, params=params, headers=headers, timeout=client_timeout) as r:
+                    status = str(r.status)
+                    if r.status < 400:
+                        return await r.json(content_type=None)
+                    error = f"HTTP {r.status}: {(await r.text())[:200]}"
+                    if r.status not in RETRY_STATUS:
+                        break
+                    retry_after = r.headers.get("Retry-After", "")
+                    if retry_after.isdigit():
+                        delay = min(float(retry_after), BACKOFF_MAX)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = f"{type(e).__name__}: {e}"
+            except ValueError as e:
+                error = f"invalid JSON: {e}"
+                break
+            finally:
+                REGISTRY.inc("http_requests_total", provider=provider or "", status=status)
+                REGISTRY.observe("http_request_seconds", time.perf_counter() - started, provider=provider or "")
+        logger.warning(f"GET {url} failed after {attempt + 1} attempt(s): {error}")
+        return None
+
+    def submit(self, coro: Awaitable) -> Future:
+        """Schedule `coro` on the shared loop from any thread."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro: Awaitable, timeout: Optional[float] = None) -> Any:
+        """Blocking wrapper for sync callers; must not be called from the loop's own thread."""
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("AsyncHttp.run() called from the event loop thread; await the coroutine instead")
+        return self.submit(coro).result(timeout)
+
+    def close(self) -> None:
+        with self._lock:
+            loop, session = self._loop, self._session
+        if loop is None or loop.is_closed():
+            return
+        if session is not None and not session.closed:
+            try:
+                asyncio.run_coroutine_threadsafe(session.close(), loop).result(5)
+            except Exception as e:
+                logger.debug(f"HTTP session close failed: {e}")
+        loop.call_soon_threadsafe(loop.stop)
+
+
+HTTP = AsyncHttp()
+atexit.register(HTTP.close)
+
+
+async def get_json(url: str, params: Optional[Dict] = None, provider: Optional[str] = None, **kwargs) -> Optional[Any]:
+    """Coroutine GET through the shared client (see AsyncHttp.get_json)."""
+    return await HTTP.get_json(url, params, provider, **kwargs)
+
+
+def run(coro: Awaitable, timeout: Optional[float] = None) -> Any:
+    """Run a coroutine on the shared loop and wait for its result (sync wrapper)."""
+    return HTTP.run(coro, timeout)
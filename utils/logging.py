@@ -1,13 +1,16 @@
 # utils/logging.py
 import logging
+import os
 
 
 def init_logging():
+    # Log file path; override with ECOTRACK_LOG_FILE (the benchmarks and tests point it at a temp dir)
+    log_file = os.getenv("ECOTRACK_LOG_FILE", "dashboard.log")
     logging.basicConfig(
         level=logging.INFO,
         format='%(asctime)s - %(levelname)s - %(message)s',
         handlers=[
-            logging.FileHandler('dashboard.log'),
+            logging.FileHandler(log_file),
             logging.StreamHandler()
         ]
     )
@@ -0,0 +1,252 @@
+# utils/metrics.py - In-process timing spans, counters and histograms with Prometheus text export
+import cProfile
+import functools
+import inspect
+import io
+import logging
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+NAMESPACE = "ecotrack"
+SLOW_SPAN = 2.0  # seconds; slower spans are also logged
+RESERVOIR = 1024  # most recent observations kept per series for percentiles
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SIZE_BUCKETS = (1, 10, 100, 1_000, 10_000, 100_000, 1_000_000)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Cumulative bucket counts, sum and count (as Prometheus expects) plus a reservoir of recent values."""
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.recent: Deque[float] = deque(maxlen=RESERVOIR)
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.count += 1
+        self.sum += value
+        self.recent.append(value)
+
+    def percentiles(self, qs=(50, 95, 99)) -> Dict[str, float]:
+        if not self.recent:
+            return {}
+        values = np.percentile(np.fromiter(self.recent, float), qs)
+        return {f"p{q}": float(v) for q, v in zip(qs, values)}
+
+
+class MetricsRegistry:
+    """Thread-safe named counters and histograms, each keyed by a sorted label set."""
+
+    def __init__(self):
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._histograms: Dict[str, Dict[Labels, Histogram]] = {}
+        self._buckets: Dict[str, Tuple[float, ...]] = {}
+        self._help: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _labels(labels: Dict[str, Any]) -> Labels:
+        return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def describe(self, name: str, help_text: str, buckets: Optional[Tuple[float, ...]] = None) -> None:
+        self._help[name] = help_text
+        if buckets is not None:
+            self._buckets[name] = buckets
+
+    def inc(self, name: str, amount: float = 1.0, **labels) -> None:
+        key = self._labels(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + amount
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        key = self._labels(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            hist = series.get(key)
+            if hist is None:
+                hist = series[key] = Histogram(self._buckets.get(name, LATENCY_BUCKETS))
+            hist.observe(value)
+
+    def counters(self, name: str) -> Dict[Labels, float]:
+        with self._lock:
+            return dict(self._counters.get(name, {}))
+
+    def total(self, name: str, **match) -> float:
+        """Sum of counter `name` over the label sets that include every `match` label."""
+        wanted = set(self._labels(match))
+        return sum(v for labels, v in self.counters(name).items() if wanted <= set(labels))
+
+    def summary(self, name: str) -> pd.DataFrame:
+        """One row per label set of histogram `name`: labels, count, sum, mean and p50/p95/p99 of recent values."""
+        with self._lock:
+            rows = [{**dict(key), "count": h.count, "sum": h.sum, "mean": h.sum / h.count if h.count else 0.0,
+                     **h.percentiles()} for key, h in self._histograms.get(name, {}).items()]
+        return pd.DataFrame(rows)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def to_prometheus(self) -> str:
+        """Every metric in the Prometheus text exposition format (version 0.0.4)."""
+        def fmt(labels: Labels, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+            pairs = [*labels, *extra]
+            if not pairs:
+                return ""
+            escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+            return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+        lines: List[str] = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                full = f"{NAMESPACE}_{name}"
+                lines += [f"# HELP {full} {self._help.get(name, name)}", f"# TYPE {full} counter"]
+                lines += [f"{full}{fmt(labels)} {value:g}" for labels, value in series.items()]
+            for name, series in sorted(self._histograms.items()):
+                full = f"{NAMESPACE}_{name}"
+                lines += [f"# HELP {full} {self._help.get(name, name)}", f"# TYPE {full} histogram"]
+                for labels, h in series.items():
+                    lines += [f"{full}_bucket{fmt(labels, (('le', f'{b:g}'),))} {c}" for b, c in zip(h.buckets, h.counts)]
+                    lines += [f"{full}_bucket{fmt(labels, (('le', '+Inf'),))} {h.count}",
+                              f"{full}_sum{fmt(labels)} {h.sum:.6g}",
+                              f"{full}_count{fmt(labels)} {h.count}"]
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+REGISTRY.describe("span_seconds", "Duration of instrumented calls", LATENCY_BUCKETS)
+REGISTRY.describe("span_payload_items", "Rows or entries returned by instrumented calls", SIZE_BUCKETS)
+REGISTRY.describe("span_errors_total", "Instrumented calls that raised")
+REGISTRY.describe("cache_requests_total", "Cache lookups by result (hit/miss)")
+REGISTRY.describe("source_seconds", "Duration of data source refresh tasks", LATENCY_BUCKETS)
+REGISTRY.describe("source_errors_total", "Data source refresh tasks that failed")
+REGISTRY.describe("http_requests_total", "Upstream HTTP attempts by provider and status")
+REGISTRY.describe("http_request_seconds", "Duration of upstream HTTP attempts", LATENCY_BUCKETS)
+
+
+def payload_size(obj: Any) -> Optional[int]:
+    """Rows of a frame/series or entries of a container (first element of a tuple result); None otherwise."""
+    if isinstance(obj, tuple) and obj:
+        obj = obj[0]
+    if isinstance(obj, (pd.DataFrame, pd.Series, dict, list, set, np.ndarray)):
+        return len(obj)
+    data = getattr(obj, "data", None)  # Plotly figures: number of traces
+    return len(data) if isinstance(data, tuple) else None
+
+
+class Span:
+    """Times a block into span_seconds{span=...}; `record(result)` also notes its payload size."""
+
+    __slots__ = ("name", "labels", "started", "size")
+
+    def __init__(self, name: str, **labels):
+        self.name = name
+        self.labels = labels
+        self.size: Optional[int] = None
+
+    def record(self, result: Any) -> Any:
+        self.size = payload_size(result)
+        return result
+
+    def __enter__(self) -> "Span":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        elapsed = time.perf_counter() - self.started
+        REGISTRY.observe("span_seconds", elapsed, span=self.name, **self.labels)
+        if exc_type is not None:
+            REGISTRY.inc("span_errors_total", span=self.name, **self.labels)
+        elif self.size is not None:
+            REGISTRY.observe("span_payload_items", self.size, span=self.name, **self.labels)
+        if elapsed > SLOW_SPAN:
+            logger.info(f"Slow span {self.name}: {elapsed:.2f}s")
+        return False
+
+
+def span(name: str, **labels) -> Span:
+    """Context manager timing a block: `with span("tcbs_bars", resolution="D") as s: s.record(df)`."""
+    return Span(name, **labels)
+
+
+def timed(name: Optional[str] = None) -> Callable:
+    """Decorator recording each call's duration and payload size; works on plain and async functions."""
+    def decorator(fn: Callable) -> Callable:
+        label = name or f"{fn.__module__}.{fn.__qualname__}"
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with Span(label) as s:
+                    return s.record(await fn(*args, **kwargs))
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with Span(label) as s:
+                return s.record(fn(*args, **kwargs))
+        return wrapper
+
+    return decorator
+
+
+def timed_methods(cls: type) -> type:
+    """Class decorator applying `timed` to every public method, named '<Class>.<method>'."""
+    for attr, value in list(vars(cls).items()):
+        if callable(value) and not attr.startswith("_"):
+            setattr(cls, attr, timed(f"{cls.__name__}.{attr}")(value))
+    return cls
+
+
+def count_cache(cache: str, hit: bool, **labels) -> None:
+    REGISTRY.inc("cache_requests_total", cache=cache, result="hit" if hit else "miss", **labels)
+
+
+def process_rss() -> Optional[int]:
+    """Resident set size of this process in bytes (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    except (ImportError, OSError):
+        return None
+
+
+def profile_report(profiler: cProfile.Profile, limit: int = 40) -> Dict[str, Any]:
+    """Top `limit` functions by cumulative time as text, plus the raw stats in .prof format (pstats/snakeviz)."""
+    stats = pstats.Stats(profiler)
+    text = io.StringIO()
+    stats.stream = text
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(limit)
+    return {
+        "text": text.getvalue(),
+        "prof": marshal.dumps(stats.stats),
+        "total": stats.total_tt,
+        "calls": stats.total_calls,
+    }
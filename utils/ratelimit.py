@@ -0,0 +1,76 @@
+# utils/ratelimit.py - Thread-safe token-bucket rate limiting per data provider
+import asyncio
+import threading
+import time
+from typing import Dict, Optional
+
+from constants import DATA_SOURCES
+
+
+class RateLimiter:
+    """
+    Token bucket holding up to `rate` tokens, refilled continuously over `period` seconds.
+    A full bucket allows a burst of `rate` requests, then `rate / period` per second.
+    """
+
+    def __init__(self, rate: int, period: float):
+        self.rate = rate
+        self.period = period
+        self._tokens = float(rate)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.rate, self._tokens + (now - self._updated) * self.rate / self.period)
+        self._updated = now
+
+    def _take(self, tokens: int) -> float:
+        """Take `tokens` if the bucket holds them (returns 0), else the seconds until it will."""
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) * self.period / self.rate
+
+    def acquire(self, tokens: int = 1, timeout: Optional[float] = None) -> bool:
+        """Block until `tokens` are available; False if that would take longer than `timeout`."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self._take(tokens)
+            if not wait:
+                return True
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens: int = 1, timeout: Optional[float] = None) -> bool:
+        """`acquire` for coroutines: waits without blocking the event loop, same bucket."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self._take(tokens)
+            if not wait:
+                return True
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            await asyncio.sleep(wait)
+
+    def available(self) -> float:
+        """Tokens currently in the bucket (remaining request headroom)."""
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(provider: str) -> RateLimiter:
+    """Process-wide limiter for a provider, sized from DATA_SOURCES."""
+    with _limiters_lock:
+        if provider not in _limiters:
+            cfg = DATA_SOURCES[provider]
+            _limiters[provider] = RateLimiter(cfg['rate_limit'], cfg.get('rate_period', 3600))
+        return _limiters[provider]
@@ -0,0 +1,144 @@
+# utils/refresh.py - Stale-while-revalidate snapshots of the dashboard data sources
+import logging
+import pickle
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+from utils.cache import KEY_PREFIX, get_backend
+from utils.executor import Task, run_dag
+from utils.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """Last good value of one source; `error` is set when the latest refresh attempt failed."""
+    value: Any
+    fetched_at: float
+    elapsed: float = 0.0
+    error: Optional[str] = None
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.fetched_at
+
+
+class SnapshotRefresher:
+    """
+    Serves the last good snapshot of every source immediately and refreshes stale
+    sources on a background thread.
+
+    Only the first load of a source blocks. Refreshed results replace the snapshot
+    mapping in a single assignment, so readers never observe a half-updated set; a
+    source whose refresh fails keeps serving its previous value.
+    """
+
+    def __init__(self, build_tasks: Callable[[], List[Task]], max_age: float):
+        self.build_tasks = build_tasks
+        self.max_age = max_age
+        self._snapshots: Dict[str, Snapshot] = {}
+        self._load_lock = threading.Lock()  # first (blocking) loads
+        self._bg_lock = threading.Lock()  # at most one background refresh
+        self._swap_lock = threading.Lock()
+        self.last_refresh: Dict[str, Any] = {}  # sources, duration and upstream HTTP requests of the last refresh
+
+    @property
+    def refreshing(self) -> bool:
+        return self._bg_lock.locked()
+
+    def stale_sources(self, names: Optional[List[str]] = None) -> List[str]:
+        snapshots = self._snapshots
+        return [t.name for t in self.build_tasks()
+                if (names is None or t.name in names)
+                and (t.name not in snapshots or snapshots[t.name].age > self.max_age)]
+
+    def get(self, wrap: Optional[Callable[[Callable], Callable]] = None,
+            names: Optional[List[str]] = None) -> Dict[str, Snapshot]:
+        """
+        Current snapshots of `names` (default: every source). Blocks only for sources
+        that have never been loaded; stale ones are revalidated in the background.
+        """
+        wanted = [t.name for t in self.build_tasks() if names is None or t.name in names]
+        if any(name not in self._snapshots for name in wanted):
+            with self._load_lock:
+                missing = [name for name in wanted if name not in self._snapshots]
+                if missing:
+                    self._refresh(missing, wrap)
+        stale = self.stale_sources(wanted)
+        if stale:
+            self.refresh_async(wrap, stale)
+        return self._snapshots
+
+    def refresh_async(self, wrap: Optional[Callable[[Callable], Callable]] = None,
+                      names: Optional[List[str]] = None) -> bool:
+        """Start a background refresh of `names` (default: stale sources); False if one is already running."""
+        if not self._bg_lock.acquire(blocking=False):
+            return False
+
+        def worker():
+            try:
+                self._refresh(names, wrap)
+            except Exception as e:
+                logger.error(f"Background refresh failed: {e}")
+            finally:
+                self._bg_lock.release()
+
+        threading.Thread(target=worker, name="snapshot-refresh", daemon=True).start()
+        return True
+
+    def _refresh(self, names: Optional[List[str]], wrap: Optional[Callable[[Callable], Callable]]) -> None:
+        names = names or self.stale_sources()
+        tasks = [t for t in self.build_tasks() if t.name in names]
+        if not tasks:
+            return
+        logger.info(f"Refreshing {len(tasks)} data source(s): {[t.name for t in tasks]}")
+        started, requests = time.perf_counter(), REGISTRY.total("http_requests_total")
+        results = run_dag(tasks, wrap=wrap)
+        self.last_refresh = {
+            "at": time.time(),
+            "sources": [t.name for t in tasks],
+            "duration": time.perf_counter() - started,
+            # Counts every request in the process meanwhile (other refreshes, the intraday feed)
+            "http_requests": REGISTRY.total("http_requests_total") - requests,
+        }
+
+        now = time.time()
+        with self._swap_lock:
+            snapshots = dict(self._snapshots)
+            for name, r in results.items():
+                if r.ok:
+                    snapshots[name] = Snapshot(r.value, now, r.elapsed)
+                elif name in snapshots:
+                    prev = snapshots[name]
+                    snapshots[name] = Snapshot(prev.value, prev.fetched_at, prev.elapsed, r.error)
+                else:
+                    snapshots[name] = Snapshot(r.value, now, r.elapsed, r.error)
+            self._snapshots = snapshots
+
+
+# Snapshots published by the ingestion daemon (python -m ingest) live in the shared cache backend
+SNAPSHOT_PREFIX = f"{KEY_PREFIX}:snapshot:"
+
+
+def publish_snapshots(snapshots: Dict[str, Snapshot]) -> None:
+    """Write snapshots to the shared backend; they never expire, readers judge staleness by age."""
+    backend = get_backend()
+    for key, snapshot in snapshots.items():
+        backend.set(SNAPSHOT_PREFIX + key, pickle.dumps(snapshot, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def read_snapshots(keys: List[str]) -> Dict[str, Snapshot]:
+    """Published snapshots for `keys`; missing or unreadable entries are omitted."""
+    backend = get_backend()
+    out: Dict[str, Snapshot] = {}
+    for key in keys:
+        try:
+            raw = backend.get(SNAPSHOT_PREFIX + key)
+            if raw is not None:
+                out[key] = pickle.loads(raw)
+        except Exception as e:
+            logger.warning(f"Failed to read snapshot {key}: {e}")
+    return out